@@ -6,14 +6,24 @@ from flask_mail import Mail
 from flask_migrate import Migrate
 from flask_cors import CORS
 from config import get_config
+from app.identity_cache import IdentityCache
+from app.audit import AuditLog
+from app.login_tracker import LoginTracker
+from app.sessions import init_session_interface
+from app.sqlite_mode import init_sqlite_mode
+from app.db_routing import RoutingSession, init_read_replica
+from app.serialization import FastJSONProvider, init_compression
 
 # =======================
 # ایجاد نمونه اکستنشن‌ها
 # =======================
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
-migrate = Migrate()
+migrate = Migrate(render_as_batch=True)  # batch mode lets SQLite ALTER via table copy
+identity_cache = IdentityCache()
+audit_log = AuditLog()
+login_tracker = LoginTracker()
 
 # =======================
 # تابع اصلی ساخت اپلیکیشن
@@ -34,6 +44,7 @@ def create_app(config_name=None):
     cfg_class = get_config(env)
     app.config.from_object(cfg_class)
     cfg_class.init_app(app)  
+    app.json = FastJSONProvider(app)
     
     # =======================
     # فعال‌سازی CORS برای مسیرهای API
@@ -47,10 +58,17 @@ def create_app(config_name=None):
     # =======================
     # مقداردهی اکستنشن‌ها
     # =======================
+    init_read_replica(app)
     db.init_app(app)
+    init_sqlite_mode(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
+    identity_cache.init_app(app)
+    audit_log.init_app(app)
+    login_tracker.init_app(app)
+    init_session_interface(app, db)
+    init_compression(app)
 
     # =======================
     # تنظیمات Login Manager
@@ -61,9 +79,8 @@ def create_app(config_name=None):
 
     @login_manager.user_loader
     def load_user(user_id):
-        """Load user by ID for Flask-Login."""
-        from app.models.user import User
-        return User.query.get(int(user_id))
+        """Load user by ID for Flask-Login (served from the identity cache when warm)."""
+        return identity_cache.load_user(int(user_id))
 
     # =======================
     # ثبت Blueprints
@@ -1,9 +1,18 @@
 # admin/routes.py
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from app.models.user import User
 from app.models.score import Score
+from app import db, identity_cache, audit_log
+from app.db_routing import read_replica
+from app.tests.asr import get_asr_client
+from app.tests.protocols import get_registry
+from app.user_search import search_users
+from app.serialization import list_response, list_payload
+from app.audit import query_events, MAX_QUERY_LIMIT
+from app.rollups import refresh_if_stale, activity, funnel
+from app.tests.batch import BatchError, items_from_uploads, items_from_zip, run_batch
 from . import bp  # admin blueprint
 from functools import wraps
 
@@ -19,6 +28,7 @@ def admin_required(f):
 @bp.route('/user-results', methods=['GET'])
 @login_required
 @admin_required
+@read_replica
 def api_user_results():
     """
     Returns all user test results for admin.
@@ -26,6 +36,7 @@ def api_user_results():
     - username: filter by username
     - test_number: filter by test number
     - test_time: filter by ISO datetime string (e.g., "2025-08-13T14:30")
+    - shape=columns: one array per field instead of a list of rows
     """
     
     # Filters
@@ -59,6 +70,7 @@ def api_user_results():
     scores = scores_query.all()
 
     # Compute approved tests and total scores
+    registry = get_registry(current_app)
     approved_tests = set()
     total_scores = {}
 
@@ -68,11 +80,11 @@ def api_user_results():
             continue
         test_scores = Score.query.filter_by(user_id=score.user_id, test_number=score.test_number).all()
         rounds = [s.round_number for s in test_scores]
-        if set(range(1, 6)) == set(rounds):
+        if registry.is_complete(score.test_number, rounds):
             times = [s.test_time for s in sorted(test_scores, key=lambda x: x.round_number)]
             if times == sorted(times):
                 approved_tests.add(key)
-                total_scores[key] = sum(s.score for s in test_scores)
+                total_scores[key] = registry.total(score.test_number, test_scores)
 
     # Build response
     result = []
@@ -87,10 +99,26 @@ def api_user_results():
             'score': score.score,
             'test_time': score.test_time.isoformat(),
             'approved': 'Yes' if key in approved_tests else 'No',
-            'total_score': total_scores.get(key, 'N/A')
+            'total_score': total_scores.get(key, 'N/A'),
+            'recall': score.recall_timeline(),
+            'timing_source': score.timing_source,
+            'word_list_version': score.word_list_version
         })
 
-    return jsonify(result)
+    return list_response(result)
+
+
+@bp.route('/users/search', methods=['GET'])
+@login_required
+@admin_required
+@read_replica
+def search_users_route():
+    """Prefix and typo-tolerant user search over username/email (?q=...&limit=20&shape=columns)"""
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return list_response(search_users(db.session, request.args.get('q', ''), limit))
 
 
 @bp.route('/user/<int:user_id>')
@@ -104,6 +132,129 @@ def get_user_email(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     
+@bp.route('/identity-cache', methods=['GET'])
+@login_required
+@admin_required
+def get_identity_cache_stats():
+    return jsonify(identity_cache.stats())
+
+
+@bp.route('/asr', methods=['GET'])
+@login_required
+@admin_required
+def get_asr_stats():
+    return jsonify(get_asr_client(current_app).stats())
+
+
+@bp.route('/batch-submit', methods=['POST'])
+@login_required
+@admin_required
+def batch_submit():
+    """
+    Score a clinician's offline session in one request: either a zip
+    (`archive`) or several `audio` files, mapped to (patient, test, round) by
+    a `manifest` JSON field / manifest.json or by their names (see
+    app.tests.batch). `username` is the default patient.
+    """
+    max_files = current_app.config.get('BATCH_MAX_FILES', 20)
+    manifest = request.form.get('manifest')
+    username = request.form.get('username')
+    try:
+        if 'archive' in request.files:
+            items = items_from_zip(request.files['archive'].stream, manifest, username, max_files=max_files)
+        else:
+            files = request.files.getlist('audio')
+            if len(files) > max_files:
+                raise BatchError(f"حداکثر {max_files} فایل در هر بارگذاری مجاز است")
+            items = items_from_uploads(files, manifest, username)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    if not items:
+        return jsonify({'error': 'هیچ فایل صوتی ارسال نشده است'}), 400
+
+    results = run_batch(current_app._get_current_object(), items, get_registry(current_app),
+                        max_workers=current_app.config.get('BATCH_MAX_WORKERS', 8))
+    processed = sum(1 for r in results if r['status'] == 'ok')
+    return jsonify({'processed': processed, 'failed': len(results) - processed, 'results': results})
+
+
+def _refresh_rollups():
+    """Fold in recent scores when the rollups are stale; serve slightly stale stats if that fails"""
+    if not current_app.config.get('ROLLUP_REFRESH_ON_READ', True):
+        return
+    try:
+        refresh_if_stale(get_registry(current_app), current_app.config.get('ROLLUP_REFRESH_INTERVAL', 300),
+                         current_app.config.get('ROLLUP_LAG_SECONDS', 60))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Rollup refresh failed: {str(e)}")
+
+
+@bp.route('/stats/activity', methods=['GET'])
+@login_required
+@admin_required
+def get_activity_stats():
+    """Rounds scored, mean score, tests completed and mean total per day or week bucket"""
+    period = request.args.get('period', 'day')
+    if period not in ('day', 'week'):
+        return jsonify({'error': 'period must be day or week'}), 400
+    try:
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        test_number = int(request.args['test_number']) if request.args.get('test_number') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid from/to (YYYY-MM-DD) or test_number'}), 400
+
+    _refresh_rollups()
+    return jsonify(activity(period, start, end, test_number))
+
+
+@bp.route('/stats/funnel', methods=['GET'])
+@login_required
+@admin_required
+def get_funnel_stats():
+    """Participants and mean score per round, completions and mean total per test"""
+    try:
+        test_number = int(request.args['test_number']) if request.args.get('test_number') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid test_number'}), 400
+
+    _refresh_rollups()
+    return jsonify(funnel(get_registry(current_app), test_number))
+
+
+@bp.route('/audit-events', methods=['GET'])
+@login_required
+@admin_required
+def get_audit_events():
+    """
+    Security events, newest first. Filters: user_id, username, ip,
+    event_type, since/until (ISO datetimes), before (last id of the previous
+    page), limit (max 500).
+    """
+    try:
+        user_id = int(request.args['user_id']) if request.args.get('user_id') else None
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = int(request.args.get('limit', 100))
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid user_id, before, limit or since/until format'}), 400
+
+    # Make events recorded in this process visible before reading
+    audit_log.flush()
+    events = query_events(user_id=user_id, username=request.args.get('username'),
+                          ip_address=request.args.get('ip'), event_type=request.args.get('event_type'),
+                          since=since, until=until, before=before, limit=limit)
+    return jsonify({
+        'events': list_payload([event.to_dict() for event in events]),
+        'next_before': events[-1].id if len(events) == max(1, min(limit, MAX_QUERY_LIMIT)) else None,
+        'buffer': audit_log.stats(),
+    })
+
+
 @bp.route('/current-user', methods=['GET'])
 @login_required
 def get_current_user():
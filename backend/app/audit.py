@@ -0,0 +1,197 @@
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ('INFO', 'WARNING', 'ERROR', 'CRITICAL')
+MAX_QUERY_LIMIT = 500
+
+
+class AuditLog:
+    """
+    Durable, queryable security events without a write on the request path.
+
+    record() appends to an in-memory ring buffer and returns; a daemon thread
+    (started lazily in each process, so prefork workers get their own)
+    writes the buffer to audit_events in batched INSERTs every
+    AUDIT_FLUSH_INTERVAL seconds, or sooner once AUDIT_FLUSH_BATCH events are
+    waiting. When the database is unreachable events stay buffered; past
+    AUDIT_BUFFER_SIZE the oldest are dropped and counted. The buffer is also
+    flushed at interpreter exit and when a prefork or gunicorn worker stops.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.asynchronous = True
+        self.flush_interval = 2.0
+        self.flush_batch = 500
+        self._app = None
+        self._buffer = deque(maxlen=10000)
+        self._reset_locks()
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+        if app is not None:
+            self.init_app(app)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('AUDIT_ENABLED', True)
+        self.asynchronous = app.config.get('AUDIT_ASYNC', True)
+        self.flush_interval = float(app.config.get('AUDIT_FLUSH_INTERVAL', 2.0))
+        self.flush_batch = int(app.config.get('AUDIT_FLUSH_BATCH', 500))
+        self._buffer = deque(self._buffer, maxlen=int(app.config.get('AUDIT_BUFFER_SIZE', 10000)))
+        if self._app is None:
+            atexit.register(self.flush_at_exit)
+        self._app = app
+
+    # ----------------------
+    # Writing
+    # ----------------------
+    def record(self, event_type, details=None, ip_address=None, username=None, user_id=None,
+               severity='INFO', **data):
+        """Queue one event; never blocks on the database"""
+        if not self.enabled or self._app is None:
+            return
+        event = {
+            'created_at': datetime.utcnow(),
+            'event_type': event_type,
+            'severity': severity if severity in SEVERITIES else 'INFO',
+            'user_id': user_id,
+            'username': username,
+            'ip_address': ip_address,
+            'details': details,
+            'data': data or None,
+        }
+        if self._pid != os.getpid():
+            # Forked: the parent's thread and lock holders don't exist here, and
+            # the parent writes the events it buffered
+            self._reset_locks()
+            self._buffer.clear()
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+            pending = len(self._buffer)
+
+        if not self.asynchronous:
+            self.flush()
+            return
+        self._ensure_worker()
+        if pending >= self.flush_batch:
+            self._wake.set()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit flush failed")
+
+    def flush(self):
+        """Write every buffered event now; returns the number written"""
+        from sqlalchemy import insert
+        from app import db
+        from app.models.audit import AuditEvent
+
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._buffer)
+                self._buffer.clear()
+            if not events:
+                return 0
+            try:
+                with self._app.app_context():
+                    with db.engine.begin() as conn:
+                        for i in range(0, len(events), self.flush_batch):
+                            conn.execute(insert(AuditEvent), events[i:i + self.flush_batch])
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Could not write {len(events)} audit events, keeping them buffered: {str(e)}")
+                with self._lock:
+                    # Put them back in front of anything recorded meanwhile, oldest dropped first
+                    room = self._buffer.maxlen - len(self._buffer)
+                    self.dropped += max(len(events) - room, 0)
+                    self._buffer.extendleft(reversed(events[-room:] if room else []))
+                return 0
+            self.written += len(events)
+            return len(events)
+
+    def flush_at_exit(self):
+        """Flush this process's buffer as it exits (atexit, or the prefork worker shutdown hook)"""
+        if self._buffer and self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit flush at exit failed")
+
+    def stats(self):
+        return {'buffered': len(self._buffer), 'written': self.written,
+                'dropped': self.dropped, 'failures': self.failures}
+
+
+# ----------------------
+# Reads
+# ----------------------
+def query_events(user_id=None, username=None, ip_address=None, event_type=None,
+                 since=None, until=None, before=None, limit=100):
+    """
+    Newest-first events matching every given filter. `before` is the id of
+    the last event of the previous page.
+    """
+    from app import db
+    from app.models.audit import AuditEvent
+
+    query = AuditEvent.query
+    if user_id is not None:
+        query = query.filter(AuditEvent.user_id == user_id)
+    if username:
+        query = query.filter(AuditEvent.username == username)
+    if ip_address:
+        query = query.filter(AuditEvent.ip_address == ip_address)
+    if event_type:
+        query = query.filter(AuditEvent.event_type == event_type)
+    if since is not None:
+        query = query.filter(AuditEvent.created_at >= since)
+    if until is not None:
+        query = query.filter(AuditEvent.created_at < until)
+    if before is not None:
+        cursor = db.session.get(AuditEvent, before)
+        if cursor is not None:
+            query = query.filter(db.or_(
+                AuditEvent.created_at < cursor.created_at,
+                db.and_(AuditEvent.created_at == cursor.created_at, AuditEvent.id < cursor.id)
+            ))
+    limit = max(1, min(int(limit), MAX_QUERY_LIMIT))
+    return query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit).all()
+
+
+def prune_events(days):
+    """Delete events older than `days`; returns the number removed"""
+    from app import db
+    from app.models.audit import AuditEvent
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = db.session.execute(db.delete(AuditEvent).where(AuditEvent.created_at < cutoff)).rowcount
+    db.session.commit()
+    return removed
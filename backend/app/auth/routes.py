@@ -12,10 +12,12 @@ from app.auth.utils import (
     record_successful_login,
     check_reset_rate_limit,
     record_reset_attempt,
-    sanitize_input
+    sanitize_input,
+    cleanup_expired_sessions
 )
+from app.sessions import regenerate_session, revoke_user_sessions, get_session_store
 from app.models.user import User
-from app import db
+from app import db, audit_log, login_tracker
 from datetime import datetime, timedelta
 import logging
 from functools import wraps
@@ -54,8 +56,10 @@ def rate_limit(key, max_attempts=None, window_minutes=None):
     rate_limit_storage[key].append(now)
     return True
 
-def log_security_event(event_type, details, ip_address, username=None, severity="INFO"):
-    """Centralized security logging"""
+def log_security_event(event_type, details, ip_address, username=None, severity="INFO", user_id=None, **data):
+    """Centralized security logging: to the log, and to the audit store (see app.audit)"""
+    audit_log.record(event_type, details, ip_address, username=username, user_id=user_id,
+                     severity=severity, **data)
     log_message = f"SECURITY EVENT [{event_type}] - IP: {ip_address}"
     if username:
         log_message += f" - User: {username}"
@@ -125,18 +129,24 @@ def login(data):
             # Check if account is locked
             can_login, error_message = check_login_attempts(user)
             if not can_login:
+                log_security_event("LOGIN_BLOCKED", "Correct password on a locked account", client_ip,
+                                   username, "WARNING", user_id=user.id)
                 return jsonify({"login": "failed", "error": error_message}), 423
 
-            # Clear session and login user
+            # Clear session (with a fresh id) and login user
             session.clear()
+            regenerate_session(session)
             record_successful_login(user)
-            login_user(user, remember=True)
+            # Server-side sessions already persist; a remember-me cookie would
+            # survive session revocation, so it's only issued for cookie sessions
+            login_user(user, remember=get_session_store(current_app) is None)
 
             # Set session properties
             session.permanent = True
             session.modified = True
 
-            log_security_event("LOGIN_SUCCESS", "User logged in successfully", client_ip, username, "INFO")
+            log_security_event("LOGIN_SUCCESS", "User logged in successfully", client_ip, username, "INFO",
+                               user_id=user.id)
             return jsonify({
                              "login": "successful", 
                              "user_id": user.id,
@@ -147,8 +157,12 @@ def login(data):
         else:
             # Handle failed login attempts
             if user:
-                error_message = record_failed_login(user)
-                log_security_event("LOGIN_FAILED", f"Wrong password (attempt {user.failed_login_attempts})", client_ip, username, "WARNING")
+                error_message, attempts, locked_until = record_failed_login(user)
+                log_security_event("LOGIN_FAILED", f"Wrong password (attempt {attempts})", client_ip, username, "WARNING",
+                                   user_id=user.id, attempt=attempts)
+                if locked_until is not None:
+                    log_security_event("ACCOUNT_LOCKED", f"Locked until {locked_until.isoformat()}", client_ip,
+                                       username, "WARNING", user_id=user.id)
             else:
                 error_message = "Non-existent username"
                 log_security_event("LOGIN_FAILED", "Non-existent username", client_ip, username, "WARNING")
@@ -243,7 +257,7 @@ def reset_password(data):
         reset_window_minutes = int(current_app.config.get('RESET_RATE_LIMIT_WINDOW', 3600)) // 60
         
         if not rate_limit(f"reset_{client_ip}", max_reset_attempts, reset_window_minutes):
-            logger.warning(f"Rate limit exceeded for password reset from IP: {client_ip}")
+            log_security_event("RATE_LIMIT_EXCEEDED", "Password reset requests", client_ip, severity="WARNING", email=email)
             return jsonify({"reset": "failed", "error": "Too many reset requests. Please try again later."}), 429
 
         user = User.query.filter(db.func.lower(User.email) == email.lower()).first()
@@ -261,13 +275,15 @@ def reset_password(data):
             
             record_reset_attempt(user)
             send_password_reset_email(user)
-            logger.info(f"Password reset requested for email: {email}")
+            log_security_event("PASSWORD_RESET_REQUESTED", f"Reset email sent to {email}", client_ip,
+                               user.username, user_id=user.id)
             
             # Only successful if user exists and email is sent
             return jsonify({"reset": "successful"}), 200
 
         else:
-            logger.warning(f"Password reset requested for non-existent email: {email}")
+            log_security_event("PASSWORD_RESET_UNKNOWN_EMAIL", f"Reset requested for non-existent email: {email}",
+                               client_ip, severity="WARNING", email=email)
             return jsonify({"reset": "failed", "error": "Email does not exist!"}), 404
 
     except Exception as e:
@@ -288,7 +304,8 @@ def api_password_reset_confirm(token, data):
         user = User.query.filter_by(reset_token=token).first()
 
         if not user:
-            logger.warning(f"Invalid password reset token attempted: {token[:10]}...")
+            log_security_event("PASSWORD_RESET_INVALID_TOKEN", f"Invalid password reset token attempted: {token[:10]}...",
+                               request.remote_addr, severity="WARNING")
             return jsonify({"reset": "invalidToken"}), 400
 
         # Check token expiration
@@ -316,12 +333,15 @@ def api_password_reset_confirm(token, data):
         user.password_hash = generate_password_hash(new_password)
         user.reset_token = None
         user.reset_token_expiry = None
-        user.failed_login_attempts = 0
-        user.locked_until = None
         
         db.session.commit()
+        login_tracker.reset(user.id)
 
-        logger.info(f"Password reset completed for user: {user.username}")
+        # Sign the account out everywhere
+        revoked = revoke_user_sessions(current_app, user.id)
+
+        log_security_event("PASSWORD_RESET_COMPLETED", f"{revoked} sessions revoked", request.remote_addr,
+                           user.username, user_id=user.id)
         return jsonify({"reset": "successful"}), 200
 
     except Exception as e:
@@ -453,15 +473,17 @@ def get_current_user():
 
 
 # ----------------------
-# Session cleanup on app startup
+# Periodic expired-session sweep
 # ----------------------
-@bp.before_app_request  # changed, "before_app_first_request" is removed in flask 2.3 
+_last_session_sweep = 0.0
+
+@bp.before_app_request
 def cleanup_sessions():
-    """Clean up any stale sessions on app startup"""
-    try:
-        # This would be implemented based the session storage
-        # For file-based sessions, to clean up old session files
-        # For Redis/database sessions, clean up expired entries
-        logger.info("Session cleanup completed")
-    except Exception as e:
-        logger.error(f"Session cleanup error: {str(e)}")
\ No newline at end of file
+    """Sweep expired server-side sessions at most once per SESSION_SWEEP_INTERVAL"""
+    global _last_session_sweep
+    interval = current_app.config.get('SESSION_SWEEP_INTERVAL', 600)
+    now = time.monotonic()
+    if now - _last_session_sweep < interval:
+        return
+    _last_session_sweep = now
+    cleanup_expired_sessions()
@@ -1,10 +1,10 @@
 import secrets
 import os
 from flask import url_for, current_app
-from flask_mail import Message
 from werkzeug.security import generate_password_hash
-from app import mail, db
+from app import mail, db, login_tracker
 from app.models.user import User
+from app.sessions import get_session_store
 from datetime import datetime, timedelta
 import logging
 import re
@@ -289,50 +289,42 @@ def create_user(username, email, password, age=None, sex=None):
 # Login attempt management 
 # ----------------------
 def check_login_attempts(user):
-    """Check if user has exceeded maximum login attempts"""
-    max_attempts = int(current_app.config.get('MAX_LOGIN_ATTEMPTS', 10))
-    lockout_duration = int(current_app.config.get('LOGIN_LOCKOUT_DURATION', 900))  # seconds
-    
-    if user.failed_login_attempts >= max_attempts:
-        # Since you don't have last_failed_login, use locked_until instead
-        if user.locked_until and user.locked_until > datetime.utcnow():
-            remaining_time = (user.locked_until - datetime.utcnow()).total_seconds()
-            return False, f"Account locked. Try again in {int(remaining_time // 60)} minutes."
-        elif user.locked_until and user.locked_until <= datetime.utcnow():
-            # Reset attempts after lockout period
-            user.failed_login_attempts = 0
-            user.locked_until = None
-            db.session.commit()
-    
+    """Check whether the account is locked (reads the attempt store, not the users row)"""
+    locked_until = login_tracker.locked_until(user.id)
+    if locked_until is not None:
+        remaining_time = (locked_until - datetime.utcnow()).total_seconds()
+        return False, f"Account locked. Try again in {int(remaining_time // 60)} minutes."
     return True, None
 
 
-
 def record_failed_login(user):
-    """Record a failed login attempt (without last_failed_login)"""
-    user.failed_login_attempts += 1
-    
-    max_attempts = int(current_app.config.get('MAX_LOGIN_ATTEMPTS', 10))
-    lockout_duration = int(current_app.config.get('LOGIN_LOCKOUT_DURATION', 900))
-    
-    if user.failed_login_attempts >= max_attempts:
-        user.locked_until = datetime.utcnow() + timedelta(seconds=lockout_duration)
-    
-    db.session.commit()
-    
-    remaining_attempts = max_attempts - user.failed_login_attempts
-    
+    """
+    Count a failed login in the attempt store, locking the account after
+    MAX_LOGIN_ATTEMPTS. Returns (message, attempts, locked_until) where
+    locked_until is only set when this attempt started the lockout.
+    """
+    max_attempts = login_tracker.max_attempts
+    lockout_duration = login_tracker.lockout
+
+    locked_until = login_tracker.locked_until(user.id)
+    if locked_until is not None:
+        # Already locked: don't count (or extend) while the lockout runs
+        remaining_time = (locked_until - datetime.utcnow()).total_seconds()
+        return f"Account locked. Try again in {int(remaining_time // 60)} minutes.", max_attempts, None
+
+    attempts, locked_until = login_tracker.record_failure(user.id)
+    remaining_attempts = max_attempts - attempts
+
     if remaining_attempts <= 0:
-        return f"Account locked due to too many failed attempts. Try again in {lockout_duration // 60} minutes."
+        return (f"Account locked due to too many failed attempts. Try again in {lockout_duration // 60} minutes.",
+                attempts, locked_until)
     else:
-        return f"Invalid credentials. {remaining_attempts} attempts remaining."
+        return f"Invalid credentials. {remaining_attempts} attempts remaining.", attempts, None
 
 def record_successful_login(user):
-    """Record a successful login and reset failed attempts (without last_failed_login)"""
-    user.failed_login_attempts = 0
-    user.locked_until = None
-    user.last_login = datetime.utcnow()  
-    db.session.commit()
+    """Clear failed attempts and queue last_login for the next batched write"""
+    login_tracker.reset(user.id)
+    login_tracker.touch(user.id)
 
 # ----------------------
 # Password reset rate limiting 
@@ -463,16 +455,17 @@ def is_safe_redirect_url(url):
 # Session cleanup utility
 # ----------------------
 def cleanup_expired_sessions():
-    """Clean up expired sessions"""
+    """Delete expired server-side sessions; returns the number removed"""
     try:
-        # This would be implemented based on your session storage backend
-        # For file-based sessions: clean up old files
-        # For Redis: use TTL
-        # For database: delete expired records
-        
-        logger.info("Session cleanup completed")
-        return True
+        store = get_session_store(current_app)
+        if store is None:
+            return 0
+
+        count = store.sweep()
+        if count:
+            logger.info(f"Cleaned up {count} expired sessions")
+        return count
         
     except Exception as e:
         logger.error(f"Session cleanup failed: {str(e)}")
-        return False
\ No newline at end of file
+        return 0
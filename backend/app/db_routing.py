@@ -0,0 +1,81 @@
+import time
+import logging
+from functools import wraps
+from flask import has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+_USE_REPLICA_KEY = 'use_replica'
+_WROTE_KEY = 'routing_wrote'
+# Flask session key: until this timestamp the user's reads stay on the primary
+STICKY_SESSION_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the replica bind while a @read_replica view
+    is running. Flushes and DML statements always go to the primary, as does
+    everything when no replica is configured.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(_USE_REPLICA_KEY) and not self._flushing \
+                and not isinstance(clause, UpdateBase):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_write(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    """Read-your-writes: after a user's commit, keep their reads on the primary for a while"""
+    if not session.info.pop(_WROTE_KEY, False) or REPLICA_BIND not in session._db.engines:
+        return
+    if has_request_context() and flask_session.get('_user_id'):
+        from flask import current_app
+        window = current_app.config.get('REPLICA_STICKY_SECONDS', 10)
+        flask_session[STICKY_SESSION_KEY] = time.time() + window
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop(_WROTE_KEY, None)
+
+
+def init_read_replica(app):
+    """Register DATABASE_REPLICA_URL as the replica bind (call before db.init_app)"""
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if not replica_url:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPLICA_BIND] = replica_url
+    app.config['SQLALCHEMY_BINDS'] = binds
+    logger.info("Read replica configured for reporting endpoints")
+
+
+def read_replica(view):
+    """Serve the view's reads from the replica, unless the user wrote recently"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from app import db
+
+        if flask_session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return view(*args, **kwargs)
+
+        db.session.info[_USE_REPLICA_KEY] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            db.session.info.pop(_USE_REPLICA_KEY, None)
+
+    return wrapper
@@ -0,0 +1,207 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import DateTime, event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """
+    Short-TTL cache of user rows for the Flask-Login user loader.
+
+    Rows are cached as plain column snapshots (in-process LRU, or Redis when
+    IDENTITY_CACHE_BACKEND = 'redis') and re-attached to the request session
+    with merge(load=False), so authenticated requests skip the users SELECT.
+    Entries are invalidated after any committed UPDATE/DELETE of a user.
+    The LRU is per process, so with several workers an invalidation only
+    reaches the worker that made the change; servers refuse or warn about
+    that (app.prefork.check_shared_state). Redis errors are logged and the
+    user is loaded from the database.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 30
+        self.maxsize = 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_errors = ()
+        self._key_prefix = 'identity:'
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.store_errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('IDENTITY_CACHE_ENABLED', True)
+        self.ttl = int(app.config.get('IDENTITY_CACHE_TTL', 30))
+        self.maxsize = int(app.config.get('IDENTITY_CACHE_SIZE', 1024))
+
+        if app.config.get('IDENTITY_CACHE_BACKEND') == 'redis':
+            import redis
+            self._redis = redis.Redis.from_url(app.config['REDIS_URL'])
+            self._redis_errors = redis.RedisError
+
+        _register_invalidation_hooks(self)
+
+    @property
+    def shared(self):
+        """Whether entries (and invalidations) are shared between processes"""
+        return self._redis is not None
+
+    def _redis_failed(self, action, user_id, error):
+        with self._lock:
+            self.store_errors += 1
+        logger.warning(f"Identity cache {action} for user {user_id} failed: {str(error)}")
+
+    # ----------------------
+    # Storage
+    # ----------------------
+    def get(self, user_id):
+        if not self.enabled:
+            return None
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(f"{self._key_prefix}{user_id}")
+            except self._redis_errors as e:
+                self._redis_failed('read', user_id, e)
+                raw = None  # falls through to the database
+            row = _decode_row(raw) if raw else None
+        else:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(user_id)
+                    row = entry[1]
+                else:
+                    if entry:
+                        del self._entries[user_id]
+                    row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row
+
+    def set(self, user_id, row):
+        if not self.enabled:
+            return
+
+        if self._redis is not None:
+            try:
+                self._redis.setex(f"{self._key_prefix}{user_id}", self.ttl, _encode_row(row))
+            except self._redis_errors as e:
+                self._redis_failed('write', user_id, e)
+            return
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, row)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"{self._key_prefix}{user_id}")
+            except self._redis_errors as e:
+                # The entry can outlive the change until its TTL expires
+                self._redis_failed('invalidation', user_id, e)
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'redis' if self.shared else 'memory',
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'store_errors': self.store_errors,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    # ----------------------
+    # Loader
+    # ----------------------
+    def load_user(self, user_id):
+        """Return the User for `user_id`, from cache when possible"""
+        from app import db
+        from app.models.user import User
+
+        row = self.get(user_id)
+        if row is not None:
+            user = User(**row)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.set(user_id, _snapshot(user))
+        return user
+
+
+def _snapshot(user):
+    return {attr.key: getattr(user, attr.key) for attr in sa_inspect(user).mapper.column_attrs}
+
+
+def _encode_row(row):
+    return json.dumps({k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in row.items()})
+
+
+def _decode_row(raw):
+    from app.models.user import User
+    row = json.loads(raw)
+    for column in User.__table__.columns:
+        value = row.get(column.key)
+        if value is not None and isinstance(column.type, DateTime):
+            row[column.key] = datetime.fromisoformat(value)
+    return row
+
+
+_hooks_registered = False
+
+
+def _register_invalidation_hooks(cache):
+    """Invalidate cached users once the transaction that changed them commits"""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    _hooks_registered = True
+
+    from app.models.user import User
+
+    def _mark_dirty(mapper, connection, target):
+        session = sa_inspect(target).session
+        if session is not None:
+            session.info.setdefault('identity_cache_dirty', set()).add(target.id)
+
+    event.listen(User, 'after_update', _mark_dirty)
+    event.listen(User, 'after_delete', _mark_dirty)
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate_committed(session):
+        for user_id in session.info.pop('identity_cache_dirty', ()):
+            cache.invalidate(user_id)
@@ -0,0 +1,250 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryAttemptStore:
+    """Per-process failed-login counters and lockouts (lost on restart, not shared between workers)"""
+
+    def __init__(self):
+        self._failures = {}  # user_id -> (count, expires_at)
+        self._locks = {}  # user_id -> locked_until
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def locked_until(self, user_id):
+        with self._lock:
+            until = self._locks.get(user_id)
+            if until is not None and until <= time.time():
+                del self._locks[user_id]
+                return None
+            return until
+
+    def record_failure(self, user_id, max_attempts, window, lockout):
+        now = time.time()
+        with self._lock:
+            count, expires_at = self._failures.get(user_id, (0, 0))
+            if expires_at <= now:
+                count, expires_at = 0, now + window
+            count += 1
+            until = None
+            if count >= max_attempts:
+                until = now + lockout
+                self._locks[user_id] = until
+                self._failures.pop(user_id, None)
+            else:
+                self._failures[user_id] = (count, expires_at)
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._sweep(now)
+            return count, until
+
+    def reset(self, user_id):
+        with self._lock:
+            self._failures.pop(user_id, None)
+            self._locks.pop(user_id, None)
+
+    def _sweep(self, now):
+        self._failures = {k: v for k, v in self._failures.items() if v[1] > now}
+        self._locks = {k: v for k, v in self._locks.items() if v > now}
+
+
+class RedisAttemptStore:
+    """Failed-login counters and lockouts shared by every worker, expired by Redis TTLs"""
+
+    def __init__(self, client, prefix='login:'):
+        self.redis = client
+        self.prefix = prefix
+
+    def _keys(self, user_id):
+        return f"{self.prefix}failures:{user_id}", f"{self.prefix}locked:{user_id}"
+
+    def locked_until(self, user_id):
+        raw = self.redis.get(self._keys(user_id)[1])
+        return float(raw) if raw is not None else None
+
+    def record_failure(self, user_id, max_attempts, window, lockout):
+        failures_key, locked_key = self._keys(user_id)
+        pipe = self.redis.pipeline()
+        # The window starts with the first failure: SET NX gives the counter its
+        # TTL once and INCR keeps it
+        pipe.set(failures_key, 0, ex=window, nx=True)
+        pipe.incr(failures_key)
+        count = pipe.execute()[1]
+        until = None
+        if count >= max_attempts:
+            until = time.time() + lockout
+            pipe = self.redis.pipeline()
+            pipe.set(locked_key, until, ex=lockout)
+            pipe.delete(failures_key)
+            pipe.execute()
+        return count, until
+
+    def reset(self, user_id):
+        self.redis.delete(*self._keys(user_id))
+
+
+class LoginTracker:
+    """
+    Login bookkeeping that keeps the users table out of the login path.
+
+    Failed-attempt counters (over LOGIN_ATTEMPT_WINDOW seconds) and
+    lockouts live in an attempt store (Redis with TTLs when
+    LOGIN_ATTEMPTS_BACKEND = 'redis', falling back to process memory while
+    Redis is unreachable). last_login is buffered and written in one batched
+    UPDATE every LAST_LOGIN_FLUSH_INTERVAL seconds by a background thread,
+    and at exit or when a worker stops; since that UPDATE bypasses the ORM,
+    the identity cache entries of the users it touches are invalidated
+    explicitly.
+    """
+
+    def __init__(self, app=None):
+        self.max_attempts = 5
+        self.window = 900
+        self.lockout = 900
+        self.flush_interval = 30.0
+        self._app = None
+        self._memory = MemoryAttemptStore()
+        self._store = self._memory
+        self._pending = {}
+        self._reset_locks()
+        self.written = 0
+        self.store_errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        self.max_attempts = int(app.config.get('MAX_LOGIN_ATTEMPTS', 5))
+        self.window = int(app.config.get('LOGIN_ATTEMPT_WINDOW', 900))
+        self.lockout = int(app.config.get('LOGIN_LOCKOUT_DURATION', 900))
+        self.flush_interval = float(app.config.get('LAST_LOGIN_FLUSH_INTERVAL', 30))
+
+        if app.config.get('LOGIN_ATTEMPTS_BACKEND') == 'redis':
+            import redis
+            self._store = RedisAttemptStore(
+                redis.Redis.from_url(app.config['REDIS_URL']),
+                prefix=app.config.get('LOGIN_ATTEMPTS_KEY_PREFIX', 'login:')
+            )
+        if self._app is None:
+            atexit.register(self.flush_at_exit)
+        self._app = app
+
+    @property
+    def shared(self):
+        """Whether counters are shared between processes (Redis) rather than per process"""
+        return isinstance(self._store, RedisAttemptStore)
+
+    # ----------------------
+    # Attempts
+    # ----------------------
+    def _call(self, method, *args):
+        try:
+            return getattr(self._store, method)(*args)
+        except Exception as e:
+            if self._store is self._memory:
+                raise
+            self.store_errors += 1
+            logger.warning(f"Login attempt store unavailable, using process memory: {str(e)}")
+            return getattr(self._memory, method)(*args)
+
+    def locked_until(self, user_id):
+        """The lockout's end as a naive UTC datetime, or None"""
+        until = self._call('locked_until', user_id)
+        return datetime.utcfromtimestamp(until) if until else None
+
+    def record_failure(self, user_id):
+        """Count a failed attempt; returns (attempts, locked_until or None)"""
+        count, until = self._call('record_failure', user_id, self.max_attempts, self.window, self.lockout)
+        return count, datetime.utcfromtimestamp(until) if until else None
+
+    def reset(self, user_id):
+        self._call('reset', user_id)
+
+    # ----------------------
+    # last_login
+    # ----------------------
+    def touch(self, user_id, when=None):
+        """Queue a last_login update for the next batch"""
+        if self._pid != os.getpid():
+            # Forked: the parent's thread doesn't exist here and it writes its own queue
+            self._reset_locks()
+            self._pending = {}
+        with self._lock:
+            self._pending[user_id] = when or datetime.utcnow()
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("last_login flush failed")
+
+    def flush(self):
+        """Write queued last_login values now; returns the number of users updated"""
+        from sqlalchemy import update, bindparam
+        from app import db, identity_cache
+        from app.models.user import User
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            rows = [{'user_id': user_id, 'login_time': when} for user_id, when in pending.items()]
+            statement = (update(User.__table__)
+                         .where(User.__table__.c.id == bindparam('user_id'))
+                         .values(last_login=bindparam('login_time')))
+            try:
+                with self._app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(statement, rows)
+            except Exception as e:
+                logger.warning(f"Could not write last_login for {len(rows)} users, retrying later: {str(e)}")
+                with self._lock:
+                    for user_id, when in pending.items():
+                        self._pending.setdefault(user_id, when)  # a newer login wins
+                return 0
+            for user_id in pending:
+                identity_cache.invalidate(user_id)
+            self.written += len(rows)
+            return len(rows)
+
+    def flush_at_exit(self):
+        """Flush this process's queue as it exits (atexit, or the prefork worker shutdown hook)"""
+        if self._pending and self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("last_login flush at exit failed")
+
+    def stats(self):
+        return {
+            'backend': 'redis' if self.shared else 'memory',
+            'pending_last_login': len(self._pending),
+            'last_login_written': self.written,
+            'store_errors': self.store_errors,
+        }
@@ -0,0 +1,98 @@
+import os
+import hashlib
+import mimetypes
+import threading
+from flask import current_app, request, abort
+from werkzeug.utils import safe_join, send_file
+
+# Precompressed siblings (e.g. "file.js.br") served when the client accepts them
+PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def file_etag(path):
+    """Strong content-hash ETag, recomputed only when the file's size/mtime change"""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:32]
+
+    with _etag_lock:
+        _etag_cache[path] = (stamp, etag)
+    return etag
+
+
+def _select_variant(path):
+    """Pick a precompressed variant the client accepts, if one exists on disk"""
+    has_variants = False
+    for encoding, suffix in PRECOMPRESSED_VARIANTS:
+        candidate = path + suffix
+        if os.path.isfile(candidate):
+            has_variants = True
+            if request.accept_encodings[encoding]:
+                return candidate, encoding, True
+    return path, None, has_variants
+
+
+def send_media(directory, filename, mimetype=None, max_age=None, immutable=False):
+    """
+    Serve a file from `directory` with strong ETags, Range support and cache headers.
+
+    Conditional requests (If-None-Match / If-Range) and byte ranges are answered
+    by werkzeug. When MEDIA_OFFLOAD is 'x-accel-redirect' (nginx) or 'x-sendfile'
+    (apache/lighttpd) the front proxy streams the bytes instead of the worker.
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    serve_path, encoding, has_variants = _select_variant(path)
+    offload = current_app.config.get('MEDIA_OFFLOAD')
+
+    if offload == 'x-accel-redirect':
+        static_root = os.path.abspath(current_app.static_folder)
+        relative = os.path.relpath(os.path.abspath(serve_path), static_root)
+        if relative.startswith('..'):
+            abort(404)
+        response = current_app.response_class(mimetype=mimetype)
+        prefix = current_app.config.get('MEDIA_ACCEL_PREFIX', '/_media/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relative.replace(os.sep, '/')
+        response.set_etag(file_etag(serve_path))
+    else:
+        response = send_file(
+            serve_path,
+            request.environ,
+            mimetype=mimetype,
+            conditional=True,
+            etag=file_etag(serve_path),
+            max_age=max_age,
+            use_x_sendfile=(offload == 'x-sendfile'),
+            response_class=current_app.response_class,
+            _root_path=current_app.root_path
+        )
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if has_variants:
+        response.vary.add('Accept-Encoding')
+
+    response.cache_control.public = True
+    response.cache_control.no_cache = None
+    if max_age is not None:
+        response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,171 @@
+import os
+import re
+import io
+import glob
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Square WebP variants written for every uploaded photo; the default one is
+# written before User.profile_photo points to it, the others in the background.
+PHOTO_VARIANT_SIZES = (64, 256)
+PHOTO_DEFAULT_SIZE = 256
+PHOTO_ALLOWED_FORMATS = {'PNG', 'JPEG', 'WEBP'}
+PHOTO_WEBP_QUALITY = 80
+
+_VARIANT_RE = re.compile(r'^(user_\d+_[0-9a-f]{16})_(\d+)\.webp$')
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='photo-pipeline')
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class PhotoRejected(ValueError):
+    """Raised when an uploaded photo fails format or size validation"""
+
+
+def inspect_photo(data, max_pixels):
+    """Validate an upload from its header only (no pixel decode); returns (format, size)"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            size = img.size
+    except (Image.DecompressionBombError, OSError, ValueError):
+        raise PhotoRejected("Invalid image file")
+
+    if fmt not in PHOTO_ALLOWED_FORMATS:
+        raise PhotoRejected("Invalid file type")
+    if size[0] * size[1] > max_pixels:
+        raise PhotoRejected("Image dimensions are too large")
+    return fmt, size
+
+
+def preload_imaging(app):
+    """Prefork preload hook: import Pillow and its WebP/JPEG/PNG plugins in the master"""
+    from PIL import Image
+
+    Image.init()
+
+
+def photo_stem(user_id, data):
+    """Content-hashed base name shared by all variants of one upload"""
+    return f"user_{user_id}_{hashlib.sha256(data).hexdigest()[:16]}"
+
+
+def variant_filename(stem, size):
+    return f"{stem}_{size}.webp"
+
+
+def photo_variants(filename):
+    """Map variant size -> filename for a stored profile photo (legacy uploads have one file)"""
+    if not filename:
+        return {}
+    match = _VARIANT_RE.match(filename)
+    if not match:
+        return {'original': filename}
+    return {str(size): variant_filename(match.group(1), size) for size in PHOTO_VARIANT_SIZES}
+
+
+def is_hashed_variant(filename):
+    return bool(_VARIANT_RE.match(filename or ''))
+
+
+def render_variants(data, folder, stem, sizes=PHOTO_VARIANT_SIZES):
+    """Decode, apply EXIF orientation, and write metadata-free square WebP thumbnails"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        for size in sizes:
+            thumb = ImageOps.fit(img, (size, size), Image.LANCZOS)
+            target = os.path.join(folder, variant_filename(stem, size))
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            thumb.save(tmp, format='WEBP', quality=PHOTO_WEBP_QUALITY, method=6)
+            os.replace(tmp, target)
+
+
+def remove_previous_photos(folder, user_id, keep_stem):
+    """Delete a user's older uploads (call once profile_photo points at keep_stem)"""
+    for path in glob.glob(os.path.join(folder, f"user_{user_id}_*")):
+        if not os.path.basename(path).startswith(keep_stem):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _process_photo(data, folder, stem, sizes):
+    try:
+        render_variants(data, folder, stem, sizes)
+        logger.info(f"Profile photo variants written for {stem}")
+    except Exception as e:
+        logger.error(f"Profile photo processing failed for {stem}: {str(e)}")
+        raise
+
+
+def _discard_pending(stem, future):
+    with _pending_lock:
+        if _pending.get(stem) is future:
+            del _pending[stem]
+
+
+def submit_photo(data, folder, user_id):
+    """
+    Write the default variant now and queue the other sizes in the
+    background; returns the content-hashed stem. Raises PhotoRejected if the
+    image can't be decoded, so nothing points at a variant that won't exist.
+    """
+    stem = photo_stem(user_id, data)
+    os.makedirs(folder, exist_ok=True)
+    try:
+        render_variants(data, folder, stem, sizes=(PHOTO_DEFAULT_SIZE,))
+    except Exception as e:
+        logger.warning(f"Profile photo decode failed for {stem}: {str(e)}")
+        raise PhotoRejected("Invalid image file")
+
+    others = tuple(size for size in PHOTO_VARIANT_SIZES if size != PHOTO_DEFAULT_SIZE)
+    if not others:
+        return stem
+    with _pending_lock:
+        if stem in _pending:
+            return stem
+        future = _executor.submit(_process_photo, data, folder, stem, others)
+        _pending[stem] = future
+    future.add_done_callback(lambda f: _discard_pending(stem, f))
+    return stem
+
+
+def wait_for_variant(folder, filename, timeout=10):
+    """
+    Make sure a variant exists before it is served: wait for it if this
+    process is still rendering it, otherwise (another worker took the upload,
+    or the background render failed) render it from the default variant.
+    """
+    match = _VARIANT_RE.match(filename or '')
+    if not match:
+        return
+    with _pending_lock:
+        future = _pending.get(match.group(1))
+    if future is not None:
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            pass
+
+    size = int(match.group(2))
+    source = os.path.join(folder, variant_filename(match.group(1), PHOTO_DEFAULT_SIZE))
+    if size not in PHOTO_VARIANT_SIZES or os.path.exists(os.path.join(folder, filename)) \
+            or not os.path.exists(source):
+        return
+    try:
+        with open(source, 'rb') as f:
+            render_variants(f.read(), folder, match.group(1), sizes=(size,))
+    except Exception as e:
+        logger.error(f"Profile photo variant {filename} could not be rendered: {str(e)}")
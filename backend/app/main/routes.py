@@ -2,10 +2,24 @@ from flask_login import login_required, current_user
 from app.main import bp
 from app.models.score import Score
 import os
-from flask import request, jsonify, current_app, send_from_directory, send_file
-from werkzeug.utils import secure_filename
+from flask import request, jsonify, current_app, url_for
 from app.models.user import User
+from app.tests.protocols import get_registry
+from app.main.media import send_media
+from app.main.photos import (
+    PhotoRejected,
+    PHOTO_DEFAULT_SIZE,
+    inspect_photo,
+    submit_photo,
+    variant_filename,
+    photo_variants,
+    is_hashed_variant,
+    wait_for_variant,
+    remove_previous_photos
+)
 from app import db
+from app.db_routing import read_replica
+from app.serialization import list_payload
 """
 @bp.route('/')   #handeled by react app
 def index():
@@ -16,8 +30,41 @@ from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 
 
+@bp.route('/session', methods=['GET'])
+def api_session():
+    """
+    Bootstrap payload for the SPA: login state, role, profile, photo variants
+    and completed tests in a single round-trip.
+    """
+    if not current_user.is_authenticated:
+        response = jsonify({"logged": "false", "isAdmin": "false", "user": None, "tests": None})
+    else:
+        user = current_user
+        is_admin = getattr(user, 'role', None) == 'admin' or user.username == 'admin'
+        response = jsonify({
+            "logged": "true",
+            "isAdmin": "true" if is_admin else "false",
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "role": user.role,
+                "profile_photo": user.profile_photo,
+                "photo_variants": _photo_variant_urls(user.profile_photo)
+            },
+            "tests": {
+                "completed": user.completed_tests()
+            }
+        })
+
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    response.vary.add('Cookie')
+    return response
+
+
 @bp.route('/user-profile', methods=['GET'])
 @login_required
+@read_replica
 def api_user_profile():
     # Use Flask-Login's current_user instead of session
     user = current_user
@@ -47,6 +94,7 @@ def api_user_profile():
     all_scores = q.all()
 
     # approved/total logic
+    registry = get_registry(current_app)
     approved = set()
     totals = {}
     for s in all_scores:
@@ -55,11 +103,11 @@ def api_user_profile():
             continue
         group = Score.query.filter_by(user_id=s.user_id, test_number=s.test_number).all()
         rounds = {g.round_number for g in group}
-        if rounds == {1, 2, 3, 4, 5} and sorted(
+        if registry.is_complete(s.test_number, rounds) and sorted(
             [g.test_time for g in group]
         ) == [g.test_time for g in sorted(group, key=lambda x: x.round_number)]:
             approved.add(key)
-            totals[key] = sum(g.score for g in group)
+            totals[key] = registry.total(s.test_number, group)
 
     # build a flat list of rows
     rows = []
@@ -71,7 +119,9 @@ def api_user_profile():
             'score': s.score,
             'test_time': s.test_time.isoformat(),
             'approved': 'Yes' if key in approved else 'No',
-            'total_score': totals.get(key, 'N/A')
+            'total_score': totals.get(key, 'N/A'),
+            'recall': s.recall_timeline(),
+            'timing_source': s.timing_source
         })
 
     return jsonify({
@@ -81,17 +131,24 @@ def api_user_profile():
             "email": user.email,
             "profile_photo": user.profile_photo
         },
-        "scores": rows
+        "scores": list_payload(rows)
     })
 
 #----------------------profile photo------------------------ 
 
    
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _profile_photo_folder():
+    return os.path.join(current_app.static_folder, 'profile_photos')
+
+def _photo_variant_urls(filename):
+    return {size: url_for('main.get_profile_photo', filename=name)
+            for size, name in photo_variants(filename).items()}
+
 @bp.route('/upload-profile-photo', methods=['POST'])
 def upload_profile_photo():
     user_id = request.form.get('user_id')
@@ -102,32 +159,71 @@ def upload_profile_photo():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    if file and allowed_file(file.filename):
-        # Ensure upload folder exists
-        upload_folder = os.path.join(current_app.root_path, 'static/profile_photos')
-        os.makedirs(upload_folder, exist_ok=True)
+    if not (file and allowed_file(file.filename)):
+        return jsonify({"error": "Invalid file type"}), 400
 
-        # Make filename unique per user to avoid overwriting
-        filename = f"user_{user_id}_{secure_filename(file.filename)}"
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
 
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+    data = file.read()
+    max_bytes = current_app.config.get('PROFILE_PHOTO_MAX_BYTES', 5 * 1024 * 1024)
+    if len(data) > max_bytes:
+        return jsonify({"error": f"Photo is larger than {max_bytes // (1024 * 1024)} MB"}), 413
 
-        user.profile_photo = filename
-        db.session.commit()
+    # The default-size thumbnail is written before profile_photo points at it;
+    # the other sizes are rendered in the background (all content-hashed)
+    folder = _profile_photo_folder()
+    try:
+        inspect_photo(data, current_app.config.get('PROFILE_PHOTO_MAX_PIXELS', 40_000_000))
+        stem = submit_photo(data, folder, user.id)
+    except PhotoRejected as e:
+        return jsonify({"error": str(e)}), 400
+    filename = variant_filename(stem, PHOTO_DEFAULT_SIZE)
 
-        return jsonify({"message": "Uploaded successfully", "photo": filename}), 200
+    user.profile_photo = filename
+    db.session.commit()
+    remove_previous_photos(folder, user.id, stem)
 
-    return jsonify({"error": "Invalid file type"}), 400
+    return jsonify({
+        "message": "Uploaded successfully",
+        "photo": filename,
+        "variants": _photo_variant_urls(filename)
+    }), 200
+
+@bp.route('/profile-photo/variants', methods=['GET'])
+@login_required
+def get_profile_photo_variants():
+    return jsonify({
+        "photo": current_user.profile_photo,
+        "variants": _photo_variant_urls(current_user.profile_photo)
+    })
 
 @bp.route('/profile_photos/<filename>')
 def get_profile_photo(filename):
-    return send_from_directory(os.path.join(current_app.root_path, 'static/profile_photos'), filename)
+    # Content-hashed variants never change, so they can be cached forever
+    if is_hashed_variant(filename):
+        wait_for_variant(_profile_photo_folder(), filename)
+        return send_media(
+            _profile_photo_folder(),
+            filename,
+            max_age=current_app.config.get('MEDIA_CACHE_MAX_AGE', 31536000),
+            immutable=True
+        )
+    return send_media(
+        _profile_photo_folder(),
+        filename,
+        max_age=current_app.config.get('PROFILE_PHOTO_CACHE_MAX_AGE', 300)
+    )
 
 
 @bp.route("/audio/<filename>")
 def serve_audio(filename):
-    return send_file(f"static/audio/{filename}", mimetype="audio/mp4", as_attachment=False)
+    # Stimulus recordings ship with the release and never change in place
+    return send_media(
+        os.path.join(current_app.static_folder, 'audio'),
+        filename,
+        mimetype="audio/mp4",
+        max_age=current_app.config.get('MEDIA_CACHE_MAX_AGE', 31536000),
+        immutable=True
+    )
@@ -1,4 +1,9 @@
 from app.models.user import User
 from app.models.score import Score
+from app.models.recording import Recording
+from app.models.session import UserSession
+from app.models.rollup import RoundRollup, TestRollup, RoundRollupLedger, TestRollupLedger, RollupState
+from app.models.audit import AuditEvent
 
-__all__ = ['User', 'Score']
\ No newline at end of file
+__all__ = ['User', 'Score', 'Recording', 'UserSession', 'RoundRollup', 'TestRollup',
+           'RoundRollupLedger', 'TestRollupLedger', 'RollupState', 'AuditEvent']
\ No newline at end of file
@@ -0,0 +1,41 @@
+from app import db
+from datetime import datetime
+
+
+class AuditEvent(db.Model):
+    """A security event (login, lockout, rate limit, password reset) written by app.audit"""
+    __tablename__ = 'audit_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    severity = db.Column(db.String(10), nullable=False, default='INFO')
+    user_id = db.Column(db.Integer)
+    username = db.Column(db.String(100))
+    ip_address = db.Column(db.String(45))
+    details = db.Column(db.Text)
+    data = db.Column(db.JSON)
+
+    # The admin panel filters by one of these and pages back in time
+    __table_args__ = (
+        db.Index('ix_audit_events_user_time', 'user_id', 'created_at'),
+        db.Index('ix_audit_events_username_time', 'username', 'created_at'),
+        db.Index('ix_audit_events_ip_time', 'ip_address', 'created_at'),
+        db.Index('ix_audit_events_type_time', 'event_type', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'event_type': self.event_type,
+            'severity': self.severity,
+            'user_id': self.user_id,
+            'username': self.username,
+            'ip_address': self.ip_address,
+            'details': self.details,
+            'data': self.data,
+        }
+
+    def __repr__(self):
+        return f'<AuditEvent {self.event_type} {self.username or self.ip_address}>'
@@ -0,0 +1,31 @@
+from app import db
+from datetime import datetime
+
+class Recording(db.Model):
+    __tablename__ = 'recordings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    test_number = db.Column(db.Integer, nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    file_path = db.Column(db.String(300), nullable=False)
+    codec = db.Column(db.String(10), nullable=False)
+    sample_rate = db.Column(db.Integer, nullable=False)
+    channels = db.Column(db.Integer, nullable=False, default=1)
+    size_bytes = db.Column(db.Integer)
+    original_format = db.Column(db.String(10))
+    original_size_bytes = db.Column(db.Integer)
+    duration = db.Column(db.Float)
+    rms_dbfs = db.Column(db.Float)
+    peak_dbfs = db.Column(db.Float)
+    clipping_ratio = db.Column(db.Float)
+    speech_fraction = db.Column(db.Float)
+    quality_flags = db.Column(db.String(100))  # comma-separated issue codes (flag mode)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_recording_user_test_round', 'user_id', 'test_number', 'round_number'),
+    )
+    
+    def __repr__(self):
+        return f'<Recording {self.file_path} ({self.codec}, {self.duration}s)>'
@@ -0,0 +1,65 @@
+from app import db
+from datetime import datetime
+
+# Rollup rows are kept per period: 'day' and 'week' (starting Monday) buckets,
+# plus one 'all' row per key whose period_start is ALL_TIME_START
+PERIODS = ('day', 'week', 'all')
+
+
+class RoundRollup(db.Model):
+    """Scored rounds and their score sum per period, test and round"""
+    __tablename__ = 'round_rollups'
+
+    period = db.Column(db.String(4), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    test_number = db.Column(db.Integer, primary_key=True)
+    round_number = db.Column(db.Integer, primary_key=True)
+    rounds = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<RoundRollup {self.period} {self.period_start} T{self.test_number}R{self.round_number}: {self.rounds}>'
+
+
+class TestRollup(db.Model):
+    """Completed tests and their total-score sum per period and test (bucketed by completion day)"""
+    __tablename__ = 'test_rollups'
+
+    period = db.Column(db.String(4), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    test_number = db.Column(db.Integer, primary_key=True)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    total_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<TestRollup {self.period} {self.period_start} T{self.test_number}: {self.completions}>'
+
+
+class RoundRollupLedger(db.Model):
+    """What each score row currently contributes to round_rollups (retakes replace it)"""
+    __tablename__ = 'round_rollup_ledger'
+
+    score_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    test_number = db.Column(db.Integer, nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class TestRollupLedger(db.Model):
+    """What each (user, test) currently contributes to test_rollups"""
+    __tablename__ = 'test_rollup_ledger'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    test_number = db.Column(db.Integer, primary_key=True)
+    completed_on = db.Column(db.Date)
+    total = db.Column(db.Float)
+
+
+class RollupState(db.Model):
+    """High-water mark over Score.updated_at for the incremental refresh"""
+    __tablename__ = 'rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    high_water = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 
 class Score(db.Model):
     __tablename__ = 'scores'
@@ -11,11 +12,74 @@ class Score(db.Model):
     score = db.Column(db.Float, nullable=False)
     correct_words = db.Column(db.JSON, nullable=False, default=[])
     incorrect_words = db.Column(db.JSON, nullable=False, default=[])
-    test_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    test_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # Last write to the row; the rollup refresh scans from a high-water mark on it
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Fused transcript in recall order, with packed (start_ms, end_ms) pairs
+    # per word (see app.tests.timing) and where the times came from:
+    # 'engine' word offsets or 'vad' alignment
+    recall_sequence = db.Column(db.JSON, nullable=True)
+    word_timings = db.Column(db.LargeBinary, nullable=True)
+    timing_source = db.Column(db.String(10), nullable=True)
+    # Version of the protocols/word-list file the round was scored against
+    word_list_version = db.Column(db.String(64), nullable=True)
     
     __table_args__ = (
-        db.Index('idx_user_test_round', 'user_id', 'test_number', 'round_number'),
+        # One row per round; a retaken round updates its row in place
+        db.Index('uq_scores_user_test_round', 'user_id', 'test_number', 'round_number', unique=True),
     )
     
+    @classmethod
+    def upsert_round(cls, user_id, test_number, round_number, **values):
+        """
+        Insert or overwrite the score of one round and return the row.
+
+        On SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING against uq_scores_user_test_round, so concurrent submissions
+        for the same round can't both insert.
+        """
+        key = {'user_id': user_id, 'test_number': test_number, 'round_number': round_number}
+        # ON CONFLICT DO UPDATE skips Column.onupdate, so stamp it explicitly
+        values.setdefault('updated_at', datetime.utcnow())
+        dialect = db.session.get_bind(mapper=cls).dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(cls).values(**key, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[cls.user_id, cls.test_number, cls.round_number],
+                set_={name: stmt.excluded[name] for name in values}
+            ).returning(cls)
+            return db.session.scalars(stmt, execution_options={'populate_existing': True}).one()
+
+        # Other dialects: read-then-write, resolving a lost insert race through
+        # the unique index
+        entry = cls.query.filter_by(**key).first()
+        if entry is None:
+            entry = cls(**key, **values)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(entry)
+                return entry
+            except IntegrityError:
+                entry = cls.query.filter_by(**key).one()
+        for name, value in values.items():
+            setattr(entry, name, value)
+        return entry
+    
+    def recall_timeline(self):
+        """[{'word', 'start_ms', 'end_ms'}, ...] in recall order (empty for rounds scored before timing)"""
+        from app.tests.timing import unpack_timings
+
+        timings = unpack_timings(self.word_timings)
+        return [
+            {'word': word, 'start_ms': start, 'end_ms': end}
+            for word, (start, end) in zip(self.recall_sequence or [], timings)
+        ]
+    
     def __repr__(self):
         return f'<Score {self.score} - Test {self.test_number}, Round {self.round_number}>'
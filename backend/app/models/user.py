@@ -1,3 +1,4 @@
+from flask import current_app
 from flask_login import UserMixin
 from app import db
 from datetime import datetime
@@ -12,7 +13,7 @@ class User(UserMixin, db.Model):
     age = db.Column(db.Integer)
     sex = db.Column(db.String(10))
     profile_photo = db.Column(db.String(200))
-    reset_token = db.Column(db.String(100))
+    reset_token = db.Column(db.String(100), index=True)
     reset_token_expiry = db.Column(db.DateTime)  
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     failed_login_attempts = db.Column(db.Integer, default=0)
@@ -21,6 +22,12 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     role = db.Column(db.String(20), default='user')
     
+    # Case-insensitive lookups in register and forgot-password
+    __table_args__ = (
+        db.Index('ix_users_email_lower', db.func.lower(email)),
+        db.Index('ix_users_username_lower', db.func.lower(username)),
+    )
+    
     # Relationships
     scores = db.relationship('Score', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
@@ -34,9 +41,26 @@ class User(UserMixin, db.Model):
         return self.scores.filter_by(test_number=test_number).all()
     
     def has_completed_test(self, test_number):
+        from app.tests.protocols import get_registry
         scores = self.get_scores_for_test(test_number)
         rounds = [score.round_number for score in scores]
-        return set(range(1, 6)) == set(rounds)
+        return get_registry(current_app).is_complete(test_number, rounds)
+    
+    def completed_tests(self):
+        """Test numbers with every protocol round recorded, from one grouped query"""
+        from app.models.score import Score
+        from app.tests.protocols import get_registry
+        registry = get_registry(current_app)
+        rows = (
+            db.session.query(Score.test_number, Score.round_number)
+            .filter(Score.user_id == self.id)
+            .distinct()
+            .all()
+        )
+        rounds = {}
+        for test_number, round_number in rows:
+            rounds.setdefault(test_number, set()).add(round_number)
+        return sorted(t for t, done in rounds.items() if registry.is_complete(t, done))
     
     # Required methods for Flask-Login
     def get_id(self):
@@ -0,0 +1,319 @@
+import gc
+import os
+import sys
+import time
+import errno
+import signal
+import socket
+import logging
+import importlib
+
+logger = logging.getLogger(__name__)
+
+_SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+# ----------------------
+# Memory accounting
+# ----------------------
+def process_memory(pid):
+    """
+    Memory of one process in kB from /proc/<pid>/smaps_rollup (Linux >= 4.14).
+    Pss splits shared pages between the processes that map them, so summing
+    Pss across workers gives the real footprint; Rss counts shared pages in
+    every worker.
+    """
+    usage = dict.fromkeys(_SMAPS_FIELDS)
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                key, _, rest = line.partition(':')
+                if key in usage:
+                    usage[key] = int(rest.split()[0])
+        return usage
+    except (FileNotFoundError, PermissionError):
+        pass
+
+    # Older kernels / no smaps: RSS only
+    try:
+        with open(f'/proc/{pid}/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    usage['Rss'] = int(line.split()[1])
+    except OSError:
+        pass
+    return usage
+
+
+def memory_report(master_pid, worker_pids):
+    """Per-process and total Rss/Pss for the master and its workers"""
+    rows = [('master', master_pid, process_memory(master_pid))]
+    rows += [(f'worker-{n}', pid, process_memory(pid)) for n, pid in enumerate(worker_pids, 1)]
+
+    def total(field):
+        values = [usage[field] for _, _, usage in rows]
+        return sum(values) if all(v is not None for v in values) else None
+
+    return {
+        'processes': [
+            {'name': name, 'pid': pid, **{k.lower(): v for k, v in usage.items()}}
+            for name, pid, usage in rows
+        ],
+        'total_rss_kb': total('Rss'),
+        'total_pss_kb': total('Pss'),
+    }
+
+
+def log_memory_report(master_pid, worker_pids):
+    report = memory_report(master_pid, worker_pids)
+    for proc in report['processes']:
+        logger.info(
+            f"{proc['name']} pid={proc['pid']} rss={proc['rss']}kB pss={proc['pss']}kB "
+            f"shared={_sum(proc['shared_clean'], proc['shared_dirty'])}kB "
+            f"private={_sum(proc['private_clean'], proc['private_dirty'])}kB"
+        )
+    logger.info(f"total rss={report['total_rss_kb']}kB pss={report['total_pss_kb']}kB")
+    return report
+
+
+def _sum(*values):
+    return None if any(v is None for v in values) else sum(values)
+
+
+# ----------------------
+# Preloading
+# ----------------------
+def run_preload_hooks(app):
+    """
+    Call every PRELOAD_HOOKS entry ("module:function", called with the app)
+    in the master so models and heavy modules are loaded once and shared.
+    """
+    for spec in app.config.get('PRELOAD_HOOKS', ()):
+        module_name, _, func_name = spec.partition(':')
+        started = time.monotonic()
+        func = getattr(importlib.import_module(module_name), func_name)
+        with app.app_context():
+            func(app)
+        logger.info(f"Preloaded {spec} in {(time.monotonic() - started) * 1000:.0f} ms")
+
+
+def _dispose_engines(app, db):
+    """Drop pooled connections inherited from the master; children open their own"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def check_shared_state(app, workers):
+    """
+    State kept in process memory is per worker. Failed-login counters then
+    give an attacker MAX_LOGIN_ATTEMPTS per worker, and an identity cache
+    invalidation (a demotion, a deactivation) only reaches the worker that
+    made it, the others serving the old row for up to IDENTITY_CACHE_TTL.
+    Refuse to start when the matching *_REQUIRE_SHARED flag is set, warn
+    otherwise.
+    """
+    from app import login_tracker, identity_cache
+    if workers <= 1:
+        return
+    problems = []
+    if not login_tracker.shared:
+        problems.append((
+            'LOGIN_ATTEMPTS_REQUIRE_SHARED',
+            f"LOGIN_ATTEMPTS_BACKEND is 'memory' with {workers} workers: each worker counts failed "
+            f"logins on its own, allowing up to {workers * login_tracker.max_attempts} attempts "
+            f"before a lockout. Set LOGIN_ATTEMPTS_BACKEND = 'redis'."
+        ))
+    if identity_cache.enabled and not identity_cache.shared:
+        problems.append((
+            'IDENTITY_CACHE_REQUIRE_SHARED',
+            f"IDENTITY_CACHE_BACKEND is 'memory' with {workers} workers: a changed user stays cached "
+            f"in the other workers for up to {identity_cache.ttl} s. Set IDENTITY_CACHE_BACKEND = 'redis'."
+        ))
+    for flag, message in problems:
+        if app.config.get(flag):
+            raise RuntimeError(message)
+        logger.warning(message)
+
+
+def prepare_master(app, db, workers=1):
+    """
+    Run in the master right before forking (this server, or gunicorn's
+    when_ready hook with preload_app): check that per-process state is
+    safe for `workers`, run preload hooks, drop pooled connections, then
+    freeze the GC heap so it stays shared.
+    """
+    check_shared_state(app, workers)
+    run_preload_hooks(app)
+    _dispose_engines(app, db)
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Frozen {gc.get_freeze_count()} objects before forking workers")
+
+
+def after_fork(app, db):
+    """Run in each worker after the fork"""
+    _dispose_engines(app, db)
+
+
+def before_exit():
+    """
+    Run in each worker as it stops: write what is still buffered. This
+    server's workers leave through os._exit, which skips atexit; gunicorn
+    calls it from the worker_exit hook.
+    """
+    from app import audit_log, login_tracker
+    audit_log.flush_at_exit()
+    login_tracker.flush_at_exit()
+
+
+# ----------------------
+# Server
+# ----------------------
+class PreforkServer:
+    """
+    Pre-fork server: the master preloads the app, freezes the GC heap and
+    forks workers that all accept() on one inherited listening socket.
+
+    Workers serve with werkzeug's HTTP server, which is not hardened for
+    untrusted traffic (no header/body deadlines beyond a per-read socket
+    timeout), so this is for local runs and memory profiling; production
+    runs gunicorn with gunicorn.conf.py, which uses the same master hooks.
+
+    gc.freeze() moves every object allocated so far into a permanent
+    generation the collector never scans, so collections in the workers don't
+    write to (and un-share) the master's pages.
+    """
+
+    def __init__(self, app, db, host='127.0.0.1', port=8000, workers=2, threads=True,
+                 memory_report_interval=0, client_timeout=30):
+        self.app = app
+        self.db = db
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.threads = threads
+        self.memory_report_interval = memory_report_interval
+        self.client_timeout = client_timeout
+        self.workers = {}
+        self.socket = None
+        self._stopping = False
+        self._report_requested = False
+
+    def _bind(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(128)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        # --- worker ---
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+            after_fork(self.app, self.db)
+
+            from werkzeug.serving import make_server, WSGIRequestHandler
+
+            class TimeoutRequestHandler(WSGIRequestHandler):
+                # Applied to each accepted socket: a client that stalls
+                # longer than this between reads is disconnected
+                timeout = self.client_timeout
+
+            server = make_server(self.host, self.port, self.app, threaded=self.threads,
+                                 request_handler=TimeoutRequestHandler, fd=self.socket.fileno())
+            server.serve_forever()
+        except SystemExit:
+            pass
+        except Exception:
+            logger.exception("Worker crashed")
+            code = 1
+        try:
+            before_exit()
+        finally:
+            os._exit(code)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            started = self.workers.pop(pid, None)
+            if started is not None and not self._stopping:
+                code = os.waitstatus_to_exitcode(status)
+                logger.warning(f"Worker {pid} exited with {code}; respawning")
+                # Don't spin if workers die on boot
+                if time.monotonic() - started < 1:
+                    time.sleep(1)
+                self._spawn()
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_report(self, signum, frame):
+        self._report_requested = True
+
+    def serve(self):
+        self.socket = self._bind()
+        logger.info(f"Prefork master {os.getpid()} listening on http://{self.host}:{self.port}")
+
+        # Everything loaded so far stays shared copy-on-write in the workers
+        prepare_master(self.app, self.db, workers=self.num_workers)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGUSR1, self._handle_report)
+
+        for _ in range(self.num_workers):
+            self._spawn()
+
+        next_report = time.monotonic() + (self.memory_report_interval or 5)
+        try:
+            while not self._stopping:
+                self._reap()
+                now = time.monotonic()
+                if self._report_requested or (self.memory_report_interval and now >= next_report):
+                    self._report_requested = False
+                    log_memory_report(os.getpid(), list(self.workers))
+                    next_report = now + (self.memory_report_interval or 5)
+                try:
+                    time.sleep(0.5)
+                except InterruptedError:
+                    pass
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        logger.info("Stopping workers")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+        deadline = time.monotonic() + 10
+        while self.workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+        self.socket.close()
@@ -0,0 +1,104 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+
+def hot_queries():
+    """
+    The request-path queries that must stay index-backed, as
+    (name, statement) pairs built the same way the routes build them.
+    """
+    from app import db
+    from app.models.user import User
+    from app.models.score import Score
+    from app.models.session import UserSession
+    from app.models.rollup import RoundRollup, TestRollup
+    from app.models.audit import AuditEvent
+
+    now = datetime.utcnow()
+    return [
+        ('login user by id', db.select(User).where(User.id == 1)),
+        ('reset token lookup', db.select(User).where(User.reset_token == 'token')),
+        ('forgot password by email', db.select(User).where(db.func.lower(User.email) == 'a@b.c')),
+        ('register duplicate check', db.select(User).where(db.or_(
+            db.func.lower(User.email) == 'a@b.c',
+            db.func.lower(User.username) == 'name'
+        ))),
+        ('score for round', db.select(Score).where(
+            Score.user_id == 1, Score.test_number == 1, Score.round_number == 1
+        )),
+        ('scores for test', db.select(Score).where(Score.user_id == 1, Score.test_number == 1)),
+        ('completed tests', db.select(Score.test_number, Score.round_number)
+            .where(Score.user_id == 1)
+            .distinct()),
+        ('admin results by time', db.select(Score)
+            .join(User, Score.user_id == User.id)
+            .where(Score.test_time >= now, Score.test_time < now + timedelta(minutes=1))),
+        ('admin results by username', db.select(Score)
+            .join(User, Score.user_id == User.id)
+            .where(User.username == 'name')),
+        ('profile by time', db.select(Score).where(
+            Score.user_id == 1, Score.test_time >= now, Score.test_time < now + timedelta(minutes=1)
+        )),
+        ('session sweep', db.select(UserSession.sid).where(UserSession.expires_at <= now)),
+        ('rollup refresh scan', db.select(Score).where(Score.updated_at >= now).order_by(Score.updated_at)),
+        ('stats activity buckets', db.select(RoundRollup).where(
+            RoundRollup.period == 'day', RoundRollup.period_start >= now.date()
+        )),
+        ('user search prefix', db.select(User.id).where(db.or_(
+            db.and_(db.func.lower(User.username) >= 'ali', db.func.lower(User.username) < 'ali\uffff'),
+            db.and_(db.func.lower(User.email) >= 'ali', db.func.lower(User.email) < 'ali\uffff')
+        ))),
+        ('audit events by user', db.select(AuditEvent).where(AuditEvent.user_id == 1)
+            .order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(100)),
+        ('audit events by ip', db.select(AuditEvent).where(
+            AuditEvent.ip_address == '127.0.0.1', AuditEvent.created_at >= now
+        ).order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(100)),
+        ('audit events by type', db.select(AuditEvent).where(AuditEvent.event_type == 'LOGIN_FAILED')
+            .order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(100)),
+        ('stats funnel', db.select(TestRollup).where(TestRollup.period == 'all', TestRollup.test_number == 1)),
+    ]
+
+
+# "SCAN t" and "SCAN t USING INDEX i" both visit every row; only SEARCH is a lookup
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)')
+_POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def _explain(conn, statement):
+    compiled = statement.compile(dialect=conn.dialect)
+    dialect = conn.dialect.name
+
+    if dialect == 'sqlite':
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        plan = [row[-1] for row in rows]
+        return plan, [m.group(1) for m in map(_SQLITE_FULL_SCAN.match, plan) if m]
+
+    if dialect == 'postgresql':
+        # Tiny tables make the planner prefer seq scans; take that option away
+        # so the plan shows whether a usable index exists at all
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = conn.execute(text(f"EXPLAIN {compiled}"), compiled.params).all()
+        plan = [row[0] for row in rows]
+        return plan, [m.group(1) for line in plan for m in [_POSTGRES_FULL_SCAN.search(line)] if m]
+
+    return None, []
+
+
+def check_query_plans(db):
+    """
+    EXPLAIN every hot query and report the ones that fall back to a full
+    table scan. Returns a list of (name, plan_lines, scanned_tables);
+    plan_lines is None on dialects without a supported EXPLAIN format.
+    """
+    results = []
+    with db.engine.connect() as conn:
+        for name, statement in hot_queries():
+            trans = conn.begin()
+            try:
+                plan, scanned = _explain(conn, statement)
+            finally:
+                trans.rollback()
+            results.append((name, plan, scanned))
+    return results
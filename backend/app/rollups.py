@@ -0,0 +1,263 @@
+import logging
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.score import Score
+from app.models.rollup import (
+    PERIODS, RoundRollup, TestRollup, RoundRollupLedger, TestRollupLedger, RollupState
+)
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = 'scores'
+ALL_TIME_START = date(1970, 1, 1)
+_CHUNK = 500
+
+
+def period_start(day, period):
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return ALL_TIME_START
+
+
+def _chunks(items, size=_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _apply(model, deltas, key_names, value_names):
+    """
+    Add per-key deltas to a rollup table for every period. `deltas` maps a
+    (day, *key) tuple to a list of value deltas.
+    """
+    expanded = {}
+    for (day, *key), values in deltas.items():
+        for period in PERIODS:
+            target = expanded.setdefault((period, period_start(day, period), *key), [0] * len(values))
+            for i, value in enumerate(values):
+                target[i] += value
+
+    for chunk in _chunks(k for k, v in expanded.items() if any(v)):
+        rows = {
+            (row.period, row.period_start, *(getattr(row, name) for name in key_names)): row
+            for row in model.query.filter(
+                db.tuple_(model.period, model.period_start, *(getattr(model, name) for name in key_names)).in_(chunk)
+            )
+        }
+        for key in chunk:
+            row = rows.get(key)
+            if row is None:
+                row = model(period=key[0], period_start=key[1], **dict(zip(key_names, key[2:])),
+                            **{name: 0 for name in value_names})
+                db.session.add(row)
+            for name, value in zip(value_names, expanded[key]):
+                setattr(row, name, getattr(row, name) + value)
+
+
+def _lock_state():
+    """
+    Take the refresh lock before reading anything: the UPDATE holds the
+    row lock (PostgreSQL) or the write lock (SQLite) until commit, so
+    concurrent refreshes can't apply the same ledger change twice.
+    """
+    now = datetime.utcnow()
+    updated = db.session.execute(
+        db.update(RollupState).where(RollupState.name == STATE_NAME).values(refreshed_at=now)
+    ).rowcount
+    if not updated:  # the migration seeds the row; this covers create_all() databases
+        db.session.add(RollupState(name=STATE_NAME, high_water=None, refreshed_at=now))
+        db.session.flush()
+    return db.session.get(RollupState, STATE_NAME, populate_existing=True), now
+
+
+def refresh_rollups(registry, lag_seconds=60):
+    """
+    Fold score rows written since the high-water mark into the rollups.
+
+    Each score's current contribution is kept in a ledger, so a retaken
+    round (updated in place) first withdraws its old contribution; rows seen
+    twice are no-ops. The mark trails the clock by `lag_seconds` so rows
+    from transactions still in flight are picked up by the next run.
+    Returns counts of scanned and changed rows.
+    """
+    state, now = _lock_state()
+    query = Score.query
+    if state.high_water is not None:
+        query = query.filter(Score.updated_at >= state.high_water)
+    scores = query.order_by(Score.updated_at).all()
+
+    ledger = {}
+    for chunk in _chunks(s.id for s in scores):
+        ledger.update((row.score_id, row) for row in RoundRollupLedger.query.filter(RoundRollupLedger.score_id.in_(chunk)))
+
+    round_deltas = {}
+    touched = set()
+    changed = 0
+    for s in scores:
+        new = (s.test_time.date(), s.test_number, s.round_number, s.score)
+        entry = ledger.get(s.id)
+        old = (entry.day, entry.test_number, entry.round_number, entry.score) if entry else None
+        if old == new:
+            continue
+        changed += 1
+        if old:
+            delta = round_deltas.setdefault(old[:3], [0, 0.0])
+            delta[0] -= 1
+            delta[1] -= old[3]
+            entry.day, entry.test_number, entry.round_number, entry.score = new
+        else:
+            db.session.add(RoundRollupLedger(score_id=s.id, day=new[0], test_number=new[1],
+                                             round_number=new[2], score=new[3]))
+        delta = round_deltas.setdefault(new[:3], [0, 0.0])
+        delta[0] += 1
+        delta[1] += new[3]
+        touched.add((s.user_id, s.test_number))
+
+    _apply(RoundRollup, round_deltas, ('test_number', 'round_number'), ('rounds', 'score_sum'))
+    _refresh_tests(registry, touched)
+
+    state.high_water = max(state.high_water or datetime.min, now - timedelta(seconds=lag_seconds))
+    db.session.commit()
+    return {'scanned': len(scores), 'changed': changed, 'tests': len(touched)}
+
+
+def refresh_if_stale(registry, max_age, lag_seconds=60):
+    """
+    Read-path refresh: a plain SELECT of the mark, then a refresh only when
+    the last one is older than `max_age` seconds. Rollups that were never
+    backfilled are left alone; that full scan is 'flask refresh-rollups'.
+    Returns the refresh counts, or None when skipped.
+    """
+    state = db.session.get(RollupState, STATE_NAME)
+    if state is None or state.high_water is None:
+        return None
+    if state.refreshed_at > datetime.utcnow() - timedelta(seconds=max_age):
+        return None
+    return refresh_rollups(registry, lag_seconds)
+
+
+def _refresh_tests(registry, touched):
+    """Recompute completion of the touched (user, test) pairs and roll the differences up"""
+    test_deltas = {}
+    for chunk in _chunks(touched):
+        rounds = {}
+        for s in Score.query.filter(db.tuple_(Score.user_id, Score.test_number).in_(chunk)):
+            rounds.setdefault((s.user_id, s.test_number), []).append(s)
+        ledger = {
+            (row.user_id, row.test_number): row
+            for row in TestRollupLedger.query.filter(
+                db.tuple_(TestRollupLedger.user_id, TestRollupLedger.test_number).in_(chunk)
+            )
+        }
+        for key in chunk:
+            group = rounds.get(key, [])
+            completed_on, total = None, None
+            if registry.is_complete(key[1], [s.round_number for s in group]):
+                completed_on = max(s.test_time for s in group).date()
+                total = registry.total(key[1], group)
+
+            entry = ledger.get(key)
+            old = (entry.completed_on, entry.total) if entry else (None, None)
+            if old == (completed_on, total):
+                continue
+            if old[0] is not None:
+                delta = test_deltas.setdefault((old[0], key[1]), [0, 0.0])
+                delta[0] -= 1
+                delta[1] -= old[1]
+            if completed_on is not None:
+                delta = test_deltas.setdefault((completed_on, key[1]), [0, 0.0])
+                delta[0] += 1
+                delta[1] += total
+            if entry is None:
+                db.session.add(TestRollupLedger(user_id=key[0], test_number=key[1],
+                                                completed_on=completed_on, total=total))
+            else:
+                entry.completed_on, entry.total = completed_on, total
+
+    _apply(TestRollup, test_deltas, ('test_number',), ('completions', 'total_sum'))
+
+
+def rebuild_rollups(registry):
+    """Drop every rollup, ledger and the mark, then fold in all scores (e.g. after deleting users)"""
+    for model in (RoundRollup, TestRollup, RoundRollupLedger, TestRollupLedger):
+        db.session.execute(db.delete(model))
+    db.session.execute(db.update(RollupState).where(RollupState.name == STATE_NAME).values(high_water=None))
+    return refresh_rollups(registry)
+
+
+# ----------------------
+# Reads
+# ----------------------
+def activity(period='day', start=None, end=None, test_number=None):
+    """Rounds scored and tests completed per bucket, oldest first"""
+    buckets = {}
+
+    def bucket(row):
+        return buckets.setdefault((row.period_start, row.test_number), {
+            'period_start': row.period_start.isoformat(), 'test_number': row.test_number,
+            'rounds': 0, 'mean_score': None, 'completions': 0, 'mean_total': None,
+        })
+
+    for model in (RoundRollup, TestRollup):
+        query = model.query.filter(model.period == period)
+        if start is not None:
+            query = query.filter(model.period_start >= period_start(start, period))
+        if end is not None:
+            query = query.filter(model.period_start <= end)
+        if test_number is not None:
+            query = query.filter(model.test_number == test_number)
+        for row in query:
+            item = bucket(row)
+            if model is RoundRollup:
+                item['rounds'] += row.rounds
+                item['_score_sum'] = item.get('_score_sum', 0.0) + row.score_sum
+            else:
+                item['completions'] += row.completions
+                item['_total_sum'] = item.get('_total_sum', 0.0) + row.total_sum
+
+    result = []
+    for key in sorted(buckets):
+        item = buckets[key]
+        score_sum, total_sum = item.pop('_score_sum', 0.0), item.pop('_total_sum', 0.0)
+        if item['rounds']:
+            item['mean_score'] = round(score_sum / item['rounds'], 2)
+        if item['completions']:
+            item['mean_total'] = round(total_sum / item['completions'], 2)
+        result.append(item)
+    return result
+
+
+def funnel(registry, test_number=None):
+    """Per protocol: participants and mean score at each round, then completions and mean total"""
+    rounds = RoundRollup.query.filter(RoundRollup.period == 'all')
+    tests = TestRollup.query.filter(TestRollup.period == 'all')
+    if test_number is not None:
+        rounds = rounds.filter(RoundRollup.test_number == test_number)
+        tests = tests.filter(TestRollup.test_number == test_number)
+    by_round = {(r.test_number, r.round_number): r for r in rounds}
+    by_test = {t.test_number: t for t in tests}
+
+    result = []
+    for number, protocol in sorted(registry.protocols.items()):
+        if test_number is not None and number != test_number:
+            continue
+        steps = []
+        for round_number, spec in protocol.rounds.items():
+            row = by_round.get((number, round_number))
+            steps.append({
+                'round_number': round_number,
+                'phase': spec.phase,
+                'participants': row.rounds if row else 0,
+                'mean_score': round(row.score_sum / row.rounds, 2) if row and row.rounds else None,
+            })
+        done = by_test.get(number)
+        result.append({
+            'test_number': number,
+            'name': protocol.name,
+            'rounds': steps,
+            'completions': done.completions if done else 0,
+            'mean_total': round(done.total_sum / done.completions, 2) if done and done.completions else None,
+        })
+    return result
@@ -0,0 +1,176 @@
+import gzip
+import logging
+from functools import lru_cache
+from flask import request, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+# Response bodies worth compressing; audio and images are already compressed
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'text/csv',
+                          'application/javascript', 'image/svg+xml'}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask's JSON provider with orjson doing the encoding when it is installed.
+
+    Output matches the default provider (sorted keys, datetimes as HTTP
+    dates, str()-ed non-string keys) except that non-ASCII text is written
+    as UTF-8 instead of \\u escapes. Anything orjson can't take (indent
+    other than 2, ints over 64 bits) goes through the stdlib encoder.
+    """
+
+    def _orjson_options(self, kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'sort_keys'}:
+            return None
+        indent = kwargs.get('indent')
+        if indent not in (None, 2):
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dump_bytes(self, obj, **kwargs):
+        option = self._orjson_options(kwargs)
+        if option is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except TypeError:
+                pass  # e.g. integers outside 64 bits
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self.dump_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # let the stdlib raise its usual error (or accept NaN etc.)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = None
+        if self.compact is None and self._app.debug or self.compact is False:
+            indent = 2
+        body = self.dump_bytes(obj, indent=indent) if indent else self.dump_bytes(obj)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+# ----------------------
+# Columnar list responses
+# ----------------------
+def wants_columns():
+    return request.args.get('shape') == 'columns'
+
+
+def to_columns(rows):
+    """
+    [{'a': 1, 'b': 2}, {'a': 3}] -> {'shape': 'columns', 'count': 2,
+    'fields': ['a', 'b'], 'columns': {'a': [1, 3], 'b': [2, None]}}
+    """
+    fields = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                fields.append(key)
+    return {
+        'shape': 'columns',
+        'count': len(rows),
+        'fields': fields,
+        'columns': {field: [row.get(field) for row in rows] for field in fields},
+    }
+
+
+def list_payload(rows):
+    """`rows` as is, or as per-field arrays when the request asks for ?shape=columns"""
+    return to_columns(rows) if wants_columns() else rows
+
+
+def list_response(rows):
+    return jsonify(list_payload(rows))
+
+
+# ----------------------
+# Compression
+# ----------------------
+@lru_cache(maxsize=None)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def choose_encoding(accept, algorithms):
+    """The first of `algorithms` the client accepts with the highest quality, or None"""
+    best, best_quality = None, 0
+    for name in algorithms:
+        if name == 'br' and _brotli() is None:
+            continue
+        quality = accept.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        # brotli quality runs 0-11; map the gzip-style 1-9 level onto it
+        return _brotli().compress(data, quality=min(11, max(0, level + 1)))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def init_compression(app):
+    """Compress text and JSON responses over COMPRESS_MIN_SIZE for clients that accept it"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return None
+
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESS_LEVEL', 6)
+    algorithms = app.config.get('COMPRESS_ALGORITHMS', ['br', 'gzip'])
+
+    @app.after_request
+    def _compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoding = choose_encoding(request.accept_encodings, algorithms)
+        if encoding is None:
+            return response
+        try:
+            compressed = compress(data, encoding, level)
+        except Exception as e:
+            logger.warning(f"Response compression ({encoding}) failed: {str(e)}")
+            return response
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)  # the bytes no longer match a strong tag
+        return response
+
+    return _compress_response
@@ -0,0 +1,361 @@
+import time
+import secrets
+import logging
+from datetime import datetime, timedelta
+from flask.sessions import SessionInterface, SessionMixin, SecureCookieSessionInterface
+from flask.json.tag import TaggedJSONSerializer
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+# Flask-Login stores the authenticated user id under this key
+USER_ID_KEY = '_user_id'
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose payload lives in a server-side store; the cookie only carries the id"""
+
+    #: Set when the session is read or written, as in Flask's
+    #: SecureCookieSession; only then does the response vary by cookie.
+    #: Membership tests don't count (Flask-Login probes '_remember' after
+    #: every request without using the session)
+    accessed = False
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.rotate = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def regenerate(self):
+        """Issue a fresh session id on save (call after login to prevent fixation)"""
+        self.rotate = True
+        self.modified = True
+
+
+# ----------------------
+# Storage backends
+# ----------------------
+class SqlSessionStore:
+    """Sessions in the `sessions` table, keyed by sid with an indexed expiry column"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def table(self):
+        from app.models.session import UserSession
+        return UserSession.__table__
+
+    def load(self, sid):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            row = conn.execute(
+                self.db.select(t.c.data, t.c.expires_at).where(t.c.sid == sid)
+            ).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None, None
+        return row.data, row.expires_at
+
+    def save(self, sid, data, expires_at, user_id):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            updated = conn.execute(
+                t.update().where(t.c.sid == sid)
+                .values(data=data, expires_at=expires_at, user_id=user_id)
+            ).rowcount
+            if not updated:
+                conn.execute(t.insert().values(
+                    sid=sid, data=data, expires_at=expires_at,
+                    user_id=user_id, created_at=datetime.utcnow()
+                ))
+
+    def touch(self, sid, expires_at):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(t.update().where(t.c.sid == sid).values(expires_at=expires_at))
+
+    def delete(self, sid):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(t.delete().where(t.c.sid == sid))
+
+    def user_sessions(self, user_id):
+        """Live session ids for a user, oldest first"""
+        t = self.table
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(
+                self.db.select(t.c.sid)
+                .where(t.c.user_id == user_id, t.c.expires_at > datetime.utcnow())
+                .order_by(t.c.created_at)
+            ).all()
+        return [row.sid for row in rows]
+
+    def revoke_user(self, user_id, keep_sid=None):
+        t = self.table
+        stmt = t.delete().where(t.c.user_id == user_id)
+        if keep_sid:
+            stmt = stmt.where(t.c.sid != keep_sid)
+        with self.db.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def sweep(self):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            return conn.execute(t.delete().where(t.c.expires_at <= datetime.utcnow())).rowcount
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisSessionStore:
+    """Sessions as Redis keys with native TTL, plus a per-user sorted set for revocation"""
+
+    def __init__(self, client, prefix='session:'):
+        self.redis = client
+        self.prefix = prefix
+
+    def _key(self, sid):
+        return f"{self.prefix}{sid}"
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}user:{user_id}"
+
+    def load(self, sid):
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(sid))
+        pipe.ttl(self._key(sid))
+        data, ttl = pipe.execute()
+        if data is None:
+            return None, None
+        return data, datetime.utcnow() + timedelta(seconds=max(ttl, 0))
+
+    def save(self, sid, data, expires_at, user_id):
+        ttl = max(int((expires_at - datetime.utcnow()).total_seconds()), 1)
+        pipe = self.redis.pipeline()
+        pipe.setex(self._key(sid), ttl, data)
+        if user_id is not None:
+            pipe.zadd(self._user_key(user_id), {sid: time.time()}, nx=True)
+            pipe.expire(self._user_key(user_id), ttl)
+        pipe.execute()
+
+    def touch(self, sid, expires_at):
+        ttl = max(int((expires_at - datetime.utcnow()).total_seconds()), 1)
+        self.redis.expire(self._key(sid), ttl)
+
+    def delete(self, sid):
+        self.redis.delete(self._key(sid))
+
+    def _alive(self, sids):
+        pipe = self.redis.pipeline()
+        for sid in sids:
+            pipe.exists(self._key(sid))
+        return [sid for sid, alive in zip(sids, pipe.execute()) if alive]
+
+    def user_sessions(self, user_id):
+        sids = [_decode(sid) for sid in self.redis.zrange(self._user_key(user_id), 0, -1)]
+        return self._alive(sids) if sids else []
+
+    def revoke_user(self, user_id, keep_sid=None):
+        sids = self.user_sessions(user_id)
+        doomed = [sid for sid in sids if sid != keep_sid]
+        if doomed:
+            pipe = self.redis.pipeline()
+            pipe.delete(*[self._key(sid) for sid in doomed])
+            pipe.zrem(self._user_key(user_id), *doomed)
+            pipe.execute()
+        return len(doomed)
+
+    def sweep(self):
+        """Session keys expire natively; only prune dead ids from the per-user index"""
+        removed = 0
+        for user_key in self.redis.scan_iter(match=f"{self.prefix}user:*"):
+            sids = [_decode(sid) for sid in self.redis.zrange(user_key, 0, -1)]
+            dead = set(sids) - set(self._alive(sids))
+            if dead:
+                removed += self.redis.zrem(user_key, *dead)
+        return removed
+
+
+# ----------------------
+# Session interfaces
+# ----------------------
+class CookieSessionInterface(SecureCookieSessionInterface):
+    """
+    Flask's signed-cookie sessions, except that a response which never read
+    the session (stimulus audio, photos) neither refreshes the cookie nor
+    varies by it, so shared caches can keep it.
+    """
+
+    def save_session(self, app, session, response):
+        if not session.accessed and not session.modified:
+            return
+        super().save_session(app, session, response)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps session data server-side (SQL or Redis) and puts only a signed,
+    random session id in the cookie. Expiry slides with each request up to
+    PERMANENT_SESSION_LIFETIME, so logout and revocation take effect across
+    all workers immediately.
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    @staticmethod
+    def _new_sid():
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data, expires_at = self.store.load(sid)
+                if data is not None:
+                    try:
+                        return self.session_class(self.serializer.loads(data.decode()), sid=sid,
+                                                  expires_at=expires_at)
+                    except (ValueError, UnicodeDecodeError):
+                        logger.warning("Discarding undecodable server-side session")
+        return self.session_class(sid=self._new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        # Read before anything below touches the session. A request that
+        # never looked at it (static audio, photos) stays cacheable and
+        # doesn't slide the expiry.
+        accessed = session.accessed
+        if accessed:
+            response.vary.add('Cookie')
+
+        # Emptied session (e.g. logout): drop it server-side and clear the cookie.
+        # A lone "_permanent" flag doesn't count as content.
+        if not any(key != '_permanent' for key in session):
+            if session.modified:
+                if not session.new:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        lifetime = app.permanent_session_lifetime
+        expires_at = datetime.utcnow() + lifetime
+        user_id = session.get(USER_ID_KEY)
+
+        if session.rotate:
+            if not session.new:
+                self.store.delete(session.sid)
+            session.sid = self._new_sid()
+            session.new = True
+            session.rotate = False
+
+        if session.modified or session.new:
+            payload = self.serializer.dumps(dict(session)).encode()
+            self.store.save(session.sid, payload, expires_at, int(user_id) if user_id else None)
+            if session.new and user_id:
+                self._enforce_session_cap(app, int(user_id), session.sid)
+        elif accessed and self.should_set_cookie(app, session):
+            # Sliding expiry without rewriting the payload on every request
+            touch_interval = app.config.get('SESSION_TOUCH_INTERVAL', 60)
+            if session.expires_at is None or \
+                    (expires_at - session.expires_at).total_seconds() >= touch_interval:
+                self.store.touch(session.sid, expires_at)
+            else:
+                return
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+
+    def _enforce_session_cap(self, app, user_id, current_sid):
+        cap = app.config.get('SESSION_MAX_PER_USER')
+        if not cap:
+            return
+        sids = [sid for sid in self.store.user_sessions(user_id) if sid != current_sid]
+        for sid in sids[:max(len(sids) - (int(cap) - 1), 0)]:
+            self.store.delete(sid)
+
+
+def init_session_interface(app, db):
+    """Install the session interface selected by SESSION_BACKEND"""
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    if backend == 'sql':
+        store = SqlSessionStore(db)
+    elif backend == 'redis':
+        import redis
+        store = RedisSessionStore(
+            redis.Redis.from_url(app.config['REDIS_URL']),
+            prefix=app.config.get('SESSION_KEY_PREFIX', 'session:')
+        )
+    else:
+        app.session_interface = CookieSessionInterface()
+        return app.session_interface
+
+    app.session_interface = ServerSideSessionInterface(store)
+    return app.session_interface
+
+
+def get_session_store(app):
+    interface = app.session_interface
+    return interface.store if isinstance(interface, ServerSideSessionInterface) else None
+
+
+def regenerate_session(session):
+    """Rotate the session id if the active backend supports it"""
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+def revoke_user_sessions(app, user_id, keep_sid=None):
+    """Delete every server-side session of a user; returns the number revoked"""
+    store = get_session_store(app)
+    if store is None:
+        return 0
+    return store.revoke_user(user_id, keep_sid=keep_sid)
@@ -0,0 +1,102 @@
+import logging
+import threading
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_WRITE_LOCK_KEY = 'sqlite_write_lock_held'
+
+
+class SQLiteWriteGate:
+    """
+    Serializes writers within a process.
+
+    A connection takes the gate on its first INSERT/UPDATE/DELETE and holds it
+    until the transaction commits or rolls back (or the connection returns to
+    the pool), so bursty writers queue on a Python lock instead of spinning in
+    SQLite's busy handler. Readers never touch it; cross-process writers are
+    still arbitrated by busy_timeout.
+    """
+
+    def __init__(self, timeout):
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self.waits = 0
+        self.timeouts = 0
+
+    def acquire(self, info):
+        if info.get(_WRITE_LOCK_KEY):
+            return
+        if not self._lock.acquire(blocking=False):
+            self.waits += 1
+            if not self._lock.acquire(timeout=self.timeout):
+                # Fall through to SQLite's own locking rather than failing the write
+                self.timeouts += 1
+                logger.warning("SQLite write gate timed out; relying on busy_timeout")
+                return
+        info[_WRITE_LOCK_KEY] = True
+
+    def release(self, info):
+        if info.pop(_WRITE_LOCK_KEY, False):
+            self._lock.release()
+
+
+def _pragma_statements(pragmas):
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+
+def _apply_pragmas_on_connect(engine, statements):
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def init_sqlite_mode(app, db):
+    """
+    Apply connection pragmas to every SQLite engine (the primary and any
+    bind, e.g. the read replica) and the writer gate to the primary
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    statements = _pragma_statements(pragmas)
+
+    with app.app_context():
+        engine = db.engine
+        engines = {id(e): e for e in db.engines.values()}.values()
+    for bound in engines:
+        if bound.dialect.name == 'sqlite':
+            _apply_pragmas_on_connect(bound, statements)
+
+    if engine.dialect.name != 'sqlite' or not app.config.get('SQLITE_SERIALIZE_WRITES', True):
+        return None
+
+    busy_timeout_ms = int(pragmas.get('busy_timeout', 5000))
+    gate = SQLiteWriteGate(timeout=busy_timeout_ms / 1000.0)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _gate_writes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+            gate.acquire(conn.info)
+        elif statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE', 'REPLAC'):
+            gate.acquire(conn.info)
+
+    @event.listens_for(engine, 'commit')
+    def _release_on_commit(conn):
+        gate.release(conn.info)
+
+    @event.listens_for(engine, 'rollback')
+    def _release_on_rollback(conn):
+        gate.release(conn.info)
+
+    @event.listens_for(engine.pool, 'checkin')
+    def _release_on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            gate.release(connection_record.info)
+
+    app.extensions['sqlite_write_gate'] = gate
+    logger.debug(f"SQLite mode enabled: {', '.join(statements)}")
+    return gate
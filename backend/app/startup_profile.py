@@ -0,0 +1,62 @@
+import os
+import re
+import sys
+import subprocess
+
+# Heavy modules that must load on first use, never while a worker boots
+DEFERRED_MODULES = ('pydub', 'speech_recognition', 'google', 'requests', 'PIL', 'numpy', 'redis')
+
+# "import time:  self_us | cumulative_us | <2 spaces per nesting level>module"
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def profile_imports(target='run', cwd=None):
+    """
+    Import `target` in a fresh interpreter under -X importtime.
+
+    Returns (total_us, modules) where total_us is the cumulative import time
+    of `target` and modules maps every module it pulled in to
+    (self_us, cumulative_us).
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=cwd, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+
+    if target not in modules:
+        raise RuntimeError(f"No import profile recorded for {target}")
+    return modules[target][1], modules
+
+
+def check_import_time(budget_ms, target='run', runs=3, cwd=None):
+    """
+    Profile `target` `runs` times and keep the fastest run (the least noisy
+    estimate of cold start). Returns a report dict; report['ok'] is False when
+    the budget is exceeded or a deferred module is imported eagerly.
+    """
+    best_total, best_modules = None, None
+    for _ in range(max(runs, 1)):
+        total_us, modules = profile_imports(target, cwd=cwd)
+        if best_total is None or total_us < best_total:
+            best_total, best_modules = total_us, modules
+
+    eager = sorted(name for name in DEFERRED_MODULES if name in best_modules)
+    slowest = sorted(best_modules.items(), key=lambda item: item[1][0], reverse=True)[:15]
+    total_ms = best_total / 1000.0
+    return {
+        'target': target,
+        'total_ms': round(total_ms, 1),
+        'budget_ms': budget_ms,
+        'eager_deferred_modules': eager,
+        'slowest': [(name, round(self_us / 1000.0, 1)) for name, (self_us, _) in slowest],
+        'ok': total_ms <= budget_ms and not eager,
+    }
@@ -0,0 +1,347 @@
+import io
+import json
+import math
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError, URLError
+
+logger = logging.getLogger(__name__)
+
+
+class ASRError(Exception):
+    """A single recognition call failed (retryable)"""
+
+
+class ASRUnavailable(Exception):
+    """Every configured ASR backend failed or is short-circuited"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ----------------------
+# Backends
+# ----------------------
+# A backend takes (pcm, sample_rate, sample_width, language, timeout) and
+# returns Google's show_all shape: {'alternative': [{'transcript': ...,
+# 'confidence': ...}], ...}, or an empty value when no speech was recognized.
+class GoogleBackend:
+    name = 'google'
+
+    def __init__(self, key=None):
+        self.key = key
+
+    def __call__(self, pcm, sample_rate, sample_width, language, timeout):
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = timeout
+        audio = sr.AudioData(pcm, sample_rate, sample_width)
+        try:
+            return recognizer.recognize_google(audio, key=self.key, language=language, show_all=True)
+        except sr.UnknownValueError:
+            return {}
+        except sr.RequestError as e:
+            raise ASRError(str(e)) from e
+        except (OSError, ValueError) as e:  # socket timeouts, malformed responses
+            raise ASRError(f"{type(e).__name__}: {e}") from e
+
+
+class HttpBackend:
+    """
+    Generic engine behind an HTTP endpoint: POSTs the recording as WAV and
+    expects the show_all JSON shape back (see app.tests.fake_asr).
+    """
+
+    def __init__(self, url, name='http'):
+        self.url = url
+        self.name = name
+
+    def __call__(self, pcm, sample_rate, sample_width, language, timeout):
+        import wave
+
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(sample_width)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+
+        request = Request(
+            f"{self.url}?{urlencode({'lang': language})}",
+            data=buf.getvalue(),
+            headers={'Content-Type': f'audio/wav; rate={sample_rate}'}
+        )
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                body = response.read()
+        except HTTPError as e:
+            raise ASRError(f"{self.name} returned HTTP {e.code}") from e
+        except (URLError, OSError) as e:
+            raise ASRError(f"{self.name} connection failed: {getattr(e, 'reason', e)}") from e
+        try:
+            return json.loads(body or b'{}')
+        except ValueError as e:
+            raise ASRError(f"{self.name} returned invalid JSON") from e
+
+
+def build_backend(spec, config):
+    if spec == 'google':
+        return GoogleBackend(key=config.get('ASR_GOOGLE_KEY'))
+    if spec == 'http':
+        return HttpBackend(config['ASR_HTTP_URL'])
+    if spec.startswith(('http://', 'https://')):
+        return HttpBackend(spec, name=spec)
+    raise ValueError(f"Unknown ASR backend: {spec}")
+
+
+# ----------------------
+# Circuit breaker
+# ----------------------
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_timeout` seconds, where a single trial call decides
+    between closing again and another open period.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+# ----------------------
+# Resilient client
+# ----------------------
+class _BackendState:
+    def __init__(self, backend, breaker, window):
+        self.backend = backend
+        self.breaker = breaker
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * pct / 100.0), len(ordered) - 1)]
+
+
+class ResilientASR:
+    """
+    Wraps ASR backends with an overall deadline, per-call timeouts, bounded
+    retries with full-jitter backoff, optional hedged duplicates once a call
+    runs past the backend's observed p95 latency, and a circuit breaker per
+    backend. Backends are tried in order, so later ones act as fallbacks.
+    """
+
+    def __init__(self, backends, language='fa-IR', deadline=20.0, call_timeout=8.0,
+                 max_retries=2, retry_base_delay=0.25, retry_max_delay=2.0,
+                 hedge=False, hedge_delay=3.0, hedge_percentile=95, hedge_min_samples=20,
+                 breaker_failures=5, breaker_reset=30.0, max_workers=8, latency_window=200):
+        self.language = language
+        self.deadline = deadline
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.backends = [
+            _BackendState(backend, CircuitBreaker(breaker_failures, breaker_reset), latency_window)
+            for backend in backends
+        ]
+        # Calls run on a pool so the deadline holds even if a backend ignores its timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asr')
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            [build_backend(spec, config) for spec in config.get('ASR_BACKENDS', ['google'])],
+            language=config.get('ASR_LANGUAGE', 'fa-IR'),
+            deadline=config.get('ASR_DEADLINE', 20.0),
+            call_timeout=config.get('ASR_CALL_TIMEOUT', 8.0),
+            max_retries=config.get('ASR_MAX_RETRIES', 2),
+            retry_base_delay=config.get('ASR_RETRY_BASE_DELAY', 0.25),
+            retry_max_delay=config.get('ASR_RETRY_MAX_DELAY', 2.0),
+            hedge=config.get('ASR_HEDGE_ENABLED', False),
+            hedge_delay=config.get('ASR_HEDGE_DELAY', 3.0),
+            hedge_percentile=config.get('ASR_HEDGE_PERCENTILE', 95),
+            breaker_failures=config.get('ASR_BREAKER_FAILURES', 5),
+            breaker_reset=config.get('ASR_BREAKER_RESET', 30.0),
+            max_workers=config.get('ASR_MAX_WORKERS', 8),
+        )
+
+    # ----------------------
+    # Calls
+    # ----------------------
+    def _timed_call(self, state, pcm, sample_rate, sample_width, timeout):
+        started = time.monotonic()
+        result = state.backend(pcm, sample_rate, sample_width, self.language, timeout)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            state.latencies.append(elapsed)
+        return result
+
+    def _hedge_after(self, state):
+        if len(state.latencies) >= self.hedge_min_samples:
+            return state.percentile(self.hedge_percentile)
+        return self.hedge_delay
+
+    def _attempt(self, state, pcm, sample_rate, sample_width, stop_at):
+        """One attempt, hedged when enabled; raises ASRError or TimeoutError"""
+        timeout = min(self.call_timeout, stop_at - time.monotonic())
+        if timeout <= 0:
+            raise TimeoutError("ASR deadline exceeded")
+
+        args = (state, pcm, sample_rate, sample_width, timeout)
+        primary = self._executor.submit(self._timed_call, *args)
+        pending = {primary}
+        wait_until = min(time.monotonic() + timeout, stop_at)
+        if self.hedge:
+            hedge_at = min(self._hedge_after(state), timeout)
+            done, _ = wait(pending, timeout=hedge_at)
+            if not done:
+                pending.add(self._executor.submit(self._timed_call, *args))
+                wait_until = min(time.monotonic() + timeout, stop_at)
+                with self._lock:
+                    state.hedges += 1
+
+        last_error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(wait_until - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                for other in pending:
+                    other.cancel()
+                if future is not primary:
+                    with self._lock:
+                        state.hedge_wins += 1
+                return result
+
+        if last_error is not None and not pending:
+            raise last_error if isinstance(last_error, ASRError) else ASRError(str(last_error))
+        raise TimeoutError(f"{state.backend.name} did not answer within {timeout:.1f}s")
+
+    def _backoff(self, attempt, stop_at):
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+        delay = min(delay, max(stop_at - time.monotonic(), 0))
+        if delay:
+            time.sleep(delay)
+
+    def recognize(self, pcm, sample_rate, sample_width):
+        """
+        Return the show_all result dict (empty when no speech was recognized).
+        Raises ASRUnavailable once every backend failed or is short-circuited.
+        """
+        stop_at = time.monotonic() + self.deadline
+        errors = []
+
+        for state in self.backends:
+            name = state.backend.name
+            for attempt in range(self.max_retries + 1):
+                if time.monotonic() >= stop_at:
+                    break
+                if not state.breaker.allow():
+                    errors.append(f"{name}: circuit open")
+                    break
+                with self._lock:
+                    state.calls += 1
+                try:
+                    result = self._attempt(state, pcm, sample_rate, sample_width, stop_at)
+                except (ASRError, TimeoutError) as e:
+                    state.breaker.record_failure()
+                    with self._lock:
+                        state.failures += 1
+                    errors.append(f"{name}: {e}")
+                    logger.warning(f"ASR {name} attempt {attempt + 1} failed: {e}")
+                    if attempt < self.max_retries:
+                        self._backoff(attempt, stop_at)
+                    continue
+                state.breaker.record_success()
+                return result or {}
+
+        retry_after = min((s.breaker.retry_after() for s in self.backends), default=0)
+        raise ASRUnavailable("; ".join(errors) or "no ASR backend available",
+                             retry_after=math.ceil(retry_after) or None)
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'backend': s.backend.name,
+                'state': s.breaker.state,
+                'calls': s.calls,
+                'failures': s.failures,
+                'hedges': s.hedges,
+                'hedge_wins': s.hedge_wins,
+                'p50_ms': round(s.percentile(50) * 1000) if s.latencies else None,
+                'p95_ms': round(s.percentile(95) * 1000) if s.latencies else None,
+            } for s in self.backends]
+
+
+def get_asr_client(app):
+    """The app's ResilientASR, built from config on first use"""
+    client = app.extensions.get('asr')
+    if client is None:
+        client = app.extensions.setdefault('asr', ResilientASR.from_config(app.config))
+    return client
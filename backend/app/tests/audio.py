@@ -0,0 +1,155 @@
+import os
+import subprocess
+import threading
+from app.tests.quality import analyze_pcm
+
+# Canonical storage format for every recording: 16 kHz mono 16-bit PCM,
+# encoded losslessly (FLAC) or as low-bitrate speech Opus.
+CANONICAL_SAMPLE_RATE = 16000
+CANONICAL_CHANNELS = 1
+CANONICAL_SAMPLE_WIDTH = 2
+
+CANONICAL_FORMATS = {
+    'flac': {'ext': 'flac', 'format': 'flac', 'parameters': ['-compression_level', '8']},
+    'opus': {'ext': 'opus', 'format': 'opus', 'parameters': ['-b:a', '24k', '-application', 'voip']},
+}
+
+# Codecs the ingestion pipeline decodes natively; browsers should upload
+# MediaRecorder output as-is instead of converting to WAV client-side.
+ACCEPTED_CODECS = [
+    {'mimetype': 'audio/webm;codecs=opus', 'extension': 'webm'},
+    {'mimetype': 'audio/ogg;codecs=opus', 'extension': 'ogg'},
+    {'mimetype': 'audio/ogg', 'extension': 'opus'},
+    {'mimetype': 'audio/mp4', 'extension': 'm4a'},
+    {'mimetype': 'audio/mpeg', 'extension': 'mp3'},
+    {'mimetype': 'audio/flac', 'extension': 'flac'},
+    {'mimetype': 'audio/wav', 'extension': 'wav'},
+]
+PREFERRED_UPLOAD_MIMETYPE = 'audio/webm;codecs=opus'
+
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode an uploaded recording"""
+
+
+def _feed_stdin(stream, source, chunk_size):
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            stream.write(chunk)
+    except (BrokenPipeError, ValueError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+def decode_audio(source):
+    """
+    Decode any supported recording into canonical 16 kHz mono 16-bit PCM.
+
+    `source` is a path or a readable file object (e.g. a werkzeug upload).
+    ffmpeg decodes straight to raw PCM on stdout, which is read in chunks,
+    so webm/opus uploads need no container probe or intermediate WAV file.
+    Paths are passed to ffmpeg directly so seek-dependent containers (m4a)
+    still work; file objects are streamed through stdin.
+    """
+    from pydub import AudioSegment
+
+    from_path = isinstance(source, (str, os.PathLike))
+    cmd = [
+        AudioSegment.converter, '-hide_banner', '-loglevel', 'error',
+        '-i', os.fspath(source) if from_path else 'pipe:0',
+        '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', str(CANONICAL_CHANNELS), '-ar', str(CANONICAL_SAMPLE_RATE), 'pipe:1'
+    ]
+
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL if from_path else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    feeder = None
+    if not from_path:
+        feeder = threading.Thread(target=_feed_stdin, args=(proc.stdin, source, DECODE_CHUNK_SIZE), daemon=True)
+        feeder.start()
+
+    # stderr is drained on its own thread so a chatty ffmpeg can't block stdout
+    errors = []
+    drain = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    drain.start()
+
+    pcm = bytearray()
+    while True:
+        chunk = proc.stdout.read(DECODE_CHUNK_SIZE)
+        if not chunk:
+            break
+        pcm.extend(chunk)
+
+    returncode = proc.wait()
+    drain.join()
+    if feeder:
+        feeder.join()
+    if returncode != 0 or not pcm:
+        message = errors[0].decode('utf-8', 'replace').strip() if errors and errors[0] else 'no audio stream'
+        raise AudioDecodeError(message)
+
+    # keep whole frames only
+    pcm_len = len(pcm) - len(pcm) % (CANONICAL_SAMPLE_WIDTH * CANONICAL_CHANNELS)
+    return AudioSegment(
+        data=bytes(pcm[:pcm_len]),
+        sample_width=CANONICAL_SAMPLE_WIDTH,
+        frame_rate=CANONICAL_SAMPLE_RATE,
+        channels=CANONICAL_CHANNELS
+    )
+
+
+def audio_metadata(segment):
+    """Return duration, loudness, peak, clipping and speech-activity measurements of a decoded segment"""
+    metadata = analyze_pcm(segment)
+    metadata.update({
+        'sample_rate': segment.frame_rate,
+        'channels': segment.channels,
+    })
+    return metadata
+
+
+def normalize_recording(file_path, canonical_format='flac', keep_original=False):
+    """
+    Transcode an uploaded recording once into the canonical compact format.
+
+    Returns (segment, canonical_path, metadata). The decoded segment is handed
+    straight to ASR so nothing downstream has to decode the file again.
+    """
+    if canonical_format not in CANONICAL_FORMATS:
+        raise ValueError(f"Unsupported canonical audio format: {canonical_format}")
+    target = CANONICAL_FORMATS[canonical_format]
+
+    original_format = file_path.rsplit('.', 1)[-1].lower() if '.' in file_path else None
+    original_size = os.path.getsize(file_path)
+
+    segment = decode_audio(file_path)
+
+    canonical_path = os.path.splitext(file_path)[0] + '.' + target['ext']
+    if canonical_path == file_path:
+        canonical_path = os.path.splitext(file_path)[0] + '_canonical.' + target['ext']
+    segment.export(canonical_path, format=target['format'], parameters=target['parameters'])
+
+    if not keep_original and os.path.exists(file_path):
+        os.remove(file_path)
+
+    metadata = audio_metadata(segment)
+    metadata.update({
+        'codec': canonical_format,
+        'size_bytes': os.path.getsize(canonical_path),
+        'original_format': original_format,
+        'original_size_bytes': original_size,
+    })
+    return segment, canonical_path, metadata
@@ -0,0 +1,226 @@
+import io
+import os
+import re
+import json
+import zipfile
+import logging
+import mimetypes
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models.user import User
+from app.tests.utils import save_and_keep_original, allowed_upload, MAX_FILE_SIZE_MB
+from app.tests.asr import ASRUnavailable
+from app.tests.processing import RecordingRejected, process_recording, store_result, result_payload
+
+logger = logging.getLogger(__name__)
+
+# Recording names that map themselves to (patient, test, round), e.g.
+# "alice/test_1/round_2.m4a", "alice_t1_r2.wav" or "t1_r2.webm" (patient
+# taken from the batch default)
+NAME_PATTERN = re.compile(
+    r'(?:^|/)(?:(?P<username>[^/]+?)[/_])?t(?:est)?_?(?P<test>\d+)[/_-]r(?:ound)?_?(?P<round>\d+)\.[^./]+$',
+    re.IGNORECASE
+)
+MANIFEST_NAME = 'manifest.json'
+
+BatchItem = namedtuple('BatchItem', 'name username test_number round_number file')
+
+
+class BatchError(ValueError):
+    """The batch as a whole is unusable (bad archive, too many files)"""
+
+
+def _manifest_index(manifest):
+    """
+    Manifest entries keyed by file name. Accepts a list of
+    {"file", "username", "test_number", "round_number"} objects or a
+    {file: {...}} mapping.
+    """
+    if not manifest:
+        return {}
+    if isinstance(manifest, (str, bytes)):
+        try:
+            manifest = json.loads(manifest)
+        except ValueError as e:
+            raise BatchError("فایل manifest معتبر نیست") from e
+    if isinstance(manifest, dict):
+        return {name: dict(entry, file=name) for name, entry in manifest.items()}
+    return {entry.get('file'): entry for entry in manifest if isinstance(entry, dict)}
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _item(name, file, manifest, default_username):
+    entry = manifest.get(name) or manifest.get(os.path.basename(name))
+    if entry is not None:
+        return BatchItem(name, entry.get('username') or default_username,
+                         _to_int(entry.get('test_number')), _to_int(entry.get('round_number')), file)
+    match = NAME_PATTERN.search(name)
+    if match is None:
+        return BatchItem(name, default_username, None, None, file)
+    return BatchItem(name, match.group('username') or default_username,
+                     int(match.group('test')), int(match.group('round')), file)
+
+
+def items_from_uploads(files, manifest=None, default_username=None):
+    """BatchItems from werkzeug uploads (multipart `audio` files)"""
+    index = _manifest_index(manifest)
+    return [_item(f.filename or '', f, index, default_username) for f in files]
+
+
+def items_from_zip(stream, manifest=None, default_username=None, max_files=20):
+    """BatchItems from a zip archive; a manifest.json inside it is used unless one is given"""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as e:
+        raise BatchError("فایل فشرده معتبر نیست") from e
+
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+        and not os.path.basename(info.filename).startswith('.')
+    ]
+    if manifest is None:
+        manifest_member = next((m for m in members if os.path.basename(m.filename) == MANIFEST_NAME), None)
+        if manifest_member is not None:
+            manifest = archive.read(manifest_member)
+    members = [m for m in members if os.path.basename(m.filename) != MANIFEST_NAME]
+    if len(members) > max_files:
+        raise BatchError(f"حداکثر {max_files} فایل در هر بارگذاری مجاز است")
+
+    index = _manifest_index(manifest)
+    items = []
+    for info in members:
+        if info.file_size > MAX_FILE_SIZE_MB * 1024 * 1024:
+            data = b''  # rejected by size below without inflating it
+            size_error = True
+        else:
+            data = archive.read(info)
+            size_error = False
+        upload = FileStorage(stream=io.BytesIO(data), filename=os.path.basename(info.filename),
+                             content_type=mimetypes.guess_type(info.filename)[0])
+        item = _item(info.filename, upload, index, default_username)
+        items.append(item._replace(file=None) if size_error else item)
+    return items
+
+
+def items_from_directory(path, manifest=None, default_username=None, max_files=20):
+    """BatchItems from recordings under a local directory (CLI), with the same limits as a zip"""
+    paths = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(path) for name in sorted(names)
+        if name != MANIFEST_NAME and not name.startswith('.')
+    ]
+    if len(paths) > max_files:
+        raise BatchError(f"حداکثر {max_files} فایل در هر بارگذاری مجاز است")
+
+    index = _manifest_index(manifest)
+    items = []
+    for full in paths:
+        name = os.path.basename(full)
+        rel = os.path.relpath(full, path).replace(os.sep, '/')
+        if os.path.getsize(full) > MAX_FILE_SIZE_MB * 1024 * 1024:
+            items.append(_item(rel, None, index, default_username))  # rejected by size without reading it
+            continue
+        with open(full, 'rb') as f:
+            upload = FileStorage(stream=io.BytesIO(f.read()), filename=name,
+                                 content_type=mimetypes.guess_type(name)[0])
+        items.append(_item(rel, upload, index, default_username))
+    return items
+
+
+def _error(item, message, **details):
+    return {'file': item.name, 'username': item.username, 'test_number': item.test_number,
+            'round_number': item.round_number, 'status': 'error', 'error': message, **details}
+
+
+def _process(app, save_path, spec):
+    with app.app_context():
+        return process_recording(save_path, spec)
+
+
+def run_batch(app, items, registry, max_workers=8):
+    """
+    Score a batch of recordings.
+
+    Mapping and format checks run first; accepted files are saved, then
+    decoded, transcribed and scored concurrently on at most `max_workers`
+    threads (ASR calls are further bounded by the ASR client's own pool).
+    Every successful round is written in one transaction; if that fails the
+    canonical files are removed and those rounds reported as errors. Returns
+    per-file results in input order.
+    """
+    results = [None] * len(items)
+    users = {
+        user.username: user for user in
+        User.query.filter(User.username.in_({item.username for item in items if item.username})).all()
+    }
+
+    accepted = []
+    seen = set()
+    for i, item in enumerate(items):
+        spec = registry.round(item.test_number, item.round_number)
+        user = users.get(item.username)
+        if item.file is None:
+            results[i] = _error(item, f"حجم فایل از {MAX_FILE_SIZE_MB} مگابایت بیشتر است")
+        elif not allowed_upload(item.file.filename, item.file.mimetype):
+            results[i] = _error(item, "فرمت فایل پشتیبانی نمی‌شود")
+        elif user is None:
+            results[i] = _error(item, "کاربر یافت نشد")
+        elif spec is None:
+            results[i] = _error(item, "شماره تست یا دور نامعتبر است")
+        elif (user.id, spec.test_number, spec.round_number) in seen:
+            results[i] = _error(item, "این دور بیش از یک بار در فایل‌ها آمده است")
+        else:
+            save_path, error = save_and_keep_original(item.file, user.username, spec.test_number, spec.round_number)
+            if error:
+                results[i] = _error(item, error)
+                continue
+            seen.add((user.id, spec.test_number, spec.round_number))
+            accepted.append((i, item, user, spec, save_path))
+
+    processed = []
+    if accepted:
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(accepted)), 1),
+                                thread_name_prefix='batch') as executor:
+            futures = [(entry, executor.submit(_process, app, entry[4], entry[3])) for entry in accepted]
+            for (i, item, user, spec, _), future in futures:
+                try:
+                    processed.append((i, item, user, spec, future.result()))
+                except RecordingRejected as e:
+                    results[i] = _error(item, e.message, **e.details)
+                except ASRUnavailable as e:
+                    logger.error(f"ASR unavailable for batch file {item.name}: {str(e)}")
+                    results[i] = _error(item, "مشکل در ارتباط با سرویس تشخیص صدا")
+                except Exception as e:
+                    logger.exception(f"Batch file {item.name} failed: {str(e)}")
+                    results[i] = _error(item, "خطا در پردازش فایل صوتی")
+
+    # یک تراکنش برای همه‌ی نمره‌ها
+    try:
+        for i, item, user, spec, result in processed:
+            store_result(user.id, spec, registry.version, result)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Storing {len(processed)} batch results failed: {str(e)}")
+        for i, item, user, spec, result in processed:
+            # Nothing points at the canonical files now
+            if os.path.exists(result.canonical_path):
+                os.remove(result.canonical_path)
+            results[i] = _error(item, "خطا در ذخیره‌ی نتیجه. لطفاً مجدداً تلاش کنید.")
+        return results
+
+    for i, item, user, spec, result in processed:
+        round_count = len(registry.get(spec.test_number).rounds)
+        results[i] = {'file': item.name, 'username': user.username, 'test_number': spec.test_number,
+                      'round_number': spec.round_number, 'status': 'ok',
+                      **result_payload(result, spec, round_count)}
+    return results
@@ -0,0 +1,126 @@
+"""
+Local stand-in for an ASR engine, for exercising the resilience layer.
+
+    python -m app.tests.fake_asr --port 9009 --latency 0.3 --jitter 0.2 --error-rate 0.2
+
+then point the app at it with ASR_BACKENDS = ['http'] and
+ASR_HTTP_URL = 'http://127.0.0.1:9009/recognize'. Every request sleeps
+latency + uniform(0, jitter) seconds; with probability --error-rate it
+answers HTTP --error-status instead, and with probability --hang-rate it
+sleeps --hang seconds first (slower than any sane client timeout).
+--fail-first / --hang-first make the first N requests fail / hang
+unconditionally, for deterministic tests. With
+--word-times each alternative also carries synthetic per-word offsets
+(`words: [{'word', 'start', 'end'}]`, seconds), as engines that support
+word timestamps return them.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TRANSCRIPT = 'تراکتور هویج قناری موکت سیر'
+
+
+class FakeASRServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 hang_rate=0.0, hang=30.0, transcript=DEFAULT_TRANSCRIPT, confidence=0.9,
+                 word_times=False, fail_first=0, hang_first=0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.transcript = transcript
+        self.confidence = confidence
+        self.word_times = word_times
+        self.fail_first = fail_first
+        self.hang_first = hang_first
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning timed-out or hedged requests is expected here
+        pass
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/recognize"
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            number = server.requests
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if number <= server.hang_first or random.random() < server.hang_rate:
+            time.sleep(server.hang)
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        if number <= server.fail_first or random.random() < server.error_rate:
+            self.send_response(server.error_status)
+            self.end_headers()
+            return
+
+        alternative = {'transcript': server.transcript, 'confidence': server.confidence}
+        if server.word_times:
+            alternative['words'] = [{'word': word, 'start': round(0.3 + 0.8 * i, 3), 'end': round(0.9 + 0.8 * i, 3)}
+                                    for i, word in enumerate(server.transcript.split())]
+        body = {'alternative': [alternative], 'final': True} if server.transcript else {}
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9009)
+    parser.add_argument('--latency', type=float, default=0.2, help='base latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='extra uniform latency (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--hang', type=float, default=30.0, help='hang duration (s)')
+    parser.add_argument('--fail-first', type=int, default=0, help='fail the first N requests')
+    parser.add_argument('--hang-first', type=int, default=0, help='hang on the first N requests')
+    parser.add_argument('--transcript', default=DEFAULT_TRANSCRIPT)
+    parser.add_argument('--word-times', action='store_true', help='include per-word offsets')
+    args = parser.parse_args()
+
+    server = FakeASRServer(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, error_status=args.error_status,
+        hang_rate=args.hang_rate, hang=args.hang, transcript=args.transcript,
+        word_times=args.word_times, fail_first=args.fail_first, hang_first=args.hang_first
+    )
+    print(f"Fake ASR listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import os
+import logging
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.score import Score
+from app.models.recording import Recording
+from app.tests.utils import recognize_audio, calculate_score
+from app.tests.audio import normalize_recording
+from app.tests.quality import QUALITY_ISSUES, quality_issues, thresholds_from_config, speech_segments
+from app.tests.timing import word_timings, pack_timings
+from app.tests.asr import ASRUnavailable
+
+logger = logging.getLogger(__name__)
+
+QUALITY_KEYS = ('duration', 'rms_dbfs', 'peak_dbfs', 'clipping_ratio', 'speech_fraction')
+
+ProcessedRecording = namedtuple(
+    'ProcessedRecording',
+    'canonical_path audio_meta issues score correct_words incorrect_words tokens recall_sequence timings timing_source'
+)
+
+
+class RecordingRejected(Exception):
+    """The recording can't be scored; `message` is shown to the user, `details` go in the response"""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+def _discard(path):
+    """Remove a canonical file nothing will point at"""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def process_recording(save_path, spec):
+    """
+    Decode, quality-check, transcribe and score one saved upload against its
+    protocol RoundSpec. Touches no database state, so it can run on worker
+    threads (inside an app context). Raises RecordingRejected or
+    ASRUnavailable.
+    """
+    config = current_app.config
+
+    # تبدیل یک‌باره به فرمت استاندارد (16kHz mono) و استخراج متادیتا
+    try:
+        segment, canonical_path, audio_meta = normalize_recording(
+            save_path,
+            canonical_format=config.get('AUDIO_CANONICAL_FORMAT', 'flac'),
+            keep_original=config.get('AUDIO_KEEP_ORIGINAL', False)
+        )
+    except Exception as e:
+        logger.warning(f"Audio decode failed for {save_path}: {str(e)}")
+        raise RecordingRejected("فایل صوتی قابل خواندن نیست. لطفاً فایل دیگری ارسال کنید.") from e
+
+    # بررسی کیفیت صدا پیش از ارسال به سرویس تشخیص گفتار
+    gate = config.get('AUDIO_QUALITY_GATE', 'reject')
+    issues = [] if gate == 'off' else quality_issues(audio_meta, thresholds_from_config(config))
+    if issues and gate == 'reject':
+        _discard(canonical_path)
+        raise RecordingRejected(
+            QUALITY_ISSUES[issues[0]],
+            quality_issues=issues,
+            quality={key: audio_meta[key] for key in QUALITY_KEYS}
+        )
+    audio_meta['quality_flags'] = ','.join(issues) or None
+
+    # تشخیص صدا روی PCM رمزگشایی‌شده
+    try:
+        alternatives = recognize_audio(segment)
+    except ASRUnavailable:
+        _discard(canonical_path)
+        raise
+    if not alternatives:
+        _discard(canonical_path)
+        raise RecordingRejected("متن قابل تشخیصی در فایل صوتی یافت نشد. لطفاً مجدداً تلاش کنید.")
+
+    score, correct_words, incorrect_words, tokens = calculate_score(
+        alternatives, spec,
+        min_confidence=config.get('ASR_FUSION_MIN_CONFIDENCE', 0.3)
+    )
+
+    # زمان‌بندی کلمات: از خروجی موتور تشخیص، یا تطبیق با بخش‌های گفتاری
+    recall_sequence, timings, timing_source = word_timings(
+        tokens, alternatives, speech_segments(segment), audio_meta['duration']
+    )
+    return ProcessedRecording(canonical_path, audio_meta, issues, score, correct_words, incorrect_words,
+                              tokens, recall_sequence, timings, timing_source)
+
+
+def store_result(user_id, spec, word_list_version, result):
+    """Stage the round's Score and Recording rows; the caller commits"""
+    test_number, round_number = spec.test_number, spec.round_number
+
+    # ذخیره نمره
+    Score.upsert_round(
+        user_id, test_number, round_number,
+        score=result.score,
+        correct_words=result.correct_words,
+        incorrect_words=result.incorrect_words,
+        recall_sequence=result.recall_sequence,
+        word_timings=pack_timings(result.timings),
+        timing_source=result.timing_source,
+        word_list_version=word_list_version,
+        test_time=datetime.now()
+    )
+
+    # ذخیره متادیتای فایل صوتی و حذف رکوردهای فایل‌های پاک‌شده
+    db.session.add(Recording(
+        user_id=user_id,
+        test_number=test_number,
+        round_number=round_number,
+        file_path=result.canonical_path,
+        **result.audio_meta
+    ))
+    stale = Recording.query.filter_by(
+        user_id=user_id, test_number=test_number, round_number=round_number
+    ).all()
+    for rec in stale:
+        if rec.file_path != result.canonical_path and not os.path.exists(rec.file_path):
+            db.session.delete(rec)
+
+
+def result_payload(result, spec, round_count):
+    """Per-round response body shared by single and batch submissions"""
+    return {
+        "transcribed_words": result.tokens,
+        "total_words": len(result.tokens),
+        "correct_words": result.score,
+        "incorrect_words": result.incorrect_words,
+        "word_timeline": [
+            {"word": word, "start_ms": start, "end_ms": end}
+            for word, (start, end) in zip(result.recall_sequence, result.timings)
+        ],
+        "timing_source": result.timing_source,
+        "round_completed": spec.round_number == round_count,
+        "phase": spec.phase,
+        "quality_warnings": result.issues,
+    }
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from app.tests.scoring import Matcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROTOCOLS_FILE = os.path.join(os.path.dirname(__file__), 'protocols.json')
+
+# Phase -> how it is scored. 'recall' counts distinct list words named;
+# 'named_recognition' counts hits minus false positives over targets +
+# distractors. It stands in for the CVLT yes/no recognition trial: the
+# participant is read the mixed list and names the words they recognise in
+# one recording, rather than answering yes/no per item.
+PHASES = {
+    'learning': 'recall',
+    'interference': 'recall',
+    'short_delay_free': 'recall',
+    'short_delay_cued': 'recall',
+    'long_delay_free': 'recall',
+    'long_delay_cued': 'recall',
+    'named_recognition': 'named_recognition',
+}
+# Phases summed into a test's total score (CVLT "Trials 1-5 total")
+TOTAL_PHASES = frozenset({'learning'})
+
+# `matcher` is the compiled Matcher over every word the round scores against
+RoundSpec = namedtuple('RoundSpec', 'test_number round_number phase scorer targets distractors cues matcher')
+
+
+class ProtocolError(ValueError):
+    """The protocol definition file is malformed"""
+
+
+class Protocol:
+    def __init__(self, test_number, name, rounds):
+        self.test_number = test_number
+        self.name = name
+        self.rounds = MappingProxyType(rounds)
+        self.required_rounds = frozenset(rounds)
+
+    def is_complete(self, round_numbers):
+        return self.required_rounds <= set(round_numbers)
+
+    def counts_toward_total(self, round_number):
+        spec = self.rounds.get(round_number)
+        return spec is not None and spec.phase in TOTAL_PHASES
+
+    def describe(self):
+        return {
+            'test_number': self.test_number,
+            'name': self.name,
+            'rounds': [{
+                'round_number': spec.round_number,
+                'phase': spec.phase,
+                'word_count': len(spec.targets),
+                'cues': list(spec.cues),
+            } for spec in self.rounds.values()],
+        }
+
+
+class ProtocolRegistry:
+    """
+    Immutable lookup of test protocols for one version of the definition
+    file; validation is a dict lookup. `release` is the file's declared
+    "version", `version` the stamp stored on scores.
+    """
+
+    def __init__(self, protocols, version, release=''):
+        self.protocols = MappingProxyType(protocols)
+        self.version = version
+        self.release = release
+
+    def get(self, test_number):
+        return self.protocols.get(test_number)
+
+    def round(self, test_number, round_number):
+        protocol = self.protocols.get(test_number)
+        return protocol.rounds.get(round_number) if protocol else None
+
+    def is_complete(self, test_number, round_numbers):
+        protocol = self.protocols.get(test_number)
+        return protocol is not None and protocol.is_complete(round_numbers)
+
+    def total(self, test_number, scores):
+        """Sum of the rounds that make up a test's total, from Score rows"""
+        protocol = self.protocols[test_number]
+        return sum(s.score for s in scores if protocol.counts_toward_total(s.round_number))
+
+
+def build_registry(data, digest=None):
+    """
+    Compile the JSON definition into a ProtocolRegistry, validating
+    references. Word lists may map targets to dialect spellings under
+    "variants"; matchers are compiled once per distinct set of lists.
+    The version is the declared "version" joined with the content `digest`
+    ("2026.10.2+3f1c..."), so an edit that forgets the bump still gets a
+    distinct stamp.
+    """
+    try:
+        lists = {str(key): value for key, value in data['word_lists'].items()}
+        definitions = data['protocols']
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ProtocolError(f"Missing section: {e}") from e
+    release = str(data.get('version') or '')
+    version = '+'.join(part for part in (release, digest) if part)
+
+    def words(list_id, where):
+        if list_id not in lists:
+            raise ProtocolError(f"{where}: unknown word list {list_id!r}")
+        return tuple(lists[list_id]['words'])
+
+    matchers = {}
+
+    def matcher(list_ids):
+        if list_ids not in matchers:
+            variants = {}
+            for list_id in list_ids:
+                variants.update(lists[list_id].get('variants', {}))
+            matchers[list_ids] = Matcher([w for list_id in list_ids for w in lists[list_id]['words']], variants)
+        return matchers[list_ids]
+
+    protocols = {}
+    for key, definition in definitions.items():
+        test_number = int(key)
+        rounds = {}
+        for step in definition['rounds']:
+            where = f"protocol {test_number}"
+            phase = step.get('phase')
+            if phase not in PHASES:
+                raise ProtocolError(f"{where}: unknown phase {phase!r}")
+            list_id = str(step.get('list'))
+            targets = words(list_id, where)
+            distractor_list = str(step['distractors']) if step.get('distractors') else None
+            distractors = words(distractor_list, where) if distractor_list else ()
+            cues = tuple(lists[list_id].get('categories', {})) if phase.endswith('_cued') else ()
+            round_matcher = matcher((list_id, distractor_list) if distractor_list else (list_id,))
+            for _ in range(int(step.get('repeat', 1))):
+                round_number = len(rounds) + 1
+                rounds[round_number] = RoundSpec(test_number, round_number, phase, PHASES[phase],
+                                                 targets, distractors, cues, round_matcher)
+        if not rounds:
+            raise ProtocolError(f"protocol {test_number}: no rounds")
+        protocols[test_number] = Protocol(test_number, definition.get('name', str(test_number)), rounds)
+    return ProtocolRegistry(protocols, version, release)
+
+
+def load_registry(path):
+    """Build from a file, stamping the version with the content hash"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except ValueError as e:
+        raise ProtocolError(f"{path}: {e}") from e
+    return build_registry(data, digest=hashlib.sha256(raw).hexdigest()[:12])
+
+
+class ProtocolStore:
+    """
+    Holds the current ProtocolRegistry and swaps in a new one when the
+    definition file changes. Every worker polls the file's mtime at most once
+    per `poll_interval` seconds, so all workers converge on a new version
+    within that interval without a restart. The swap is a single reference
+    assignment: a request that fetched a registry keeps scoring against that
+    version. A file that fails to load is logged and the old version kept.
+    """
+
+    def __init__(self, path, poll_interval=5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._registry = load_registry(path)
+        self._checked_at = time.monotonic()
+        logger.debug(f"Loaded test protocols version {self._registry.version} from {path}")
+
+    def current(self):
+        if self.poll_interval is not None and time.monotonic() - self._checked_at >= self.poll_interval:
+            self.reload_if_changed()
+        return self._registry
+
+    def reload_if_changed(self):
+        """Reload when the file's mtime moved; returns True if a new version was swapped in"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"Cannot stat protocols file {self.path}: {e}")
+                return False
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                registry = load_registry(self.path)
+            except (OSError, ProtocolError, KeyError, TypeError, ValueError) as e:
+                logger.error(f"Keeping protocols version {self._registry.version}; reload failed: {e}")
+                return False
+            if registry.version == self._registry.version:
+                return False
+            if registry.release and registry.release == self._registry.release:
+                logger.error(f"Protocols file {self.path} changed without a version bump "
+                             f"({registry.release}); scoring it as {registry.version}")
+            logger.info(f"Test protocols version {self._registry.version} -> {registry.version}")
+            self._registry = registry
+            return True
+
+
+def get_registry(app):
+    """The app's current ProtocolRegistry, reloaded when PROTOCOLS_FILE changes"""
+    store = app.extensions.get('protocols')
+    if store is None:
+        path = app.config.get('PROTOCOLS_FILE') or DEFAULT_PROTOCOLS_FILE
+        store = app.extensions.setdefault(
+            'protocols', ProtocolStore(path, app.config.get('PROTOCOLS_POLL_INTERVAL', 5.0))
+        )
+    return store.current()
@@ -1,9 +1,11 @@
 import os
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_login import current_user, login_required
-from datetime import datetime
-from app.models.score import Score
-from app.tests.utils import save_and_keep_original, recognize_audio, calculate_score, allowed_upload
+from app.tests.utils import save_and_keep_original, allowed_upload
+from app.tests.audio import ACCEPTED_CODECS, PREFERRED_UPLOAD_MIMETYPE
+from app.tests.asr import ASRUnavailable
+from app.tests.processing import RecordingRejected, process_recording, store_result, result_payload
+from app.tests.protocols import get_registry
 from app.tests import bp
 from app import db
 import logging
@@ -13,7 +15,28 @@ MAX_FILE_SIZE_MB = 5
 BASE_VOICES_DIR = os.path.join(os.getcwd(), 'voices')  # مسیر مطلق برای ذخیره فایل‌ها
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+
+@bp.route('/audio-formats', methods=['GET'])
+def audio_formats():
+    """Advertise the codecs the backend decodes so clients upload recordings as-is"""
+    response = jsonify({
+        "accepted": ACCEPTED_CODECS,
+        "preferred": PREFERRED_UPLOAD_MIMETYPE,
+        "max_file_size_mb": MAX_FILE_SIZE_MB,
+        "canonical_format": current_app.config.get('AUDIO_CANONICAL_FORMAT', 'flac')
+    })
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+@bp.route('/protocols', methods=['GET'])
+def list_protocols():
+    """Test protocols (rounds, phases, cue categories) as loaded from the registry"""
+    registry = get_registry(current_app)
+    response = jsonify([protocol.describe() for protocol in registry.protocols.values()])
+    response.headers['X-Protocols-Version'] = registry.version
+    return response
 
 
 @bp.route('/submit-audio', methods=['POST'])
@@ -27,10 +50,13 @@ def submit_audio():
         except (TypeError, ValueError):
             return jsonify({"error": "شماره تست یا دور نامعتبر است"}), 400
 
-        if test_number not in [1, 2, 3, 4]:
-            return jsonify({"error": "شماره تست باید بین 1 تا 4 باشد"}), 400
-        if round_number not in [1, 2, 3, 4, 5]:
-            return jsonify({"error": "شماره دور باید بین 1 تا 5 باشد"}), 400
+        registry = get_registry(current_app)
+        protocol = registry.get(test_number)
+        if protocol is None:
+            return jsonify({"error": "شماره تست نامعتبر است"}), 400
+        spec = protocol.rounds.get(round_number)
+        if spec is None:
+            return jsonify({"error": f"شماره دور برای این تست باید بین 1 تا {len(protocol.rounds)} باشد"}), 400
 
         if 'audio' not in request.files:
             return jsonify({"error": "هیچ فایل صوتی ارسال نشده است"}), 400
@@ -39,7 +65,7 @@ def submit_audio():
 
         # چک فرمت
         if not allowed_upload(getattr(audio_file, 'filename', ''), getattr(audio_file, 'mimetype', None)):
-            return jsonify({"error": "فرمت فایل پشتیبانی نمی‌شود. فرمت‌های مجاز: MP3, M4A, WAV, OGG, WebM"}), 400
+            return jsonify({"error": "فرمت فایل پشتیبانی نمی‌شود. فرمت‌های مجاز: MP3, M4A, WAV, OGG, WebM, Opus, FLAC"}), 400
 
         # چک حجم
         audio_file.seek(0, os.SEEK_END)
@@ -55,45 +81,22 @@ def submit_audio():
         if error:
             return jsonify({"error": error}), 400
 
-        # تبدیل و تشخیص صدا
-        text = recognize_audio(save_path)
-        if not text or not text.strip():
-            return jsonify({"error": "متن قابل تشخیصی در فایل صوتی یافت نشد. لطفاً مجدداً تلاش کنید."}), 400
-
-        score, correct_words, incorrect_words = calculate_score(text, test_number)
-
-        # ذخیره نمره
-        user_id = current_user.id
-        score_entry = Score.query.filter_by(
-            user_id=user_id, test_number=test_number, round_number=round_number
-        ).first()
-
-        if score_entry:
-            score_entry.score = score
-            score_entry.correct_words = correct_words
-            score_entry.incorrect_words = incorrect_words
-            score_entry.test_time = datetime.now()
-        else:
-            score_entry = Score(
-                user_id=user_id,
-                test_number=test_number,
-                round_number=round_number,
-                score=score,
-                correct_words=correct_words,
-                incorrect_words=incorrect_words,
-                test_time=datetime.now()
-            )
-            db.session.add(score_entry)
-
+        try:
+            result = process_recording(save_path, spec)
+        except RecordingRejected as e:
+            return jsonify({"error": e.message, **e.details}), 400
+        except ASRUnavailable as e:
+            logger.error(f"ASR unavailable for user {current_user.username}: {str(e)}")
+            response = jsonify({"error": "مشکل در ارتباط با سرویس تشخیص صدا"})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after or 5)
+            return response
+
+        store_result(current_user.id, spec, registry.version, result)
         db.session.commit()
 
-        tokens = text.split()
         return jsonify({
-            "transcribed_words": tokens,
-            "total_words": len(tokens),
-            "correct_words": score,
-            "incorrect_words": incorrect_words,
-            "round_completed": round_number == 5,
+            **result_payload(result, spec, len(protocol.rounds)),
             "message": "فایل با موفقیت پردازش شد"
         })
 
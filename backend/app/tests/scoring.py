@@ -0,0 +1,179 @@
+import re
+from difflib import SequenceMatcher
+from types import MappingProxyType
+
+# Confidence assumed for the top alternative when the engine omits it, and
+# the per-rank decay applied to lower alternatives without one
+DEFAULT_TOP_CONFIDENCE = 0.8
+RANK_DECAY = 0.7
+
+_ARABIC_TO_PERSIAN = str.maketrans({'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا'})
+# Harakat, tatweel and punctuation carry nothing for word matching
+_STRIP = re.compile(r'[ً-ٰٟـ]|[^\w\s‌]')
+
+
+def normalize_text(text):
+    """Unify Arabic/Persian letter variants and drop diacritics and punctuation"""
+    text = _STRIP.sub('', text.translate(_ARABIC_TO_PERSIAN))
+    return text.replace('‌', ' ')
+
+
+def _alternative_weights(alternatives):
+    """Per-alternative weights normalised to sum to 1 (an n-best posterior)"""
+    weights = []
+    top = alternatives[0].get('confidence') if alternatives else None
+    top = top if top is not None else DEFAULT_TOP_CONFIDENCE
+    for rank, alt in enumerate(alternatives):
+        confidence = alt.get('confidence')
+        weights.append(confidence if confidence is not None else top * RANK_DECAY ** rank)
+    total = sum(weights) or 1.0
+    return [w / total for w in weights]
+
+
+class Matcher:
+    """
+    Compiled, immutable word matcher for one word list: normalised spelling
+    (and dialect variants) -> canonical target. Multi-word targets
+    ('مینی بوس') match as n-grams.
+    """
+    __slots__ = ('targets', 'phrases', 'max_len')
+
+    def __init__(self, targets, variants=None):
+        phrases = {}
+        for target in targets:
+            for spelling in (target, *(variants or {}).get(target, ())):
+                phrases[' '.join(normalize_text(spelling).split())] = target
+        object.__setattr__(self, 'targets', frozenset(targets))
+        object.__setattr__(self, 'phrases', MappingProxyType(phrases))
+        object.__setattr__(self, 'max_len', max((len(p.split()) for p in phrases), default=1))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Matcher is immutable")
+
+
+def _as_matcher(targets):
+    return targets if isinstance(targets, Matcher) else Matcher(targets)
+
+
+def _match_tokens(tokens, phrases, max_len):
+    """Greedy longest-match of target phrases over a token list"""
+    i = 0
+    while i < len(tokens):
+        for size in range(min(max_len, len(tokens) - i), 0, -1):
+            candidate = ' '.join(tokens[i:i + size])
+            if size == 1 or candidate in phrases:
+                yield candidate
+                i += size
+                break
+
+
+def _canonical_tokens(alternative, phrases, max_len):
+    tokens = normalize_text(alternative.get('transcript', '')).split()
+    return [phrases.get(word, word) for word in _match_tokens(tokens, phrases, max_len)]
+
+
+def _align(reference, hypothesis):
+    """
+    Map each hypothesis word onto a slot of the reference: (i, 1, 0) is the
+    reference's i-th word, (i, 0, k) the k-th word inserted before it.
+    Reference words the hypothesis drops get no vote.
+    """
+    matcher = SequenceMatcher(None, reference, hypothesis, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'delete':
+            continue
+        paired = min(i2 - i1, j2 - j1) if op != 'insert' else 0
+        for offset in range(paired):
+            yield (i1 + offset, 1, 0), hypothesis[j1 + offset]
+        for k, j in enumerate(range(j1 + paired, j2), start=1):
+            yield (i1 + paired if op == 'insert' else i2, 0, k), hypothesis[j]
+
+
+def fuse_alternatives(alternatives, targets, min_confidence=0.3):
+    """
+    Fuse an n-best list into one recall estimate. `targets` is a word list
+    or a compiled Matcher.
+
+    Each alternative gets a weight (engine confidence, or a rank-decayed
+    default) and is aligned word by word against the best alternative, so
+    words competing for the same slot ('سیر' / 'شیر') split one posterior
+    mass instead of each being counted as heard. The fused sequence is the
+    best path: per slot the word with the most mass, if it outweighs the
+    alternatives that left the slot empty. When that word is not a target,
+    the slot's strongest target is still admitted if its posterior reaches
+    `min_confidence`, so a slot yields at most one target; intrusions only
+    ever come from the best path. Repetitions in the best
+    alternative are kept (they are perseverations), while words found only
+    in lower alternatives count once.
+
+    Returns (words, posteriors): the fused word sequence in spoken order and
+    the highest slot posterior of each distinct word.
+    """
+    matcher = _as_matcher(targets)
+    phrases, max_len = matcher.phrases, matcher.max_len
+    if not alternatives:
+        return [], {}
+    weights = _alternative_weights(alternatives)
+
+    reference = _canonical_tokens(alternatives[0], phrases, max_len)
+    slots = {}
+    for rank, (alt, weight) in enumerate(zip(alternatives, weights)):
+        tokens = _canonical_tokens(alt, phrases, max_len) if rank else reference
+        for slot, word in _align(reference, tokens):
+            votes = slots.setdefault(slot, {})
+            votes[word] = votes.get(word, 0.0) + weight
+
+    words = []
+    posterior = {}
+    for slot in sorted(slots):
+        votes = slots[slot]
+        empty = 1.0 - sum(votes.values())
+        ranked = sorted(votes.items(), key=lambda item: -item[1])
+        for word, mass in ranked:
+            posterior[word] = max(posterior.get(word, 0.0), mass)
+        best, best_mass = ranked[0]
+        on_path = best_mass > empty
+        if on_path and (slot[1] == 1 or best not in words):
+            words.append(best)
+        if on_path and best in matcher.targets:
+            continue
+        # One slot is one spoken word: admit at most one target from it
+        target, mass = next(((w, m) for w, m in ranked if w in matcher.targets), (None, 0.0))
+        if mass >= min_confidence and target not in words:
+            words.append(target)
+    return words, {word: round(mass, 3) for word, mass in posterior.items()}
+
+
+def score_alternatives(alternatives, targets, min_confidence=0.3):
+    """
+    Score fused alternatives against a word list.
+
+    Returns (score, correct_words, incorrect_words, words): score is the
+    number of distinct targets recalled, correct_words keeps repetitions,
+    incorrect_words lists each intrusion once.
+    """
+    matcher = _as_matcher(targets)
+    words, _ = fuse_alternatives(alternatives, matcher, min_confidence)
+    target_set = matcher.targets
+    correct_words = [word for word in words if word in target_set]
+    incorrect_words = list(dict.fromkeys(word for word in words if word not in target_set))
+    return len(set(correct_words)), correct_words, incorrect_words, words
+
+
+def score_named_recognition(alternatives, targets, distractors, min_confidence=0.3, matcher=None):
+    """
+    Score a named recognition round: after hearing a list mixing targets and
+    distractors, the participant names the words they recognise (there are
+    no per-item yes/no answers, so misses and correct rejections are not
+    told apart). `matcher`, when given, is the compiled Matcher over both.
+
+    Returns (score, hits, false_alarms_and_intrusions, words) with score =
+    hits - false positives, floored at zero.
+    """
+    words, _ = fuse_alternatives(alternatives, matcher or list(targets) + list(distractors), min_confidence)
+    target_set, distractor_set = set(targets), set(distractors)
+    hits = [word for word in words if word in target_set]
+    false_positives = list(dict.fromkeys(word for word in words if word in distractor_set))
+    intrusions = list(dict.fromkeys(word for word in words if word not in target_set and word not in distractor_set))
+    score = max(len(set(hits)) - len(false_positives), 0)
+    return score, hits, false_positives + intrusions, words
@@ -0,0 +1,118 @@
+import struct
+from app.tests.scoring import normalize_text
+
+# Packed layout of Score.word_timings: little-endian uint32 (start_ms, end_ms)
+# pairs, one per entry of Score.recall_sequence
+_PAIR = struct.Struct('<II')
+
+
+def pack_timings(timings):
+    return b''.join(_PAIR.pack(max(int(start), 0), max(int(end), 0)) for start, end in timings)
+
+
+def unpack_timings(blob):
+    return [tuple(pair) for pair in _PAIR.iter_unpack(blob)] if blob else []
+
+
+def _seconds(value):
+    """Engine offsets come as seconds, or as Google Cloud style '1.200s' strings"""
+    if isinstance(value, str):
+        value = value.rstrip('s')
+    return float(value)
+
+
+def _engine_words(alternative):
+    """[(normalised token, start_ms, end_ms), ...] from an alternative's word offsets"""
+    tokens = []
+    for item in alternative.get('words') or []:
+        try:
+            start = _seconds(item.get('start', item.get('startTime')))
+            end = _seconds(item.get('end', item.get('endTime')))
+        except (TypeError, ValueError):
+            return []
+        for token in normalize_text(item.get('word', '')).split():
+            tokens.append((token, round(start * 1000), round(end * 1000)))
+    return tokens
+
+
+def engine_timings(words, alternatives):
+    """
+    Times for the fused `words` from engine word offsets, or None unless every
+    word can be found. Each occurrence consumes the next unused match, so
+    repeated words get successive offsets.
+    """
+    streams = [tokens for tokens in map(_engine_words, alternatives) if tokens]
+    if not streams:
+        return None
+
+    used = set()
+    timings = []
+    for word in words:
+        parts = normalize_text(word).split()
+        found = None
+        for a, tokens in enumerate(streams):
+            for i in range(len(tokens) - len(parts) + 1):
+                if (a, i) not in used and [t[0] for t in tokens[i:i + len(parts)]] == parts:
+                    found = (a, i, tokens[i][1], tokens[i + len(parts) - 1][2])
+                    break
+            if found:
+                break
+        if found is None:
+            return None
+        used.add(found[:2])
+        timings.append(found[2:])
+    return timings
+
+
+def align_to_segments(words, segments, duration):
+    """
+    Approximate alignment of `words` against voice-activity `segments`.
+
+    Segments split by the shortest pauses are merged until there are no more
+    segments than words; with one segment per word the mapping is direct,
+    otherwise the speech time is shared out in proportion to word length.
+    """
+    if not words:
+        return []
+    segments = [list(seg) for seg in segments] or [[0.0, duration]]
+    while len(segments) > len(words):
+        i = min(range(len(segments) - 1), key=lambda k: segments[k + 1][0] - segments[k][1])
+        segments[i][1] = segments.pop(i + 1)[1]
+
+    if len(segments) == len(words):
+        return [(round(start * 1000), round(end * 1000)) for start, end in segments]
+
+    # Map positions on the concatenated speech timeline back to wall time
+    total_speech = sum(end - start for start, end in segments)
+
+    def wall_time(offset, prefer_next):
+        for start, end in segments:
+            length = end - start
+            if offset < length or (offset == length and not prefer_next):
+                return start + offset
+            offset -= length
+        return segments[-1][1]
+
+    weights = [max(len(word.replace(' ', '')), 1) for word in words]
+    scale = total_speech / float(sum(weights))
+    timings = []
+    offset = 0.0
+    for weight in weights:
+        start = wall_time(offset, prefer_next=True)
+        offset += weight * scale
+        end = wall_time(offset, prefer_next=False)
+        timings.append((round(start * 1000), round(end * 1000)))
+    return timings
+
+
+def word_timings(words, alternatives, segments, duration):
+    """
+    (words, timings, source) for a scored round. Engine offsets are used when
+    they cover every word, and then also fix the recall order; otherwise the
+    words keep their transcript order and are aligned to the VAD segments.
+    """
+    timings = engine_timings(words, alternatives)
+    if timings is not None:
+        ordered = sorted(zip(words, timings), key=lambda item: item[1][0])
+        return [word for word, _ in ordered], [timing for _, timing in ordered], 'engine'
+    return list(words), align_to_segments(words, segments, duration), 'vad'
@@ -1,21 +1,12 @@
 import os
 from datetime import datetime
-from pydub import AudioSegment
-import speech_recognition as sr
-
-TARGET_WORDS = {
-    1: ['تراکتور', 'هویج', 'قناری', 'موکت', 'سیر', 'دوچرخه', 'یخچال', 'ببر', 'اتوبوس', 'میز', 'فلفل', 'گوریل',
-        'پرده', 'پارو', 'سوسمار', 'فیلم'],
-    2: ['لودر', 'گوجه', 'شتر', 'بخاری', 'ریحان', 'وانت', 'فریزر', 'گربه', 'مینی بوس', 'تخته', 'جعفری', 'گوسفند',
-        'پنجره', 'ویلچر', 'کلاغ', 'نعنا'],
-    3: ['فرش', 'قطار', 'خیار', 'طوطی', 'کدو', 'هواپیما', 'اجاق', 'موش', 'ماشین', 'صندلی', 'کاهو', 'میمون', 'کمد', 'موتور',
-        'فیل', 'پیاز'],
-    4: ['مترو', 'کامیون', 'اسفناج', 'زرافه', 'کمد', 'پیاز', 'موتور', 'کابینت', 'گورخر', 'چراغ', 'کرفس', 'گاو', 'مبل', 'قایق',
-        'سنجاب', 'کلم']
-}
+from flask import current_app
+from app.tests.audio import decode_audio
+from app.tests.asr import get_asr_client
+from app.tests.scoring import score_alternatives, score_named_recognition
 
 MAX_FILE_SIZE_MB = 5
-ALLOWED_EXTENSIONS = {'mp3', 'm4a', 'wav', 'ogg', 'webm'}
+ALLOWED_EXTENSIONS = {'mp3', 'm4a', 'wav', 'ogg', 'webm', 'opus', 'flac'}
 
 
 def allowed_upload(filename, mimetype=None):
@@ -26,7 +17,7 @@ def allowed_upload(filename, mimetype=None):
     if ext in ALLOWED_EXTENSIONS:
         return True
     if mimetype:
-        if any(fmt in mimetype for fmt in ['wav', 'mpeg', 'ogg', 'webm', 'mp3']):
+        if any(fmt in mimetype for fmt in ['wav', 'mpeg', 'ogg', 'webm', 'mp3', 'mp4', 'm4a', 'opus', 'flac']):
             return True
     return False
 
@@ -44,8 +35,10 @@ def _infer_extension(filename, mimetype):
             return 'ogg'
         if 'mpeg' in mimetype or 'mp3' in mimetype:
             return 'mp3'
-        if 'm4a' in mimetype:
+        if 'm4a' in mimetype or 'mp4' in mimetype:
             return 'm4a'
+        if 'flac' in mimetype:
+            return 'flac'
     return 'wav'  # fallback default
 
 
@@ -87,41 +80,43 @@ def save_and_keep_original(audio_file, username, test_number, round_number):
     return save_path, None
 
 
-def recognize_audio(file_path):
-    """Transcribe audio file to text (Farsi)"""
-    recognizer = sr.Recognizer()
-    text = ""
-    try:
-        # if not wav, convert temporarily
-        ext = file_path.rsplit('.', 1)[-1].lower()
-        wav_path = file_path
-        if ext != 'wav':
-            tmp_path = os.path.splitext(file_path)[0] + "_tmp.wav"
-            audio_content = AudioSegment.from_file(file_path, format=ext)
-            audio_content = audio_content.set_frame_rate(16000).set_channels(1)
-            audio_content.export(tmp_path, format='wav')
-            wav_path = tmp_path
-
-        with sr.AudioFile(wav_path) as source:
-            audio_content = recognizer.record(source)
-            results = recognizer.recognize_google(audio_content, language="fa-IR", show_all=True)
-            if len(results) > 0:
-                text = " ".join([alt["transcript"] for alt in results["alternative"]])
-
-        if wav_path != file_path and os.path.exists(wav_path):
-            os.remove(wav_path)
-
-    except sr.UnknownValueError:
-        return None
-    return text
-
-
-def calculate_score(transcribed_words, test_number):
-    """Compare words with target list and return score, correct, and incorrect words"""
-    words_list = transcribed_words.split()
-    target_set = set(TARGET_WORDS[test_number])
-    correct_words_all = [word for word in words_list if word in target_set]
-    correct_words_unique = list(set(correct_words_all))
-    incorrect_words = [word for word in words_list if word not in target_set]
-    score = len(correct_words_unique)
-    return score, correct_words_all, incorrect_words
+def recognize_audio(audio):
+    """Transcribe audio to text (Farsi).
+
+    `audio` is either a decoded canonical AudioSegment (preferred, no
+    re-decoding) or a path to an audio file. Returns the engine's n-best
+    alternatives ([{'transcript': ..., 'confidence': ...}, ...]) or None when
+    no speech was recognized; raises ASRUnavailable when the ASR backends are
+    down.
+    """
+    # Deferred: pydub probes for ffmpeg on import
+    from pydub import AudioSegment
+
+    segment = audio if isinstance(audio, AudioSegment) else decode_audio(audio)
+    results = get_asr_client(current_app).recognize(segment.raw_data, segment.frame_rate, segment.sample_width)
+    alternatives = [alt for alt in (results or {}).get("alternative", []) if alt.get("transcript", "").strip()]
+    return alternatives or None
+
+
+def preload_asr(app):
+    """Prefork preload hook: load the ASR stack once in the master so workers share it"""
+    import numpy  # noqa: F401 (quality gate)
+    import speech_recognition as sr
+    from pydub import AudioSegment  # noqa: F401 (resolves the ffmpeg converter once)
+
+    sr.Recognizer()
+
+
+def calculate_score(transcribed, spec, min_confidence=0.3):
+    """
+    Score one round against its protocol RoundSpec and return score,
+    correct, incorrect and fused transcript words.
+
+    `transcribed` is either plain text or the ASR n-best alternatives; the
+    alternatives are fused so a word heard in several of them counts once and
+    an intrusion is only reported when it is on the fused best path.
+    """
+    alternatives = [{'transcript': transcribed, 'confidence': 1.0}] if isinstance(transcribed, str) else transcribed
+    if spec.scorer == 'named_recognition':
+        return score_named_recognition(alternatives, spec.targets, spec.distractors, min_confidence, matcher=spec.matcher)
+    return score_alternatives(alternatives, spec.matcher, min_confidence)
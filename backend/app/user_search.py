@@ -0,0 +1,174 @@
+import re
+import heapq
+import logging
+import weakref
+from difflib import SequenceMatcher
+from sqlalchemy import text, bindparam
+
+logger = logging.getLogger(__name__)
+
+# Search structures created by the migration outside the ORM metadata, so
+# autogenerate must leave them alone (see migrations/env.py)
+FTS_TABLE = 'users_fts'
+TRGM_INDEXES = ('ix_users_username_trgm', 'ix_users_email_trgm')
+
+MAX_LIMIT = 50
+# Candidates fetched per requested result before fuzzy re-ranking
+CANDIDATE_FACTOR = 5
+MIN_SIMILARITY = 0.45
+_SEPARATORS = re.compile(r'[_.\-]+')
+
+
+def is_search_schema(name, type_):
+    """True for the FTS5 table (and its shadow tables) and trigram indexes"""
+    if type_ == 'table':
+        return name == FTS_TABLE or name.startswith(FTS_TABLE + '_')
+    return type_ == 'index' and name in TRGM_INDEXES
+
+
+def _similarity(query, user):
+    """Rank of a candidate: prefix matches first, then the closer of username / email local part"""
+    username = user['username'].lower()
+    email = user['email'].lower()
+    if username.startswith(query) or email.startswith(query):
+        return 1.0 + len(query) / max(len(username), 1)
+    if query in username or query in email:
+        return 0.9
+    return max(SequenceMatcher(None, query, name).ratio()
+               for name in _names(username, email.split('@', 1)[0]))
+
+
+def _names(*names):
+    """Whole names plus their '_'/'.'/'-' separated parts, so 'fatmeh' is close to 'fatemeh_karimi'"""
+    for name in names:
+        yield name
+        parts = _SEPARATORS.split(name)
+        if len(parts) > 1:
+            yield from (p for p in parts if p)
+
+
+def _rank(query, rows, limit):
+    users = [{'id': r[0], 'username': r[1], 'email': r[2]} for r in rows]
+    for user in users:
+        user['match'] = round(_similarity(query, user), 3)
+    users = [u for u in users if u['match'] >= MIN_SIMILARITY]
+    users.sort(key=lambda u: (-u['match'], u['username']))
+    return users[:limit]
+
+
+def _trigrams(query):
+    return {query[i:i + 3] for i in range(len(query) - 2)}
+
+
+def _search_fts5(conn, query, limit):
+    # Any shared trigram makes a candidate; bm25 puts those sharing the most first
+    match = ' OR '.join('"{}"'.format(t.replace('"', '""')) for t in sorted(_trigrams(query)))
+    return conn.execute(text(
+        f"SELECT u.id, u.username, u.email FROM {FTS_TABLE} f JOIN users u ON u.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match ORDER BY f.rank LIMIT :n"
+    ), {'match': match, 'n': limit * CANDIDATE_FACTOR}).all()
+
+
+def _search_trgm(conn, query, limit):
+    return conn.execute(text(
+        "SELECT id, username, email FROM users "
+        "WHERE lower(username) % :q OR lower(email) % :q "
+        "OR lower(username) LIKE :prefix OR lower(email) LIKE :prefix "
+        "ORDER BY greatest(similarity(lower(username), :q), similarity(lower(email), :q)) DESC "
+        "LIMIT :n"
+    ), {'q': query, 'prefix': _like_prefix(query), 'n': limit * CANDIDATE_FACTOR}).all()
+
+
+def _like_prefix(query):
+    return query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _search_fallback(conn, query, limit):
+    """
+    Portable path: prefix matches as range scans of the lower(username) and
+    lower(email) indexes, topped up with close usernames from a scan of that
+    column only.
+    """
+    rows = conn.execute(text(
+        "SELECT id, username, email FROM users "
+        "WHERE (lower(username) >= :lo AND lower(username) < :hi) "
+        "OR (lower(email) >= :lo AND lower(email) < :hi) "
+        "ORDER BY username LIMIT :n"
+    ), {'lo': query, 'hi': query + '\uffff', 'n': limit}).all()
+    if len(rows) >= limit:
+        return rows
+
+    seen = {r[0] for r in rows}
+    matcher = SequenceMatcher(None, '', query)
+    scored = []
+    for user_id, username in conn.execute(text("SELECT id, username FROM users")):
+        if user_id in seen:
+            continue
+        username = username.lower()
+        if query in username:
+            scored.append((1.0, user_id))
+            continue
+        best = 0.0
+        for name in _names(username):
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                best = max(best, matcher.ratio())
+        if best >= MIN_SIMILARITY:
+            scored.append((best, user_id))
+    close = [user_id for _, user_id in heapq.nlargest(limit * CANDIDATE_FACTOR, scored)]
+    if close:
+        rows += conn.execute(
+            text("SELECT id, username, email FROM users WHERE id IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': close}
+        ).all()
+    return rows
+
+
+def detect_backend(conn):
+    """'fts5' (SQLite with the migration's FTS table), 'trgm' (PostgreSQL with pg_trgm) or 'like'"""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                             {'name': FTS_TABLE}).first()
+        return 'fts5' if found else 'like'
+    if dialect == 'postgresql':
+        found = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        return 'trgm' if found else 'like'
+    return 'like'
+
+
+_BACKENDS = {'fts5': _search_fts5, 'trgm': _search_trgm, 'like': _search_fallback}
+# Detected once per engine (the primary and a read replica may differ)
+_detected = weakref.WeakKeyDictionary()
+
+
+def search_users(session, query, limit=20, backend=None):
+    """
+    Prefix and typo-tolerant search over username and email.
+
+    Returns up to `limit` [{'id', 'username', 'email', 'match'}] best first,
+    where match > 1 marks a prefix hit. Queries shorter than three characters
+    only match by prefix.
+    """
+    query = ' '.join((query or '').lower().split())
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if len(query) < 2:
+        return []
+
+    conn = session.connection()
+    if backend is None:
+        backend = _detected.get(conn.engine)
+        if backend is None:
+            backend = _detected.setdefault(conn.engine, detect_backend(conn))
+    if len(query) < 3:
+        backend = 'like'  # trigram matching needs three characters
+    if backend == 'like':
+        return _rank(query, _search_fallback(conn, query, limit), limit)
+
+    try:
+        with session.begin_nested():
+            rows = _BACKENDS[backend](conn, query, limit)
+    except Exception as e:
+        logger.warning(f"User search via {backend} failed, falling back: {str(e)}")
+        rows = _search_fallback(conn, query, limit)
+    return _rank(query, rows, limit)
@@ -20,6 +20,23 @@ class Config:
         'pool_recycle': 300,
     }
     
+    # SQLite mode (only applied when the URI is sqlite://): pragmas run on every
+    # new connection, and writers within a process are serialized
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 268435456,  # 256 MB
+        'cache_size': -65536,  # negative = KiB, i.e. 64 MB
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_SERIALIZE_WRITES = True
+    
+    # Optional read replica for reporting endpoints (@read_replica); a user's
+    # reads stay on the primary for REPLICA_STICKY_SECONDS after they write
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_STICKY_SECONDS = 10
+    
     # Session security
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -27,6 +44,66 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     SESSION_COOKIE_NAME = "session"
     SESSION_REFRESH_EACH_REQUEST = True
+    SESSION_BACKEND = "cookie"  # 'cookie' (signed cookie), 'sql' or 'redis'
+    SESSION_KEY_PREFIX = "session:"
+    SESSION_MAX_PER_USER = None
+    SESSION_TOUCH_INTERVAL = 60  # seconds between sliding-expiry writes
+    SESSION_SWEEP_INTERVAL = 600  # seconds between expired-session sweeps
+    
+    # Identity cache for the Flask-Login user loader ('memory' or 'redis').
+    # 'memory' is per process: with several workers a changed user (role,
+    # deactivation) stays cached in the other workers for up to
+    # IDENTITY_CACHE_TTL seconds; servers warn about that, or refuse to
+    # start with IDENTITY_CACHE_REQUIRE_SHARED
+    IDENTITY_CACHE_ENABLED = True
+    IDENTITY_CACHE_BACKEND = "memory"
+    IDENTITY_CACHE_REQUIRE_SHARED = False
+    IDENTITY_CACHE_TTL = 30
+    IDENTITY_CACHE_SIZE = 1024
+    REDIS_URL = "redis://localhost:6379/0"
+    
+    # Pre-fork hooks (gunicorn.conf.py in production, `run.py --prefork`
+    # locally): called in the master before forking, as "module:function",
+    # so loaded models are shared copy-on-write
+    PRELOAD_HOOKS = [
+        'app.tests.utils:preload_asr',
+        'app.main.photos:preload_imaging',
+    ]
+    PREFORK_MEMORY_REPORT_INTERVAL = 300  # seconds; 0 = only on SIGUSR1
+    PREFORK_CLIENT_TIMEOUT = 30  # `run.py --prefork`: drop clients idle this long between reads
+    
+    # Failed-login counters and lockouts ('memory' per process, or 'redis'
+    # shared via REDIS_URL with process memory as fallback); last_login is
+    # written in batches every LAST_LOGIN_FLUSH_INTERVAL seconds (0 = at once).
+    # With 'memory' and more than one worker each worker counts on its own;
+    # servers warn about that, or refuse to start with
+    # LOGIN_ATTEMPTS_REQUIRE_SHARED
+    LOGIN_ATTEMPTS_BACKEND = "memory"
+    LOGIN_ATTEMPTS_REQUIRE_SHARED = False
+    LOGIN_ATTEMPTS_KEY_PREFIX = "login:"
+    LAST_LOGIN_FLUSH_INTERVAL = 30
+    
+    # Security audit events: buffered in memory (up to AUDIT_BUFFER_SIZE) and
+    # written to audit_events in batches by a background thread every
+    # AUDIT_FLUSH_INTERVAL seconds or once AUDIT_FLUSH_BATCH are waiting;
+    # AUDIT_ASYNC = False writes each event immediately
+    AUDIT_ENABLED = True
+    AUDIT_ASYNC = True
+    AUDIT_BUFFER_SIZE = 10000
+    AUDIT_FLUSH_INTERVAL = 2.0
+    AUDIT_FLUSH_BATCH = 500
+    AUDIT_RETENTION_DAYS = 365  # `flask prune-audit-events`
+    
+    # API responses: JSON is encoded with orjson when installed; text/JSON
+    # bodies of COMPRESS_MIN_SIZE bytes or more are sent br (needs the brotli
+    # package) or gzip, whichever the client accepts, at COMPRESS_LEVEL (1-9)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_ALGORITHMS = ['br', 'gzip']
+    
+    # Cold-start budget for `flask check-import-time` (ms to import run.py)
+    IMPORT_TIME_BUDGET_MS = 750
     
     # CSRF Protection
     WTF_CSRF_ENABLED = True
@@ -40,6 +117,7 @@ class Config:
     
     # Security rate limits
     MAX_LOGIN_ATTEMPTS = 5
+    LOGIN_ATTEMPT_WINDOW = 900  # failures count toward the lockout for this long after the first
     LOGIN_LOCKOUT_DURATION = 900
     MAX_RESET_ATTEMPTS = 5
     RESET_RATE_LIMIT_WINDOW = 3600
@@ -86,6 +164,71 @@ class Config:
     UPLOAD_SCAN_ENABLED = False
     UPLOAD_QUARANTINE_FOLDER = os.path.join(basedir, 'quarantine')
     
+    # Audio ingestion (recordings are stored once as 16 kHz mono 'flac' or 'opus')
+    AUDIO_CANONICAL_FORMAT = "flac"
+    AUDIO_KEEP_ORIGINAL = False
+    # ASR backends, tried in order (later ones are fallbacks): 'google', 'http'
+    # (ASR_HTTP_URL) or a URL. Each call gets min(ASR_CALL_TIMEOUT, time left
+    # of ASR_DEADLINE); failures retry with jittered backoff and trip a
+    # per-backend circuit breaker. Hedging sends a duplicate request once a
+    # call outlives the backend's p95 latency.
+    ASR_BACKENDS = ['google']
+    ASR_HTTP_URL = os.environ.get('ASR_HTTP_URL', 'http://127.0.0.1:9009/recognize')
+    ASR_GOOGLE_KEY = os.environ.get('ASR_GOOGLE_KEY')
+    ASR_LANGUAGE = 'fa-IR'
+    ASR_DEADLINE = 20.0
+    ASR_CALL_TIMEOUT = 8.0
+    ASR_MAX_RETRIES = 2
+    ASR_RETRY_BASE_DELAY = 0.25
+    ASR_RETRY_MAX_DELAY = 2.0
+    ASR_HEDGE_ENABLED = False
+    ASR_HEDGE_DELAY = 3.0  # used until enough latency samples exist
+    ASR_HEDGE_PERCENTILE = 95
+    ASR_BREAKER_FAILURES = 5
+    ASR_BREAKER_RESET = 30.0
+    ASR_MAX_WORKERS = 8
+    # Scoring fuses the n-best alternatives: a word counts once its summed
+    # (normalised) alternative confidence reaches this posterior
+    ASR_FUSION_MIN_CONFIDENCE = 0.3
+
+    # Test protocols (word lists, rounds and their phases) as data; None uses
+    # the bundled app/tests/protocols.json. Workers pick up edits to the file
+    # within PROTOCOLS_POLL_INTERVAL seconds (None disables reloading); each
+    # score records the "version" it was scored against.
+    PROTOCOLS_FILE = os.environ.get('PROTOCOLS_FILE')
+    PROTOCOLS_POLL_INTERVAL = 5.0
+
+    # Clinician batch uploads (POST /api/admin/batch-submit, flask batch-submit):
+    # files per batch and recordings decoded/transcribed concurrently
+    BATCH_MAX_FILES = 20
+    BATCH_MAX_WORKERS = 8
+
+    # Admin stats read day/week/all-time rollups. 'flask refresh-rollups'
+    # (run once to backfill, then from a periodic job) folds in scores
+    # written since the high-water mark, which trails the clock by
+    # ROLLUP_LAG_SECONDS so in-flight transactions are not skipped. A stats
+    # read also refreshes, but only once the last refresh is older than
+    # ROLLUP_REFRESH_INTERVAL seconds and never as the initial backfill.
+    ROLLUP_REFRESH_ON_READ = True
+    ROLLUP_REFRESH_INTERVAL = 300
+    ROLLUP_LAG_SECONDS = 60
+    
+    # Pre-ASR quality gate: 'reject' (400 with the reason), 'flag' (store and
+    # report issues, still transcribe) or 'off'
+    AUDIO_QUALITY_GATE = "reject"
+    AUDIO_QUALITY_MIN_DURATION = 1.0  # seconds
+    AUDIO_QUALITY_MIN_RMS_DBFS = -50.0
+    AUDIO_QUALITY_MAX_CLIPPING = 0.01  # fraction of samples at full scale
+    AUDIO_QUALITY_MIN_SPEECH = 0.05  # fraction of 30 ms frames with speech
+    
+    # Static media delivery (stimulus audio, profile photos)
+    MEDIA_CACHE_MAX_AGE = 31536000
+    PROFILE_PHOTO_CACHE_MAX_AGE = 300
+    MEDIA_OFFLOAD = None  # None, 'x-accel-redirect' (nginx) or 'x-sendfile'
+    MEDIA_ACCEL_PREFIX = '/_media/'  # nginx "internal" location aliased to app/static/
+    PROFILE_PHOTO_MAX_BYTES = 5242880  # 5 MB
+    PROFILE_PHOTO_MAX_PIXELS = 40000000
+    
     # Logging configuration
     LOG_TO_STDOUT = True
     LOG_LEVEL = "INFO"
@@ -141,8 +284,8 @@ class DevelopmentConfig(Config):
     @staticmethod
     def init_app(app):
         Config.init_app(app)
-        print("Running in DEVELOPMENT mode")
-        print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        app.logger.info("Running in DEVELOPMENT mode")
+        app.logger.info(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
 
 class ProductionConfig(Config):
@@ -160,6 +303,11 @@ class ProductionConfig(Config):
     RATELIMIT_DEFAULT = "100 per hour"
     WTF_CSRF_ENABLED = True
     MAIL_SUPPRESS_SEND = False
+    LOGIN_ATTEMPTS_BACKEND = "redis"
+    LOGIN_ATTEMPTS_REQUIRE_SHARED = True
+    IDENTITY_CACHE_BACKEND = "redis"
+    IDENTITY_CACHE_REQUIRE_SHARED = True
+    SESSION_BACKEND = "redis"
 
     @staticmethod
     def init_app(app):
@@ -203,6 +351,8 @@ class TestingConfig(Config):
     PASSWORD_MIN_LENGTH = 4
     MAX_LOGIN_ATTEMPTS = 10
     UPLOAD_FOLDER = '/tmp/test_uploads'
+    AUDIT_ASYNC = False  # events are readable as soon as they are recorded
+    LAST_LOGIN_FLUSH_INTERVAL = 0
 
     @staticmethod
     def init_app(app):
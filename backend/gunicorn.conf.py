@@ -0,0 +1,46 @@
+# Production server: gunicorn -c gunicorn.conf.py run:app (what `FLASK_ENV=production python run.py` execs)
+#
+# The app is imported once in the master (preload_app); the prefork hooks in
+# app.prefork then preload models and freeze the GC heap so workers share
+# those pages copy-on-write.
+import os
+import multiprocessing
+
+bind = f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('FLASK_PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() or 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+
+# Slow or stalled clients: requests must finish within `timeout` (uploads go
+# through ASR, so it is generous), idle keep-alive connections close after
+# `keepalive`, and oversized request lines / headers are refused
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+limit_request_line = 4094
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+accesslog = '-'
+errorlog = '-'
+
+
+def _app(server):
+    from app import db
+    return server.app.wsgi(), db
+
+
+def when_ready(server):
+    from app.prefork import prepare_master
+    prepare_master(*_app(server), workers=server.cfg.workers)
+
+
+def post_fork(server, worker):
+    from app.prefork import after_fork
+    after_fork(*_app(server))
+
+
+def worker_exit(server, worker):
+    from app.prefork import before_exit
+    before_exit()
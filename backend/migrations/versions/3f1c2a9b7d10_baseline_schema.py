@@ -0,0 +1,112 @@
+"""baseline schema
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-19 12:30:00.000000
+
+Databases created earlier with db.create_all() already have some or all of
+these tables; existing tables are left untouched so the baseline can be
+applied to them directly.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=False),
+            sa.Column('age', sa.Integer(), nullable=True),
+            sa.Column('sex', sa.String(length=10), nullable=True),
+            sa.Column('profile_photo', sa.String(length=200), nullable=True),
+            sa.Column('reset_token', sa.String(length=100), nullable=True),
+            sa.Column('reset_token_expiry', sa.DateTime(), nullable=True),
+            sa.Column('failed_login_attempts', sa.Integer(), nullable=True),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+        op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    if not _has_table('scores'):
+        op.create_table(
+            'scores',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('test_number', sa.Integer(), nullable=False),
+            sa.Column('round_number', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.Column('correct_words', sa.JSON(), nullable=False),
+            sa.Column('incorrect_words', sa.JSON(), nullable=False),
+            sa.Column('test_time', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('idx_user_test_round', 'scores', ['user_id', 'test_number', 'round_number'])
+        op.create_index('ix_scores_user_id', 'scores', ['user_id'])
+        op.create_index('ix_scores_test_number', 'scores', ['test_number'])
+
+    if not _has_table('recordings'):
+        op.create_table(
+            'recordings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('test_number', sa.Integer(), nullable=False),
+            sa.Column('round_number', sa.Integer(), nullable=False),
+            sa.Column('file_path', sa.String(length=300), nullable=False),
+            sa.Column('codec', sa.String(length=10), nullable=False),
+            sa.Column('sample_rate', sa.Integer(), nullable=False),
+            sa.Column('channels', sa.Integer(), nullable=False),
+            sa.Column('size_bytes', sa.Integer(), nullable=True),
+            sa.Column('original_format', sa.String(length=10), nullable=True),
+            sa.Column('original_size_bytes', sa.Integer(), nullable=True),
+            sa.Column('duration', sa.Float(), nullable=True),
+            sa.Column('rms_dbfs', sa.Float(), nullable=True),
+            sa.Column('peak_dbfs', sa.Float(), nullable=True),
+            sa.Column('clipping_ratio', sa.Float(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('idx_recording_user_test_round', 'recordings',
+                        ['user_id', 'test_number', 'round_number'])
+        op.create_index('ix_recordings_user_id', 'recordings', ['user_id'])
+
+    if not _has_table('sessions'):
+        op.create_table(
+            'sessions',
+            sa.Column('sid', sa.String(length=64), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('sid')
+        )
+        op.create_index('ix_sessions_user_id', 'sessions', ['user_id'])
+        op.create_index('ix_sessions_expires_at', 'sessions', ['expires_at'])
+
+
+def downgrade():
+    op.drop_table('sessions')
+    op.drop_table('recordings')
+    op.drop_table('scores')
+    op.drop_table('users')
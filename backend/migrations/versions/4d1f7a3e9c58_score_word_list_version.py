@@ -0,0 +1,28 @@
+"""score word list version
+
+Revision ID: 4d1f7a3e9c58
+Revises: e2b85f0d6a17
+Create Date: 2026-10-19 16:40:00.000000
+
+Version of the protocols/word-list file each round was scored against.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d1f7a3e9c58'
+down_revision = 'e2b85f0d6a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.add_column(sa.Column('word_list_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.drop_column('word_list_version')
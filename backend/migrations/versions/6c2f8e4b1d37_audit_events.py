@@ -0,0 +1,45 @@
+"""audit events
+
+Revision ID: 6c2f8e4b1d37
+Revises: b5e0c2d8f613
+Create Date: 2026-10-19 21:40:00.000000
+
+- audit_events: security events written in batches by app.audit, indexed
+  for the admin panel's per-user / per-IP / per-type / time queries
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c2f8e4b1d37'
+down_revision = 'b5e0c2d8f613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'audit_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('severity', sa.String(length=10), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(length=100), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('audit_events') as batch_op:
+        batch_op.create_index('ix_audit_events_created_at', ['created_at'])
+        batch_op.create_index('ix_audit_events_user_time', ['user_id', 'created_at'])
+        batch_op.create_index('ix_audit_events_username_time', ['username', 'created_at'])
+        batch_op.create_index('ix_audit_events_ip_time', ['ip_address', 'created_at'])
+        batch_op.create_index('ix_audit_events_type_time', ['event_type', 'created_at'])
+
+
+def downgrade():
+    op.drop_table('audit_events')
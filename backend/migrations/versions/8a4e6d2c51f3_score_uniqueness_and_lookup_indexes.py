@@ -0,0 +1,55 @@
+"""score uniqueness and lookup indexes
+
+Revision ID: 8a4e6d2c51f3
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-19 12:45:00.000000
+
+- one score row per (user, test, round): duplicates are collapsed onto the
+  most recent row, then a unique index replaces idx_user_test_round
+- reset_token lookup (password reset links)
+- lower(email) / lower(username) for the case-insensitive register
+  and forgot-password lookups
+- test_time for the admin/profile time-range filters
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d2c51f3'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the newest row of each (user, test, round); the derived table keeps
+    # this valid on MySQL as well
+    op.execute(
+        "DELETE FROM scores WHERE id NOT IN ("
+        " SELECT keep_id FROM ("
+        "  SELECT MAX(id) AS keep_id FROM scores"
+        "  GROUP BY user_id, test_number, round_number"
+        " ) AS keep"
+        ")"
+    )
+
+    op.create_index('uq_scores_user_test_round', 'scores',
+                    ['user_id', 'test_number', 'round_number'], unique=True, if_not_exists=True)
+    op.drop_index('idx_user_test_round', table_name='scores', if_exists=True)
+    op.create_index('ix_scores_test_time', 'scores', ['test_time'], if_not_exists=True)
+
+    op.create_index('ix_users_reset_token', 'users', ['reset_token'], if_not_exists=True)
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], if_not_exists=True)
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_reset_token', table_name='users')
+
+    op.drop_index('ix_scores_test_time', table_name='scores')
+    op.create_index('idx_user_test_round', 'scores', ['user_id', 'test_number', 'round_number'])
+    op.drop_index('uq_scores_user_test_round', table_name='scores')
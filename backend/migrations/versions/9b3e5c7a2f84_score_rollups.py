@@ -0,0 +1,85 @@
+"""score rollups
+
+Revision ID: 9b3e5c7a2f84
+Revises: 4d1f7a3e9c58
+Create Date: 2026-10-19 18:05:00.000000
+
+- scores.updated_at (backfilled from test_time) as the refresh high-water mark
+- day/week/all-time rollups of scored rounds and completed tests, the
+  per-score and per-(user, test) ledgers behind them, and the refresh state
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e5c7a2f84'
+down_revision = '4d1f7a3e9c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_scores_updated_at', ['updated_at'])
+    op.execute("UPDATE scores SET updated_at = test_time WHERE updated_at IS NULL")
+
+    op.create_table(
+        'round_rollups',
+        sa.Column('period', sa.String(length=4), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('test_number', sa.Integer(), nullable=False),
+        sa.Column('round_number', sa.Integer(), nullable=False),
+        sa.Column('rounds', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('period', 'period_start', 'test_number', 'round_number')
+    )
+    op.create_table(
+        'test_rollups',
+        sa.Column('period', sa.String(length=4), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('test_number', sa.Integer(), nullable=False),
+        sa.Column('completions', sa.Integer(), nullable=False),
+        sa.Column('total_sum', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('period', 'period_start', 'test_number')
+    )
+    op.create_table(
+        'round_rollup_ledger',
+        sa.Column('score_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('test_number', sa.Integer(), nullable=False),
+        sa.Column('round_number', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('score_id')
+    )
+    op.create_table(
+        'test_rollup_ledger',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('test_number', sa.Integer(), nullable=False),
+        sa.Column('completed_on', sa.Date(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'test_number')
+    )
+    rollup_state = op.create_table(
+        'rollup_state',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('high_water', sa.DateTime(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Seeded so concurrent first refreshes contend on an UPDATE, not an INSERT
+    op.bulk_insert(rollup_state, [{'name': 'scores', 'high_water': None, 'refreshed_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table('rollup_state')
+    op.drop_table('test_rollup_ledger')
+    op.drop_table('round_rollup_ledger')
+    op.drop_table('test_rollups')
+    op.drop_table('round_rollups')
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.drop_index('ix_scores_updated_at')
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,69 @@
+"""user search indexes
+
+Revision ID: b5e0c2d8f613
+Revises: 9b3e5c7a2f84
+Create Date: 2026-10-19 19:30:00.000000
+
+Admin user search over username/email:
+- SQLite: an external-content FTS5 table with the trigram tokenizer, kept in
+  sync by triggers (a later batch rebuild of `users` must recreate them)
+- PostgreSQL: pg_trgm GIN indexes on lower(username) / lower(email)
+Other databases, or SQLite builds without FTS5, use the portable search.
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e0c2d8f613'
+down_revision = '9b3e5c7a2f84'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN"
+    " INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);"
+    " END",
+    "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN"
+    " INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);"
+    " END",
+    "CREATE TRIGGER users_fts_au AFTER UPDATE OF username, email ON users BEGIN"
+    " INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);"
+    " INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);"
+    " END",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE users_fts USING fts5("
+                "username, email, content='users', content_rowid='id', tokenize='trigram')"
+            )
+        except sa.exc.OperationalError as e:
+            logger.warning(f"FTS5 trigram search unavailable, user search will use the fallback: {e}")
+            return
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+        for statement in SQLITE_TRIGGERS:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for name in ('users_fts_au', 'users_fts_ad', 'users_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_users_username_trgm")
@@ -0,0 +1,30 @@
+"""recording quality columns
+
+Revision ID: c7d93e1a4b26
+Revises: 8a4e6d2c51f3
+Create Date: 2026-10-19 13:10:00.000000
+
+Speech-activity fraction and quality-gate flags measured before ASR.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d93e1a4b26'
+down_revision = '8a4e6d2c51f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recordings') as batch_op:
+        batch_op.add_column(sa.Column('speech_fraction', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('quality_flags', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recordings') as batch_op:
+        batch_op.drop_column('quality_flags')
+        batch_op.drop_column('speech_fraction')
@@ -0,0 +1,32 @@
+"""score word timings
+
+Revision ID: e2b85f0d6a17
+Revises: c7d93e1a4b26
+Create Date: 2026-10-19 15:20:00.000000
+
+Recall order and packed per-word (start_ms, end_ms) offsets for each round.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b85f0d6a17'
+down_revision = 'c7d93e1a4b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.add_column(sa.Column('recall_sequence', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('word_timings', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('timing_source', sa.String(length=10), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.drop_column('timing_source')
+        batch_op.drop_column('word_timings')
+        batch_op.drop_column('recall_sequence')
@@ -1,5 +1,6 @@
 import os
 import sys
+import click
 from dotenv import load_dotenv
 from flask.cli import FlaskGroup
 from app import create_app, db
@@ -100,6 +101,108 @@ def cleanup_tokens():
         count = cleanup_expired_tokens()
         print(f"Cleaned up {count} expired tokens.")
 
+@app.cli.command()
+def cleanup_sessions():
+    from app.auth.utils import cleanup_expired_sessions
+    with app.app_context():
+        count = cleanup_expired_sessions()
+        print(f"Cleaned up {count} expired sessions.")
+
+@app.cli.command()
+def check_query_plans():
+    """EXPLAIN the hot queries against this database and fail if any full-scans a table"""
+    from app.query_plans import check_query_plans as run_checks
+    with app.app_context():
+        failures = 0
+        for name, plan, scanned in run_checks(db):
+            if plan is None:
+                print(f"?  {name}: EXPLAIN not supported on this database")
+                continue
+            status = "FULL SCAN" if scanned else "ok"
+            print(f"{'✗' if scanned else '✓'}  {name}: {status}")
+            for line in plan:
+                print(f"     {line}")
+            failures += bool(scanned)
+        if failures:
+            print(f"{failures} queries are not index-backed")
+            sys.exit(1)
+
+@app.cli.command()
+@click.option('--budget', type=float, default=None, help='Import-time budget in ms')
+@click.option('--runs', type=int, default=3, help='Profile runs (the fastest is kept)')
+def check_import_time(budget, runs):
+    """Profile `import run` with -X importtime and fail if cold start exceeds the budget"""
+    from app.startup_profile import check_import_time as run_check
+    budget = budget if budget is not None else app.config.get('IMPORT_TIME_BUDGET_MS', 750)
+    report = run_check(budget, runs=runs, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    print(f"Cold import of {report['target']}: {report['total_ms']} ms (budget {report['budget_ms']} ms)")
+    print("Slowest modules (self time):")
+    for name, ms in report['slowest']:
+        print(f"     {ms:8.1f} ms  {name}")
+    if report['eager_deferred_modules']:
+        print(f"Imported at startup but should be deferred: {', '.join(report['eager_deferred_modules'])}")
+    if not report['ok']:
+        sys.exit(1)
+
+@app.cli.command()
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--username', default=None, help='Patient for files that do not name one')
+@click.option('--manifest', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='JSON manifest mapping files to username/test_number/round_number')
+def batch_submit(path, username, manifest):
+    """Score a session of recordings from a zip archive or a directory"""
+    from app.tests.batch import BatchError, items_from_zip, items_from_directory, run_batch
+    from app.tests.protocols import get_registry
+    manifest_data = open(manifest, 'rb').read() if manifest else None
+    with app.app_context():
+        try:
+            max_files = app.config.get('BATCH_MAX_FILES', 20)
+            if os.path.isdir(path):
+                items = items_from_directory(path, manifest_data, username, max_files=max_files)
+            else:
+                with open(path, 'rb') as f:
+                    items = items_from_zip(f, manifest_data, username, max_files=max_files)
+        except BatchError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+        results = run_batch(app, items, get_registry(app), max_workers=app.config.get('BATCH_MAX_WORKERS', 8))
+        failed = 0
+        for r in results:
+            where = f"{r['username']} test {r['test_number']} round {r['round_number']}"
+            if r['status'] == 'ok':
+                print(f"✓  {r['file']} ({where}): score {r['correct_words']}")
+            else:
+                failed += 1
+                print(f"✗  {r['file']} ({where}): {r['error']}")
+        print(f"{len(results) - failed} scored, {failed} failed")
+        if failed:
+            sys.exit(1)
+
+@app.cli.command()
+@click.option('--rebuild', is_flag=True, help='Recompute every rollup from scratch')
+def refresh_rollups(rebuild):
+    """Fold scores written since the last refresh into the admin stats rollups"""
+    from app.rollups import refresh_rollups as refresh, rebuild_rollups
+    from app.tests.protocols import get_registry
+    with app.app_context():
+        registry = get_registry(app)
+        if rebuild:
+            counts = rebuild_rollups(registry)
+        else:
+            counts = refresh(registry, app.config.get('ROLLUP_LAG_SECONDS', 60))
+        print(f"Scanned {counts['scanned']} scores, {counts['changed']} changed, {counts['tests']} tests updated")
+
+@app.cli.command()
+@click.option('--days', type=int, default=None, help='Keep this many days (default AUDIT_RETENTION_DAYS)')
+def prune_audit_events(days):
+    """Delete security audit events older than the retention period"""
+    from app.audit import prune_events
+    with app.app_context():
+        days = days if days is not None else app.config.get('AUDIT_RETENTION_DAYS', 365)
+        print(f"Removed {prune_events(days)} audit events older than {days} days")
+
 @app.cli.command()
 def show_config():
     sensitive_keys = [
@@ -205,6 +308,46 @@ def run_development_server():
         threaded=True
     )
 
+# ----------------------------
+# Production server
+# ----------------------------
+def run_production_server():
+    """Replace this process with gunicorn (see gunicorn.conf.py)"""
+    basedir = os.path.dirname(os.path.abspath(__file__))
+    print(f"🚀 Starting gunicorn (Environment: {os.environ.get('FLASK_ENV', 'unknown')})")
+    print("-" * 50)
+    os.chdir(basedir)
+    try:
+        os.execvp('gunicorn', ['gunicorn', '-c', os.path.join(basedir, 'gunicorn.conf.py'), 'run:app'])
+    except FileNotFoundError:
+        app.logger.error("gunicorn is not installed (pip install -r requirements.txt)")
+        sys.exit(1)
+
+def run_prefork_server():
+    """
+    The built-in prefork server (werkzeug workers): for local runs and
+    memory profiling of the preload path, not for untrusted traffic.
+    """
+    from app.prefork import PreforkServer
+
+    host = os.environ.get('FLASK_HOST', '127.0.0.1')
+    port = int(os.environ.get('FLASK_PORT', 8000))
+    workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 2))
+
+    print(f"🚀 Starting prefork server on http://{host}:{port} with {workers} workers")
+    print(f"Environment: {os.environ.get('FLASK_ENV', 'unknown')}")
+    print("⚠️  werkzeug workers are not a production server; use gunicorn (FLASK_ENV=production)")
+    print("-" * 50)
+
+    PreforkServer(
+        app, db,
+        host=host,
+        port=port,
+        workers=workers,
+        memory_report_interval=app.config.get('PREFORK_MEMORY_REPORT_INTERVAL', 300),
+        client_timeout=app.config.get('PREFORK_CLIENT_TIMEOUT', 30)
+    ).serve()
+
 # ----------------------------
 # Initialize
 # ----------------------------
@@ -212,24 +355,25 @@ init_logging()
 setup_error_handlers()
 validate_production_config()
 
-with app.app_context():
-    try:
-        db.create_all()
-        app.logger.info("Database tables verified/created successfully")
-    except Exception as e:
-        app.logger.error(f"Database initialization error: {str(e)}")
-        if __name__ == '__main__':
-            sys.exit(1)
-
 # ----------------------------
 # Run if main
 # ----------------------------
 if __name__ == '__main__':
     env = os.environ.get('FLASK_ENV', 'development')
+    if '--prefork' in sys.argv:
+        run_prefork_server()
+        sys.exit(0)
     if env == 'production':
-        print("🚨 PRODUCTION MODE DETECTED! Use a proper WSGI server.")
-        if input("Continue with development server anyway? [y/N]: ").lower() not in ['y', 'yes']:
-            sys.exit(0)
+        run_production_server()
+    # Schema creation is explicit (`flask init-db` / `flask db upgrade`);
+    # only the development server creates missing tables on start
+    with app.app_context():
+        try:
+            db.create_all()
+            app.logger.info("Database tables verified/created successfully")
+        except Exception as e:
+            app.logger.error(f"Database initialization error: {str(e)}")
+            sys.exit(1)
     run_development_server()
 else:
     app.logger.info(f"Flask app loaded for WSGI (Environment: {os.environ.get('FLASK_ENV', 'unknown')})")
@@ -0,0 +1,48 @@
+import pytest
+from app import create_app, db as _db
+
+PASSWORD = 'Passw0rd!x'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Testing app on an in-memory database, run from a scratch directory (voices/ is relative)"""
+    monkeypatch.chdir(tmp_path)
+    app = create_app('testing')
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    from werkzeug.security import generate_password_hash
+    from app.models.user import User
+
+    def make_user(username='alice', role='user'):
+        user = User(username=username, email=f'{username}@example.com',
+                    password_hash=generate_password_hash(PASSWORD), role=role)
+        _db.session.add(user)
+        _db.session.commit()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def login(client):
+    def login(username='alice', password=PASSWORD, test_client=None):
+        return (test_client or client).post('/api/auth/login', json={'username': username, 'password': password})
+    return login
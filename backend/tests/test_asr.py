@@ -0,0 +1,106 @@
+import io
+import os
+import time
+import pytest
+from app.tests.asr import ResilientASR, HttpBackend, ASRUnavailable
+from app.tests.fake_asr import FakeASRServer, DEFAULT_TRANSCRIPT
+
+PCM = b'\0\0' * 1600  # 0.1 s of 16 kHz silence
+
+
+@pytest.fixture
+def fake_asr():
+    servers = []
+
+    def start(**options):
+        server = FakeASRServer(('127.0.0.1', 0), **options)
+        server.start_background()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def client_for(server, **options):
+    options = {'deadline': 5.0, 'call_timeout': 2.0, 'retry_base_delay': 0.01, 'retry_max_delay': 0.01,
+               **options}
+    return ResilientASR([HttpBackend(server.url)], **options)
+
+
+def transcript(result):
+    return result['alternative'][0]['transcript']
+
+
+def test_retry_then_success(fake_asr):
+    server = fake_asr(fail_first=1)
+    client = client_for(server, max_retries=2)
+
+    assert transcript(client.recognize(PCM, 16000, 2)) == DEFAULT_TRANSCRIPT
+    assert server.requests == 2
+    stats = client.stats()[0]
+    assert (stats['calls'], stats['failures'], stats['state']) == (2, 1, 'closed')
+
+
+def test_hedged_request_wins(fake_asr):
+    server = fake_asr(hang_first=1, hang=3.0)
+    client = client_for(server, max_retries=0, call_timeout=5.0, hedge=True, hedge_delay=0.1)
+
+    started = time.monotonic()
+    assert transcript(client.recognize(PCM, 16000, 2)) == DEFAULT_TRANSCRIPT
+    assert time.monotonic() - started < 2.0
+    stats = client.stats()[0]
+    assert (stats['hedges'], stats['hedge_wins']) == (1, 1)
+
+
+def test_breaker_opens_then_recovers_half_open(fake_asr):
+    server = fake_asr(error_rate=1.0)
+    client = client_for(server, max_retries=0, breaker_failures=3, breaker_reset=0.3)
+
+    for _ in range(3):
+        with pytest.raises(ASRUnavailable):
+            client.recognize(PCM, 16000, 2)
+    assert client.stats()[0]['state'] == 'open'
+
+    # Short-circuited: the engine isn't called while the breaker is open
+    with pytest.raises(ASRUnavailable, match='circuit open') as excinfo:
+        client.recognize(PCM, 16000, 2)
+    assert server.requests == 3
+    assert excinfo.value.retry_after == 1
+
+    time.sleep(0.35)
+    assert client.stats()[0]['state'] == 'half-open'
+    server.error_rate = 0.0
+    assert transcript(client.recognize(PCM, 16000, 2)) == DEFAULT_TRANSCRIPT
+    assert client.stats()[0]['state'] == 'closed'
+
+
+def test_submit_audio_answers_503_with_retry_after(app, make_user, login, client, fake_asr, monkeypatch):
+    from pydub import AudioSegment
+    from app.tests import processing
+
+    server = fake_asr(error_rate=1.0)
+    app.extensions['asr'] = client_for(server, max_retries=0, breaker_failures=1, breaker_reset=30.0)
+    app.config['AUDIO_QUALITY_GATE'] = 'off'
+
+    canonical = []
+
+    def normalize(path, **options):
+        # Decoding needs ffmpeg; hand ASR a silent segment instead
+        canonical.append(os.path.splitext(path)[0] + '.flac')
+        open(canonical[-1], 'wb').close()
+        return AudioSegment.silent(duration=500, frame_rate=16000), canonical[-1], {'duration': 0.5}
+
+    monkeypatch.setattr(processing, 'normalize_recording', normalize)
+    make_user()
+    login()
+
+    response = client.post('/api/tests/submit-audio', data={
+        'test_number': '1', 'round_number': '1', 'audio': (io.BytesIO(b'RIFF' + b'\0' * 64), 'rec.wav'),
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 503
+    assert 28 <= int(response.headers['Retry-After']) <= 30
+    assert not os.path.exists(canonical[0])
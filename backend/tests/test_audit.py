@@ -0,0 +1,61 @@
+import time
+import pytest
+from app.audit import AuditLog
+from app.models.audit import AuditEvent
+
+
+@pytest.fixture
+def make_audit_log(app):
+    """A buffered AuditLog of its own, so no worker thread outlives the settings it was started with"""
+    def make_audit_log(interval, batch):
+        app.config.update(AUDIT_ASYNC=True, AUDIT_FLUSH_INTERVAL=interval, AUDIT_FLUSH_BATCH=batch)
+        return AuditLog(app)
+    return make_audit_log
+
+
+def stored(db):
+    db.session.expire_all()
+    return AuditEvent.query.count()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_flushes_once_the_batch_fills(db, make_audit_log):
+    audit = make_audit_log(interval=60, batch=3)
+    audit.record('login_failed', username='alice')
+    audit.record('login_failed', username='alice')
+    time.sleep(0.1)
+    assert stored(db) == 0
+    assert audit.stats()['buffered'] == 2
+
+    audit.record('account_locked', username='alice')
+    assert wait_for(lambda: audit.written == 3)
+    assert stored(db) == 3
+
+
+def test_flushes_on_the_interval(db, make_audit_log):
+    audit = make_audit_log(interval=0.1, batch=500)
+    audit.record('login_success', username='alice')
+    assert wait_for(lambda: audit.written == 1)
+    assert stored(db) == 1
+
+
+def test_flushes_on_worker_exit(db, make_audit_log, monkeypatch):
+    from app.prefork import before_exit
+
+    audit = make_audit_log(interval=60, batch=500)
+    monkeypatch.setattr('app.audit_log', audit)
+    audit.record('logout', username='alice')
+    audit.record('logout', username='bob')
+    assert stored(db) == 0
+
+    before_exit()
+    assert audit.stats() == {'buffered': 0, 'written': 2, 'dropped': 0, 'failures': 0}
+    assert stored(db) == 2
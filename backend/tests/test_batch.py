@@ -0,0 +1,99 @@
+import io
+import os
+import json
+import zipfile
+import pytest
+from sqlalchemy import event
+from app.models.score import Score
+from app.tests import batch, processing
+from app.tests.batch import items_from_zip, run_batch
+from app.tests.protocols import get_registry
+
+# Stub transcript per patient (the saved path is voices/<username>/...)
+TRANSCRIPTS = {'alice': 'تراکتور هویج', 'c': 'موکت سیر'}
+
+
+def make_zip():
+    manifest = [
+        {'file': 'a.wav', 'username': 'alice', 'test_number': 1, 'round_number': 1},
+        {'file': 'b.wav', 'username': 'alice', 'test_number': 1, 'round_number': 1},  # duplicate round
+        {'file': 'ghost.wav', 'username': 'ghost', 'test_number': 1, 'round_number': 2},
+    ]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('manifest.json', json.dumps(manifest))
+        for name in ('a.wav', 'b.wav', 'ghost.wav', 'c_t1_r2.wav'):
+            archive.writestr(name, b'RIFF' + b'\0' * 64)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def stub_audio(app, monkeypatch):
+    """Skip decoding (needs ffmpeg) and ASR; the transcript is picked by patient"""
+    from pydub import AudioSegment
+
+    def normalize(path, **options):
+        canonical = os.path.splitext(path)[0] + '.flac'
+        open(canonical, 'wb').close()
+        segment = AudioSegment.silent(duration=1000, frame_rate=16000)
+        segment.source = path.split(os.sep)[1]
+        return segment, canonical, {'codec': 'flac', 'sample_rate': 16000, 'channels': 1, 'duration': 1.0}
+
+    def recognize(segment):
+        return [{'transcript': TRANSCRIPTS[segment.source], 'confidence': 0.9}]
+
+    app.config['AUDIO_QUALITY_GATE'] = 'off'
+    monkeypatch.setattr(processing, 'normalize_recording', normalize)
+    monkeypatch.setattr(processing, 'recognize_audio', recognize)
+
+
+def test_zip_batch_reports_per_file_and_commits_once(app, db, make_user, stub_audio):
+    alice = make_user('alice')
+    make_user('c')
+    items = items_from_zip(make_zip(), default_username='alice')
+
+    commits = []
+
+    def record(session):
+        commits.append(session)
+
+    event.listen(db.session, 'after_commit', record)
+    try:
+        results = run_batch(app, items, get_registry(app), max_workers=2)
+    finally:
+        event.remove(db.session, 'after_commit', record)
+
+    by_file = {result['file']: result for result in results}
+    assert [result['file'] for result in results] == [item.name for item in items]
+    assert by_file['a.wav']['status'] == 'ok'
+    assert by_file['a.wav']['correct_words'] == 2
+    assert by_file['b.wav']['status'] == 'error'
+    assert by_file['b.wav']['error'] == "این دور بیش از یک بار در فایل‌ها آمده است"
+    assert by_file['ghost.wav']['error'] == "کاربر یافت نشد"
+    assert by_file['c_t1_r2.wav']['status'] == 'ok'
+    assert (by_file['c_t1_r2.wav']['username'], by_file['c_t1_r2.wav']['round_number']) == ('c', 2)
+
+    assert len(commits) == 1
+    scores = {(s.user_id, s.round_number): s.score for s in Score.query.all()}
+    assert scores[(alice.id, 1)] == 2
+    assert len(scores) == 2
+
+
+def test_failed_store_writes_nothing(app, make_user, stub_audio, monkeypatch):
+    make_user('alice')
+    make_user('c')
+    stored = []
+
+    def store_result(user_id, spec, version, result):
+        stored.append(result.canonical_path)
+        if len(stored) == 2:
+            raise RuntimeError('disk full')
+        processing.store_result(user_id, spec, version, result)
+
+    monkeypatch.setattr(batch, 'store_result', store_result)
+    results = run_batch(app, items_from_zip(make_zip(), default_username='alice'), get_registry(app))
+
+    assert [r['status'] for r in results] == ['error'] * 4
+    assert Score.query.count() == 0
+    assert not any(os.path.exists(path) for path in stored)
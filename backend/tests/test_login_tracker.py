@@ -0,0 +1,58 @@
+import sys
+import time
+import pytest
+from app import login_tracker
+from app.login_tracker import MemoryAttemptStore
+
+
+class Clock:
+    """Stands in for the time module in app.login_tracker"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(app, monkeypatch):
+    """A fresh memory attempt store (the tracker is a process-wide singleton) on a controllable clock"""
+    store = MemoryAttemptStore()
+    monkeypatch.setattr(login_tracker, '_memory', store)
+    monkeypatch.setattr(login_tracker, '_store', store)
+    clock = Clock()
+    # By module: `app.login_tracker` names the tracker instance
+    monkeypatch.setattr(sys.modules[MemoryAttemptStore.__module__], 'time', clock)
+    return clock
+
+
+def test_lockout_after_max_attempts(make_user, login, clock):
+    make_user()
+    for attempt in range(1, login_tracker.max_attempts):
+        response = login(password='wrong')
+        assert response.status_code == 401
+        assert f"{login_tracker.max_attempts - attempt} attempts remaining" in response.json['error']
+
+    response = login(password='wrong')
+    assert response.status_code == 401
+    assert response.json['error'].startswith('Account locked due to too many failed attempts')
+
+    # The right password doesn't get through while the lockout runs
+    assert login().status_code == 423
+    clock.advance(login_tracker.lockout + 1)
+    assert login().status_code == 200
+
+
+def test_failures_expire_with_the_window(make_user, clock):
+    user = make_user()
+    for _ in range(login_tracker.max_attempts - 1):
+        attempts, locked_until = login_tracker.record_failure(user.id)
+    assert (attempts, locked_until) == (login_tracker.max_attempts - 1, None)
+
+    clock.advance(login_tracker.window + 1)
+    assert login_tracker.record_failure(user.id) == (1, None)
+    assert login_tracker.locked_until(user.id) is None
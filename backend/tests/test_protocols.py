@@ -0,0 +1,34 @@
+import os
+import json
+import logging
+from app.tests.protocols import ProtocolStore, DEFAULT_PROTOCOLS_FILE
+
+
+def write(path, data, mtime_ns):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_edit_without_version_bump_is_reloaded(tmp_path, caplog):
+    with open(DEFAULT_PROTOCOLS_FILE, encoding='utf-8') as f:
+        data = json.load(f)
+    path = tmp_path / 'protocols.json'
+    write(path, data, 1_000_000_000)
+    store = ProtocolStore(str(path), poll_interval=None)
+    before = store.current()
+
+    # Touched but unchanged: nothing to swap
+    write(path, data, 2_000_000_000)
+    assert not store.reload_if_changed()
+
+    list_id = next(iter(data['word_lists']))
+    data['word_lists'][list_id]['words'][0] += 'ها'
+    write(path, data, 3_000_000_000)
+    with caplog.at_level(logging.ERROR, logger='app.tests.protocols'):
+        assert store.reload_if_changed()
+
+    after = store.current()
+    assert after.release == before.release == data['version']
+    assert after.version != before.version
+    assert after.version.startswith(data['version'] + '+')
+    assert 'without a version bump' in caplog.text
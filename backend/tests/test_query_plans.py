@@ -0,0 +1,31 @@
+import os
+import pytest
+import config
+from flask_migrate import upgrade
+from app import create_app, db
+from app.query_plans import hot_queries, check_query_plans
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture(scope='module')
+def migrated_app(tmp_path_factory):
+    """The schema as deployed: built by the migrations, not create_all()"""
+    uri = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'app.db'}"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(config.TestingConfig, 'SQLALCHEMY_DATABASE_URI', uri)
+        app = create_app('testing')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        yield app
+
+
+@pytest.fixture(scope='module')
+def plans(migrated_app):
+    return {name: (plan, scanned) for name, plan, scanned in check_query_plans(db)}
+
+
+@pytest.mark.parametrize('name', [name for name, _ in hot_queries()])
+def test_hot_query_is_index_backed(plans, name):
+    plan, scanned = plans[name]
+    assert not scanned, f"{name} full-scans {scanned}: {plan}"
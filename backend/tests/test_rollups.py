@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from app.models.score import Score
+from app.models import rollup
+from app.rollups import ALL_TIME_START, refresh_rollups, rebuild_rollups
+from app.tests.protocols import get_registry
+
+
+def snapshot():
+    """Non-empty rollup rows; a withdrawn contribution may leave a zeroed row behind"""
+    rounds = {(r.period, r.period_start, r.test_number, r.round_number): (r.rounds, round(r.score_sum, 6))
+              for r in rollup.RoundRollup.query if r.rounds}
+    tests = {(t.period, t.period_start, t.test_number): (t.completions, round(t.total_sum, 6))
+             for t in rollup.TestRollup.query if t.completions}
+    return rounds, tests
+
+
+def test_incremental_rollups_match_a_rebuild(app, db, make_user):
+    registry = get_registry(app)
+    alice, bob = make_user('alice'), make_user('bob')
+    monday = datetime(2026, 10, 12, 10)
+    test_rounds = sorted(registry.get(1).rounds)
+
+    def write(user, round_number, score, when):
+        Score.upsert_round(user.id, 1, round_number, score=score, correct_words=[], incorrect_words=[],
+                           test_time=when)
+        db.session.commit()
+        refresh_rollups(registry, lag_seconds=0)
+
+    for round_number in test_rounds:
+        write(alice, round_number, round_number, monday)
+    write(bob, 1, 4, monday + timedelta(days=1))
+    # Retakes: a new score on another day (next week), and a completed test's total changing
+    write(bob, 1, 6, monday + timedelta(days=8))
+    write(alice, test_rounds[0], 9, monday + timedelta(days=2))
+    write(alice, test_rounds[0], 9, monday + timedelta(days=2))
+
+    incremental = snapshot()
+    assert incremental[1][('all', ALL_TIME_START, 1)][0] == 1
+    assert incremental[0][('all', ALL_TIME_START, 1, 1)] == (2, 15)
+    rebuild_rollups(registry)
+    assert snapshot() == incremental
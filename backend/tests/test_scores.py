@@ -0,0 +1,20 @@
+import time
+from app.models.score import Score
+
+
+def test_upsert_round_overwrites_one_row(db, make_user):
+    user = make_user()
+    first = Score.upsert_round(user.id, 1, 1, score=2, correct_words=['سیر', 'ببر'], incorrect_words=[])
+    db.session.commit()
+    first_id, first_written = first.id, first.updated_at
+
+    time.sleep(0.01)
+    second = Score.upsert_round(user.id, 1, 1, score=3, correct_words=['سیر', 'ببر', 'میز'], incorrect_words=[])
+    db.session.commit()
+    db.session.expire_all()
+
+    rows = Score.query.filter_by(user_id=user.id, test_number=1, round_number=1).all()
+    assert [row.id for row in rows] == [first_id] == [second.id]
+    assert rows[0].score == 3
+    assert rows[0].correct_words == ['سیر', 'ببر', 'میز']
+    assert rows[0].updated_at > first_written
@@ -0,0 +1,47 @@
+from app.tests.scoring import fuse_alternatives, score_alternatives
+
+TARGETS = ['سیر', 'ببر', 'میز']
+
+# One utterance, the engine unsure about each word's first sound
+COMPETING_SLOTS = [
+    {'transcript': 'سیر ببر میز', 'confidence': 0.95},
+    {'transcript': 'شیر ببر میز'},
+    {'transcript': 'سیر پر میز'},
+    {'transcript': 'شیر پر میز'},
+    {'transcript': 'سیر ببر میل'},
+]
+
+
+def test_competing_hypotheses_share_one_slot():
+    score, correct, incorrect, words = score_alternatives(COMPETING_SLOTS, TARGETS)
+    assert words == ['سیر', 'ببر', 'میز']
+    assert correct == ['سیر', 'ببر', 'میز']
+    assert incorrect == []
+    assert score == 3
+
+
+def test_slot_posteriors_split_the_mass():
+    _, posteriors = fuse_alternatives(COMPETING_SLOTS, TARGETS)
+    assert abs(posteriors['سیر'] + posteriors['شیر'] - 1) < 0.01
+    assert posteriors['سیر'] > posteriors['شیر']
+
+
+def test_competing_targets_admit_one_per_slot():
+    score, correct, incorrect, _ = score_alternatives(COMPETING_SLOTS, TARGETS + ['شیر'])
+    assert correct == ['سیر', 'ببر', 'میز']
+    assert incorrect == []
+    assert score == 3
+
+
+def test_target_admitted_by_threshold_beside_an_intrusion():
+    alternatives = [{'transcript': 'شیر ببر', 'confidence': 0.6}, {'transcript': 'سیر ببر', 'confidence': 0.4}]
+    _, correct, incorrect, words = score_alternatives(alternatives, TARGETS)
+    assert words == ['شیر', 'سیر', 'ببر']
+    assert correct == ['سیر', 'ببر']
+    assert incorrect == ['شیر']
+
+
+def test_top_alternative_repetitions_kept():
+    alternatives = [{'transcript': 'گل گل میز'}, {'transcript': 'گل میز سیب'}, {'transcript': 'گل میز سیب'}]
+    _, correct, _, _ = score_alternatives(alternatives, ['گل', 'میز', 'سیب'])
+    assert correct == ['گل', 'گل', 'میز', 'سیب']
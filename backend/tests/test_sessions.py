@@ -0,0 +1,26 @@
+import pytest
+from app.sessions import init_session_interface
+
+
+@pytest.fixture(params=['cookie', 'sql'])
+def session_app(request, app, db):
+    app.config['SESSION_BACKEND'] = request.param
+    init_session_interface(app, db)
+    return app
+
+
+def test_static_media_does_not_vary_by_cookie(session_app, make_user, login, client):
+    make_user()
+    assert login().status_code == 200
+    response = client.get('/api/audio/test1.m4a')
+    assert response.status_code == 200
+    assert 'Cookie' not in response.vary
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_session_reads_vary_by_cookie(session_app, make_user, login, client):
+    make_user()
+    login()
+    response = client.get('/api/user-profile')
+    assert response.status_code == 200
+    assert 'Cookie' in response.vary
@@ -0,0 +1,14 @@
+import config
+from app import create_app, db
+from app.db_routing import REPLICA_BIND
+
+
+def test_pragmas_apply_to_the_read_replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.TestingConfig, 'DATABASE_REPLICA_URL', f"sqlite:///{tmp_path / 'replica.db'}",
+                        raising=False)
+    app = create_app('testing')
+    with app.app_context():
+        engine = db.engines[REPLICA_BIND]
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
@@ -0,0 +1,22 @@
+import os
+import sys
+import json
+import subprocess
+from app.startup_profile import DEFERRED_MODULES
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# create_app() in a fresh interpreter, so modules other tests imported don't count
+_PROBE = """
+import sys, json
+from app import create_app
+create_app('testing')
+print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in %r)))
+"""
+
+
+def test_create_app_defers_heavy_modules():
+    proc = subprocess.run([sys.executable, '-c', _PROBE % (DEFERRED_MODULES,)], cwd=BACKEND,
+                          capture_output=True, text=True, check=True)
+    eager = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert eager == [], f"imported while the app boots: {eager}"
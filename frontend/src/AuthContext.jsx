@@ -1,4 +1,4 @@
-import React, { createContext, useState, useEffect } from 'react';
+import React, { createContext, useState, useEffect, useCallback } from 'react';
 
 export const AuthContext = createContext();
 
@@ -6,49 +6,42 @@ export const AuthProvider = ({ children }) => {
   const [logged, setLogged] = useState(false);
   const [isAdmin, setIsAdmin] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
+  const [user, setUser] = useState(null);
+  const [completedTests, setCompletedTests] = useState([]);
 
-  // Fetch login status once on mount
-  useEffect(() => {
-    const fetchAuthStatus = async () => {
-      try {
-        const response = await fetch('/api/auth/check-login'); // Absolute path
-        if (response.ok) {
-          const data = await response.json();
-          setLogged(data.logged === "true");
-        } else {
-          console.error('Failed to fetch login status');
-        }
-      } catch (error) {
-        console.error('Error fetching auth status:', error);
-      } finally {
-        setIsLoading(false);
+  // Fetch login state, role, profile and test progress in one request
+  const refreshSession = useCallback(async () => {
+    try {
+      const response = await fetch('/api/session', { credentials: 'include' });
+      if (response.ok) {
+        const data = await response.json();
+        setLogged(data.logged === "true");
+        setIsAdmin(data.isAdmin === "true");
+        setUser(data.user);
+        setCompletedTests(data.tests ? data.tests.completed : []);
+      } else {
+        console.error('Failed to fetch session');
       }
-    };
-
-    fetchAuthStatus();
+    } catch (error) {
+      console.error('Error fetching session:', error);
+    } finally {
+      setIsLoading(false);
+    }
   }, []);
 
-  // Fetch admin status once on mount
   useEffect(() => {
-    const fetchAdminStatus = async () => {
-      try {
-        const response = await fetch('/api/auth/check-admin'); // Absolute path
-        if (response.ok) {
-          const data = await response.json();
-          setIsAdmin(data.isAdmin === "true");
-        } else {
-          console.error('Failed to fetch admin status');
-        }
-      } catch (error) {
-        console.error('Error fetching admin status:', error);
-      }
-    };
-
-    fetchAdminStatus();
-  }, []);
+    refreshSession();
+  }, [refreshSession]);
 
   return (
-    <AuthContext.Provider value={{ logged, setLogged, isAdmin, setIsAdmin, isLoading, setIsLoading }}>
+    <AuthContext.Provider value={{
+      logged, setLogged,
+      isAdmin, setIsAdmin,
+      isLoading, setIsLoading,
+      user, setUser,
+      completedTests,
+      refreshSession
+    }}>
       {children}
     </AuthContext.Provider>
   );
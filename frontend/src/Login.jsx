@@ -8,7 +8,7 @@ import { useLanguage } from "./LanguageContext";
 
 export default function Login() {
   const navigate = useNavigate();
-  const { setLogged, setIsAdmin } = useContext(AuthContext);
+  const { setLogged, setIsAdmin, refreshSession } = useContext(AuthContext);
 
   const [username, setUsername] = useState("");
   const [password, setPassword] = useState("");
@@ -74,6 +74,7 @@ export default function Login() {
               setIsAdmin(adminData.isAdmin === "true");
             }
           }
+          refreshSession();
 
           navigate("/profile", true);
           setUsername("");
@@ -3,6 +3,7 @@ import { useLocation, useNavigate } from 'react-router-dom';
 // import DonutChart from 'react-donut-chart';
 import './Result.css';
 import { useLanguage } from './LanguageContext';
+import useProtocols from './useProtocols';
 
 export default function Result() {
   const { state } = useLocation();
@@ -13,6 +14,7 @@ export default function Result() {
   } = state || {};
 
   const { language } = useLanguage();
+  const { protocols, roundCount } = useProtocols();
 
   // parse URL to compute next path
   const [nextPath, setNextPath] = useState('/');
@@ -24,11 +26,12 @@ export default function Result() {
     const r = Number(parts[4]);
 
     if (!isNaN(t) && !isNaN(r)) {
-      if (r < 5) setNextPath(`/profile/tests/${t}/${r + 1}`);
+      if (r < roundCount(t)) setNextPath(`/profile/tests/${t}/${r + 1}`);
       else setNextPath('/profile/tests');
     }
     console.log(t, r);
-  }, []);
+  // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [protocols]);
 
   if (!state) {
     return <p>
@@ -5,8 +5,8 @@ import "./Test.css";
 import { useDropzone } from "react-dropzone";
 import { useLocation, useNavigate } from "react-router-dom";
 import PuffLoader from "react-spinners/PuffLoader";
-import { ConvertWebmToWav } from "./ConvertWebmToWav";
 import { useLanguage } from './LanguageContext';
+import useProtocols from './useProtocols';
 
 // file size limitation (5MB)
 const MAX_FILE_SIZE_MB = 5;
@@ -17,14 +17,28 @@ const validateAudioFile = (file) => {
   if (!file) return { valid: false, key: "noFile" };
   if (file.size > MAX_FILE_SIZE_BYTES) return { valid: false, key: "fileTooLarge" };
 
-  const allowedTypes = ['audio/mp3', 'audio/mpeg', 'audio/m4a', 'audio/wav', 'audio/webm', 'audio/ogg'];
-  if (!allowedTypes.includes(file.type) && !file.name.match(/\.(mp3|m4a|wav|webm|ogg)$/i)) {
+  const allowedTypes = ['audio/mp3', 'audio/mpeg', 'audio/m4a', 'audio/mp4', 'audio/wav', 'audio/webm', 'audio/ogg', 'audio/flac'];
+  if (!allowedTypes.includes(file.type) && !file.name.match(/\.(mp3|m4a|wav|webm|ogg|opus|flac)$/i)) {
     return { valid: false, key: "invalidFile" };
   }
 
   return { valid: true, key: null };
 };
 
+// extension for a recorded blob, derived from the recorder's mimetype
+const RECORDING_EXTENSIONS = {
+  "audio/webm": "webm",
+  "audio/ogg": "ogg",
+  "audio/mp4": "m4a",
+  "audio/mpeg": "mp3",
+  "audio/wav": "wav",
+};
+
+const baseMimeType = (type) => (type || "").split(";")[0].trim().toLowerCase();
+
+const recordingFilename = (blob) =>
+  `recording.${RECORDING_EXTENSIONS[baseMimeType(blob.type)] || "webm"}`;
+
 // validation for recorded blob
 const validateRecordedBlob = (blob) => {
   if (!blob) return { valid: false, key: "noRecording" };
@@ -43,8 +57,8 @@ const errorMessages = {
     fa: `حجم فایل از ${MAX_FILE_SIZE_MB} مگابایت بیشتر است`
   },
   invalidFile: {
-    en: "Please select a valid audio file (MP3, M4A, WAV, WebM, OGG)",
-    fa: "لطفاً یک فایل صوتی معتبر انتخاب کنید (MP3, M4A, WAV, WebM, OGG)"
+    en: "Please select a valid audio file (MP3, M4A, WAV, WebM, OGG, Opus, FLAC)",
+    fa: "لطفاً یک فایل صوتی معتبر انتخاب کنید (MP3, M4A, WAV, WebM, OGG, Opus, FLAC)"
   },
   noRecording: {
     en: "Please record something first",
@@ -62,9 +76,9 @@ const errorMessages = {
     en: "Connection error. Please try again.",
     fa: "خطا در اتصال. لطفاً دوباره امتحان کنید."
   },
-  conversionFailed: {
-    en: "Audio conversion failed. Please try again.",
-    fa: "تبدیل صدا ناموفق بود. لطفاً دوباره امتحان کنید."
+  unsupportedRecording: {
+    en: "This browser records in a format the server does not accept.",
+    fa: "مرورگر شما با فرمتی ضبط می‌کند که سرور آن را نمی‌پذیرد."
   }
 };
 
@@ -79,6 +93,10 @@ const translateServerError = (serverError, language) => {
       en: "Error processing audio file",
       fa: "خطا در پردازش فایل صوتی"
     },
+    "فایل صوتی قابل خواندن نیست. لطفاً فایل دیگری ارسال کنید.": {
+      en: "The audio file could not be read. Please send another file.",
+      fa: "فایل صوتی قابل خواندن نیست. لطفاً فایل دیگری ارسال کنید."
+    },
     "فایل صوتی نامعتبر است": {
       en: "Invalid audio file",
       fa: "فایل صوتی نامعتبر است"
@@ -86,6 +104,22 @@ const translateServerError = (serverError, language) => {
     "مشکل در ارتباط با سرویس تشخیص صدا": {
       en: "Problem connecting to speech recognition service",
       fa: "مشکل در ارتباط با سرویس تشخیص صدا"
+    },
+    "ضبط صدا خیلی کوتاه است. لطفاً کلمات را کامل بیان کنید و دوباره ضبط کنید.": {
+      en: "The recording is too short. Please say all the words and record again.",
+      fa: "ضبط صدا خیلی کوتاه است. لطفاً کلمات را کامل بیان کنید و دوباره ضبط کنید."
+    },
+    "صدایی در فایل ضبط‌شده شنیده نمی‌شود. لطفاً میکروفون را بررسی کنید و دوباره ضبط کنید.": {
+      en: "No sound was picked up. Please check your microphone and record again.",
+      fa: "صدایی در فایل ضبط‌شده شنیده نمی‌شود. لطفاً میکروفون را بررسی کنید و دوباره ضبط کنید."
+    },
+    "صدا بیش از حد بلند و دچار اعوجاج است. لطفاً کمی دورتر از میکروفون صحبت کنید و دوباره ضبط کنید.": {
+      en: "The recording is too loud and distorted. Please speak a little further from the microphone and record again.",
+      fa: "صدا بیش از حد بلند و دچار اعوجاج است. لطفاً کمی دورتر از میکروفون صحبت کنید و دوباره ضبط کنید."
+    },
+    "گفتاری در فایل ضبط‌شده تشخیص داده نشد. لطفاً واضح‌تر صحبت کنید و دوباره ضبط کنید.": {
+      en: "No speech was detected in the recording. Please speak more clearly and record again.",
+      fa: "گفتاری در فایل ضبط‌شده تشخیص داده نشد. لطفاً واضح‌تر صحبت کنید و دوباره ضبط کنید."
     }
   };
 
@@ -114,10 +148,14 @@ export default function Test() {
   // server error state
   const [serverError, setServerError] = useState(null);
 
+  // codecs the backend decodes natively (recordings are uploaded as-is)
+  const [acceptedMimeTypes, setAcceptedMimeTypes] = useState(null);
+
   const location = useLocation();
   const navigate = useNavigate();
 
   const { language } = useLanguage();
+  const { roundCount } = useProtocols();
 
   const {
     startRecording,
@@ -164,6 +202,23 @@ export default function Test() {
     }
   }, [recordingBlob]);
 
+  // Fetch accepted upload codecs once
+  useEffect(() => {
+    const fetchAudioFormats = async () => {
+      try {
+        const response = await fetch("/api/tests/audio-formats");
+        if (response.ok) {
+          const data = await response.json();
+          setAcceptedMimeTypes(data.accepted.map((codec) => baseMimeType(codec.mimetype)));
+        }
+      } catch (error) {
+        console.error("Error fetching audio formats:", error);
+      }
+    };
+
+    fetchAudioFormats();
+  }, []);
+
   const onDrop = useCallback((acceptedFiles) => {
     if (acceptedFiles.length > 0) {
       const file = acceptedFiles[0];
@@ -200,9 +255,13 @@ export default function Test() {
     }
   });
 
-  async function sendAudioToBackend(file) {
+  async function sendAudioToBackend(file, filename) {
     const formData = new FormData();
-    formData.append("audio", file);
+    if (filename) {
+      formData.append("audio", file, filename);
+    } else {
+      formData.append("audio", file);
+    }
     formData.append("test_number", currentTest);
     formData.append("round_number", currentRound);
 
@@ -265,24 +324,14 @@ export default function Test() {
       return;
     }
 
-    setLoading2(true);
-
-    try {
-      const wavBlob = await ConvertWebmToWav(recordedBlob);
-
-      const wavValidation = validateRecordedBlob(wavBlob);
-      if (!wavValidation.valid) {
-        showError(wavValidation.key);
-        setLoading2(false);
-        return;
-      }
-
-      await sendAudioToBackend(wavBlob);
-    } catch (err) {
-      console.error(language === "en" ? "Conversion failed:" : "تبدیل صدا ناموفق بود!", err);
-      showError("conversionFailed");
-      setLoading2(false);
+    // the compressed recording is uploaded as-is; the backend decodes it
+    if (acceptedMimeTypes && !acceptedMimeTypes.includes(baseMimeType(recordedBlob.type))) {
+      showError("unsupportedRecording");
+      return;
     }
+
+    setLoading2(true);
+    await sendAudioToBackend(recordedBlob, recordingFilename(recordedBlob));
   }
 
   // Choose file handler
@@ -343,12 +392,12 @@ export default function Test() {
         <div className="col-12 col-sm-8 col-md-6 col-lg-3">
           <audio controls key={`${currentTest}-${currentRound}`}>
             <source
-              src={`/static/audio/test${currentTest}.m4a`} type="audio/x-m4a"
+              src={`/api/audio/test${currentTest}.m4a`} type="audio/x-m4a"
               preload="auto"
             />
           </audio>
           <div className="text-center pt-2">{language === "en" ? "Round " : "دور "} {currentRound}
-            {language === "en" ? " of 5" : " از 5"}</div>
+            {language === "en" ? ` of ${roundCount(currentTest)}` : ` از ${roundCount(currentTest)}`}</div>
         </div>
       </div>
 
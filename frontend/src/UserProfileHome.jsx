@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import DataTable from "react-data-table-component";
 import ProfileImageUpload from "./ProfileImageUpload";
 import { useLanguage } from './LanguageContext';
+import useProtocols from './useProtocols';
 import {
   GoCheckCircle,
   GoXCircle,
@@ -49,14 +50,18 @@ const UserProfileHome = () => {
   const isDesktop = useIsDesktop(992);
 
   const t = (en, fa) => (language === 'en' ? en : fa);
+  const { roundNumbers: roundsOf, maxRounds } = useProtocols();
+  // one column per round of the longest protocol on screen
+  const roundNumbers = Array.from({ length: maxRounds(data.map((row) => row.test_number)) }, (_, i) => i + 1);
 
   const columns = [
     { name: t('Test Number', 'شماره آزمون'), selector: (row) => row.test_number, sortable: true, width: '150px' },
-    { name: t('Round 1 Score', 'امتیاز دور ۱'), selector: (row) => row.round1 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 2 Score', 'امتیاز دور ۲'), selector: (row) => row.round2 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 3 Score', 'امتیاز دور ۳'), selector: (row) => row.round3 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 4 Score', 'امتیاز دور ۴'), selector: (row) => row.round4 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 5 Score', 'امتیاز دور ۵'), selector: (row) => row.round5 ?? '-', sortable: true, width: '160px' },
+    ...roundNumbers.map((n) => ({
+      name: t(`Round ${n} Score`, `امتیاز دور ${n.toLocaleString('fa-IR')}`),
+      selector: (row) => row[`round${n}`] ?? '-',
+      sortable: true,
+      width: '160px',
+    })),
     { name: t('Test End Time', 'زمان پایان آزمون'), selector: (row) => row.test_time, sortable: true, width: '220px' },
     { name: t('Approved', 'تایید شده'), selector: (row) => (row.approved === 'Yes' ? t('Yes', 'بله') : t('No', 'خیر')), sortable: true, width: '120px' },
     { name: t('Total Score', 'مجموع امتیاز'), selector: (row) => row.total_score, sortable: true, width: '150px' },
@@ -117,7 +122,7 @@ const UserProfileHome = () => {
           <ProfileImageUpload
             onChange={handlePhotoChange}
             source={userData.profile_photo
-              ? `${BASE_URL}/static/profile_photos/${userData.profile_photo}`
+              ? `${BASE_URL}/api/profile_photos/${userData.profile_photo}`
               : "../images/profile.png"}
           />
           <h5 className="text-center mt-3 mb-0">{userData.username ? userData.username : ""}</h5>
@@ -176,7 +181,7 @@ const UserProfileHome = () => {
                   <div className="cards-grid">
                     {data.map((row) => {
                       const approved = row.approved === 'Yes';
-                      const rounds = [1, 2, 3, 4, 5].map((n) => ({ n, v: row[`round${n}`] ?? '—' }));
+                      const rounds = roundsOf(row.test_number).map((n) => ({ n, v: row[`round${n}`] ?? '—' }));
                       return (
                         <article key={row.id} className="result-card" aria-label={t('Test card', 'کارت آزمون')}>
                           <header className="card-head">
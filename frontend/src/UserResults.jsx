@@ -1,7 +1,9 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useCallback, useContext } from "react";
 import DataTable from "react-data-table-component";
 import { useLanguage } from './LanguageContext';
+import useProtocols from './useProtocols';
 import ProfileImageUpload from "./ProfileImageUpload";
+import { AuthContext } from "./AuthContext";
 import {
   GoCheckCircle,
   GoXCircle,
@@ -41,39 +43,36 @@ const UserResults = () => {
   const dir = language === 'en' ? 'ltr' : 'rtl';
   const isDesktop = useIsDesktop(992);
 
+  const [adminInfo, setAdminInfo] = useState({ username: '', profile_photo: '' });
+  const [filters, setFilters] = useState({ username: "", test_number: "", test_time: "" });
+  const [data, setData] = useState([]);
+  const [userOptions, setUserOptions] = useState([]);
+
+  const { roundNumbers: roundsOf, maxRounds } = useProtocols();
+  // one column per round of the longest protocol on screen
+  const roundNumbers = Array.from({ length: maxRounds(data.map((row) => row.test_number)) }, (_, i) => i + 1);
+
   const columns = [
     { name: t('Username', 'نام کاربری'), selector: (row) => row.username, sortable: true, width: '200px' },
     { name: t('Age', 'سن'), selector: (row) => row.age, sortable: true, width: '100px' },
     { name: t('Gender', 'جنسیت'), selector: (row) => (row.gender === 'female' ? t('female', 'زن') : t('male', 'مرد')), sortable: true, width: '120px' },
     { name: t('Test Number', 'شماره آزمون'), selector: (row) => row.test_number, sortable: true, width: '150px' },
-    { name: t('Round 1 Score', 'امتیاز دور ۱'), selector: (row) => row.round1 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 2 Score', 'امتیاز دور ۲'), selector: (row) => row.round2 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 3 Score', 'امتیاز دور ۳'), selector: (row) => row.round3 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 4 Score', 'امتیاز دور ۴'), selector: (row) => row.round4 ?? '-', sortable: true, width: '160px' },
-    { name: t('Round 5 Score', 'امتیاز دور ۵'), selector: (row) => row.round5 ?? '-', sortable: true, width: '160px' },
+    ...roundNumbers.map((n) => ({
+      name: t(`Round ${n} Score`, `امتیاز دور ${n.toLocaleString('fa-IR')}`),
+      selector: (row) => row[`round${n}`] ?? '-',
+      sortable: true,
+      width: '160px',
+    })),
     { name: t('Test Time', 'تاریخ آزمون'), selector: (row) => row.test_time, sortable: true, width: '250px' },
     { name: t('Approved', 'تایید شده'), selector: (row) => (row.approved === 'Yes' ? t('Yes', 'بله') : t('No', 'خیر')), sortable: true, width: '150px' },
     { name: t('Total Score', 'مجموع امتیاز'), selector: (row) => row.total_score, sortable: true, width: '160px' },
   ];
 
-  const [adminInfo, setAdminInfo] = useState({ username: '', profile_photo: '' });
-  const [filters, setFilters] = useState({ username: "", test_number: "", test_time: "" });
-  const [data, setData] = useState([]);
-  const [userOptions, setUserOptions] = useState([]);
-
-  // fetch admin info
+  // admin info comes from the session bootstrap in AuthContext
+  const { user } = useContext(AuthContext);
   useEffect(() => {
-    const fetchAdminInfo = async () => {
-      try {
-        const res = await fetch(`/api/admin/current-user`, { credentials: 'include' });
-        const json = await res.json();
-        if (res.ok) setAdminInfo(json);
-      } catch (err) {
-        console.error(language === 'en' ? 'Failed to fetch admin info:' : 'خطا در واکشی اطلاعات ادمین', err);
-      }
-    };
-    fetchAdminInfo();
-  }, [language]);
+    if (user) setAdminInfo(user);
+  }, [user]);
 
   // fetch and group user results
   const fetchData = useCallback(async () => {
@@ -138,7 +137,7 @@ const UserResults = () => {
         <div className="col-12 col-lg-1 sidebar px-0 pt-5 pb-5 d-flex flex-column align-items-center">
           <ProfileImageUpload
             onChange={handlePhotoChange}
-            source={adminInfo.profile_photo ? `${BASE_URL}/static/profile_photos/${adminInfo.profile_photo}` : "../images/profile.png"}
+            source={adminInfo.profile_photo ? `${BASE_URL}/api/profile_photos/${adminInfo.profile_photo}` : "../images/profile.png"}
           />
           <h5 className="text-center mt-3 mb-0">{t('admin', 'مدیر')}</h5>
         </div>
@@ -207,7 +206,7 @@ const UserResults = () => {
                   <div className="cards-grid">
                     {data.map((row) => {
                       const approved = row.approved === 'Yes';
-                      const rounds = [1, 2, 3, 4, 5].map((n) => ({ n, v: row[`round${n}`] ?? '—' }));
+                      const rounds = roundsOf(row.test_number).map((n) => ({ n, v: row[`round${n}`] ?? '—' }));
                       const gLabel = row.gender === 'female' ? t('female', 'زن') : t('male', 'مرد');
                       return (
                         <article key={`${row.username}-${row.test_number}`} className="result-card" aria-label={t('Result card', 'کارت نتیجه')}>
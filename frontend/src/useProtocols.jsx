@@ -0,0 +1,42 @@
+import { useEffect, useState } from 'react';
+
+// rounds shown until the protocols arrive (the learning-only tests 1-4)
+const DEFAULT_ROUNDS = 5;
+
+// fetched once per page load and shared by every component
+let protocolsRequest = null;
+
+const loadProtocols = () => {
+  if (!protocolsRequest) {
+    protocolsRequest = fetch('/api/tests/protocols')
+      .then((res) => (res.ok ? res.json() : []))
+      .catch(() => [])
+      .then((list) => {
+        if (!list.length) protocolsRequest = null; // retry on the next mount
+        return list;
+      });
+  }
+  return protocolsRequest;
+};
+
+// round count per test from GET /api/tests/protocols
+export default function useProtocols() {
+  const [protocols, setProtocols] = useState({});
+
+  useEffect(() => {
+    let active = true;
+    loadProtocols().then((list) => {
+      if (!active) return;
+      const byTest = {};
+      list.forEach((protocol) => { byTest[protocol.test_number] = protocol; });
+      setProtocols(byTest);
+    });
+    return () => { active = false; };
+  }, []);
+
+  const roundCount = (testNumber) => protocols[Number(testNumber)]?.rounds.length ?? DEFAULT_ROUNDS;
+  const roundNumbers = (testNumber) => Array.from({ length: roundCount(testNumber) }, (_, i) => i + 1);
+  const maxRounds = (testNumbers) => Math.max(DEFAULT_ROUNDS, ...testNumbers.map(roundCount));
+
+  return { protocols, roundCount, roundNumbers, maxRounds };
+}